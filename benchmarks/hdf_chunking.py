@@ -0,0 +1,99 @@
+"""Read throughput of the states for each chunk layout of ``StoreHDF``.
+
+It writes a synthetic file per layout and it times two access patterns: whole frames,
+as read by ``plot-states``, and the time series of blocks of sites, as read by the
+autocorrelation analyses. Run it from the root of the repository:
+
+    python benchmarks/hdf_chunking.py --num-iterations 500 --num-sites 8000
+
+The operating system caches the files, so the numbers are an upper bound for files
+larger than the memory.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import h5py
+import numpy
+
+from llg.store import CHUNK_LAYOUTS, StoreHDF
+
+
+def write(filename, layout, num_iterations, num_sites, compress):
+    information = {
+        "num_sites": num_sites,
+        "num_TH": 1,
+        "num_iterations": num_iterations,
+        "seed": 0,
+        "parameters": {
+            "units": "adim",
+            "damping": 1.0,
+            "gyromagnetic": 1.0,
+            "deltat": 1.0,
+            "kb": 1.0,
+        },
+        "temperature": [1.0],
+        "field": [0.0],
+        "types": ["generic"] * num_sites,
+        "positions": numpy.zeros((num_sites, 3)),
+        "initial_state": numpy.zeros((num_sites, 3)),
+    }
+    with StoreHDF(filename, compress, chunks=layout) as store:
+        store.populate(information)
+        for j in range(num_iterations):
+            # every frame is different, so the compression does not favor any layout
+            state = numpy.random.normal(size=(num_sites, 3))
+            store.store(state, 0.0, 0.0, 0.0, 0.0, 0, j)
+
+
+def read_frames(dataset):
+    for j in range(dataset.shape[1]):
+        dataset[0, j]
+
+
+def read_series(dataset, block):
+    for start in range(0, dataset.shape[2], block):
+        stop = start + block
+        dataset[0, :, start:stop]
+
+
+def throughput(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--num-iterations", type=int, default=500)
+    parser.add_argument("--num-sites", type=int, default=8000)
+    parser.add_argument("--block", type=int, default=64, help="Sites per series.")
+    parser.add_argument("--compress", action="store_true")
+    parser.add_argument("--chunk-cache", type=int, default=16 * 2**20)
+    args = parser.parse_args()
+
+    size = args.num_iterations * args.num_sites * 3 * 8 / 2**20
+    print(f"states: {size:.1f} MiB")
+    print(f"{'layout':>10} {'chunk':>22} {'frames MiB/s':>14} {'series MiB/s':>14}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for layout in (None, *CHUNK_LAYOUTS):
+            if layout is None and args.compress:
+                continue
+            filename = os.path.join(directory, f"{layout}.h5")
+            write(filename, layout, args.num_iterations, args.num_sites, args.compress)
+            with h5py.File(filename, "r", rdcc_nbytes=args.chunk_cache) as file:
+                dataset = file["states"]
+                frames = throughput(read_frames, dataset)
+                series = throughput(read_series, dataset, args.block)
+                chunks = str(dataset.chunks)
+            print(
+                f"{str(layout):>10} {chunks:>22} "
+                f"{size / frames:>14.1f} {size / series:>14.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
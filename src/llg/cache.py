@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy
+
+from llg.geometry import CSR, Geometry
+from llg.sample_file import (
+    SAMPLE_FILE,
+    is_binary_sample,
+    read_binary_sample,
+    write_binary_sample,
+)
+
+
+class GeometryCache:
+    """This is a class for keep, in a directory, the compiled arrays of the samples
+    (the columns of the sites and the links, the CSR layout, and the type codes), so
+    that loading the same sample again is a single memory map. Every entry is keyed
+    by ``key``, from the stat data of the sample files. The size of the directory is
+    capped by evicting the least recently used entries.
+
+    :param directory: The directory of the cache. It is created if it does not exist.
+    :type directory: str
+    :param max_size: The maximum size of the cache in bytes.
+    :type max_size: int
+    """
+
+    def __init__(self, directory, max_size=10 * 2**30):
+        """The constructor for GeometryCache class."""
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(path):
+        """It computes the key of a sample from the stat data of its files, so they
+        are not read. For a JSON sample, it is a hash of its path, size and
+        modification time, so the entry holds every attribute of the sample. For a
+        binary sample, it is a hash of its parameters and of the names, sizes and
+        modification times of its columns, which does not change with the
+        temperature, the field, the seed, or the initial state.
+
+        :param path: The JSON file or the binary sample directory.
+        :type path: str
+
+        :return: The key.
+        :rtype: str
+        """
+        digest = hashlib.sha256()
+        if not is_binary_sample(path):
+            stat = os.stat(path)
+            digest.update(
+                f"{os.path.realpath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+            )
+            return digest.hexdigest()
+
+        with open(os.path.join(path, SAMPLE_FILE)) as file:
+            parameters = json.load(file)["parameters"]
+        digest.update(json.dumps(parameters, sort_keys=True).encode())
+        for group in ("sites", "neighbors"):
+            for filename in sorted(os.listdir(os.path.join(path, group))):
+                stat = os.stat(os.path.join(path, group, filename))
+                digest.update(
+                    f"{group}/{filename}:{stat.st_size}:{stat.st_mtime_ns}".encode()
+                )
+        return digest.hexdigest()
+
+    def load(self, path, read):
+        """It loads a sample from the cache. If it is not in the cache, it is read with
+        ``read``, compiled, and stored. The attributes of a binary sample other than
+        the geometry and the parameters are always taken from ``path``.
+
+        :param path: The JSON file or the binary sample directory.
+        :type path: str
+        :param read: The function that reads the sample when it is not cached. It
+        returns the sample with a ``Geometry``.
+        :type read: callable
+
+        :return: The sample. Its ``geometry`` is a ``Geometry``.
+        :rtype: dict
+        """
+        entry = os.path.join(self.directory, self.key(path))
+
+        if not os.path.isdir(entry):
+            sample = read(path)
+            self.store(entry, sample)
+            self.evict(keep=entry)
+            return sample
+
+        sample = self.read_entry(entry)
+        if is_binary_sample(path):
+            # the entry only depends on the geometry and the parameters
+            with open(os.path.join(path, SAMPLE_FILE)) as file:
+                attributes = json.load(file)
+            sample.pop("initial_state", None)
+            sample.update(attributes)
+            initial_state_file = os.path.join(path, "initial_state.npy")
+            if os.path.isfile(initial_state_file):
+                sample["initial_state"] = numpy.load(initial_state_file, mmap_mode="r")
+
+        # the modification time of the entries is the order of eviction
+        os.utime(entry)
+        return sample
+
+    def store(self, entry, sample):
+        """It stores a compiled sample. The entry is written in a temporary directory
+        and moved into place, so concurrent processes never see it half written.
+
+        :param entry: The directory of the entry.
+        :type entry: str
+        :param sample: The sample with a ``Geometry``.
+        :type sample: dict
+        """
+        geometry = sample["geometry"]
+        temporary = tempfile.mkdtemp(dir=self.directory, prefix=".tmp-")
+        try:
+            write_binary_sample(sample, temporary)
+            os.makedirs(os.path.join(temporary, "csr"))
+            for field, column in zip(CSR._fields, geometry.csr):
+                numpy.save(os.path.join(temporary, "csr", f"{field}.npy"), column)
+            numpy.save(os.path.join(temporary, "type_codes.npy"), geometry.type_codes)
+            os.rename(temporary, entry)
+        except OSError:
+            # another process stored the same entry first
+            if not os.path.isdir(entry):
+                raise
+        finally:
+            shutil.rmtree(temporary, ignore_errors=True)
+
+    @staticmethod
+    def read_entry(entry):
+        """It reads a compiled sample from an entry. Every array is memory-mapped.
+
+        :param entry: The directory of the entry.
+        :type entry: str
+
+        :return: The sample. Its ``geometry`` is a ``Geometry``.
+        :rtype: dict
+        """
+        # the entry was validated when it was written
+        sample = read_binary_sample(entry, validate=False)
+        geometry = sample["geometry"]
+        csr = CSR(
+            *(
+                numpy.load(os.path.join(entry, "csr", f"{field}.npy"), mmap_mode="r")
+                for field in CSR._fields
+            )
+        )
+        type_codes = numpy.load(os.path.join(entry, "type_codes.npy"), mmap_mode="r")
+        sample["geometry"] = Geometry(geometry.sites, geometry.links, csr, type_codes)
+        return sample
+
+    def entries(self):
+        """It lists the entries of the cache with their sizes in bytes, from the least
+        to the most recently used.
+
+        :return: The list of (entry, size) pairs.
+        :rtype: list
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            entry = os.path.join(self.directory, name)
+            if name.startswith(".") or not os.path.isdir(entry):
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(root, filename))
+                for root, _, filenames in os.walk(entry)
+                for filename in filenames
+            )
+            entries.append((os.path.getmtime(entry), entry, size))
+        return [(entry, size) for _, entry, size in sorted(entries)]
+
+    def evict(self, keep=None):
+        """It removes the least recently used entries until the size of the cache is
+        below ``max_size``.
+
+        :param keep: An entry that is removed only if it is alone above the limit.
+        :type keep: str
+        """
+        entries = self.entries()
+        total = sum(size for _, size in entries)
+        # the entry to keep is the last one to go
+        entries.sort(key=lambda item: item[0] == keep)
+        for entry, size in entries:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
@@ -1,22 +1,40 @@
 # -*- coding: utf-8 -*-
 
 """Console script for llg."""
+import multiprocessing
 import os
-import pickle
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 import click
-import h5py
 import moviepy.editor as mpy
-import numpy
 from matplotlib import pyplot
 from matplotlib.backends.backend_pdf import PdfPages
 from tqdm import tqdm
 
 from llg._tools import __ask_for_field, __ask_for_temperature
+from llg.cache import GeometryCache
+from llg.geometry import Geometry
 from llg.plot_states import PlotStates
 from llg.predefined_structures import GenericBcc, GenericFcc, GenericSc
+from llg.sample_file import (
+    convert_sample,
+    read_sample,
+    write_binary_sample,
+    write_json_sample,
+)
 from llg.simulation import Simulation
-from llg.store import StoreHDF
+from llg.sinks import (
+    AveragesSink,
+    HDFSink,
+    SnapshotsSink,
+    fan_out,
+    frame_index,
+    hdf_point,
+    hdf_point_averages,
+)
+from llg.store import CHUNK_LAYOUTS, STATE_ENCODINGS, ReadHDF
+from llg.stream import StreamReader, StreamWriter
 
 
 @click.group()
@@ -25,24 +43,306 @@ def main():
     pass
 
 
+def simulation_options(command):
+    # options shared by the commands that run simulations
+    command = click.option(
+        "--workers",
+        default=1,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help="Number of processes for the temperature and field pairs. If it is "
+        "greater than one, the pairs are independent: each one starts from the "
+        "initial state.",
+    )(command)
+    command = click.option(
+        "--exchange-every",
+        default=None,
+        type=click.IntRange(min=1),
+        help="Run in parallel tempering, with a replica per temperature, and exchange "
+        "the replicas of adjacent temperatures every N iterations. The acceptance "
+        "rates are printed to the standard error. By default, the value of the file.",
+    )(command)
+    command = click.option(
+        "--equilibration-steps",
+        default=None,
+        type=click.IntRange(min=0),
+        help="Iterations advanced at each temperature and field before the first "
+        "output. By default, the value of the file or 0.",
+    )(command)
+    command = click.option(
+        "--sample-every",
+        default=None,
+        type=click.IntRange(min=1),
+        help="Iterations between two outputs. The energies are only computed for the "
+        "outputs. By default, the value of the file or 1.",
+    )(command)
+    command = click.option(
+        "--cache-size",
+        default=10 * 2**30,
+        envvar="LLG_CACHE_SIZE",
+        show_default=True,
+        help="Maximum size of the cache in bytes. The least recently used geometries "
+        "are evicted.",
+    )(command)
+    command = click.option(
+        "--cache-dir",
+        default=None,
+        envvar="LLG_CACHE_DIR",
+        help="Directory to cache the compiled geometries, keyed by the hash of the "
+        "geometry and the parameters.",
+    )(command)
+    command = click.option(
+        "--threads",
+        default=None,
+        type=int,
+        help="Number of threads used by the kernels. By default, they run serially.",
+    )(command)
+    return command
+
+
+def hdf_input_options(command):
+    # options shared by the commands that read the output of a simulation
+    command = click.option(
+        "--chunk-cache",
+        default=None,
+        type=int,
+        help="Size in bytes of the chunk cache of the hdf file.",
+    )(command)
+    command = click.option(
+        "--workers",
+        default=1,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help="Number of processes for the temperature and field pairs of the hdf file.",
+    )(command)
+    command = click.option(
+        "--hdf",
+        default=None,
+        type=click.Path(exists=True, dir_okay=False),
+        help="Read the hdf file written by store-hdf instead of the standard input.",
+    )(command)
+    return command
+
+
+def hdf_points(hdf, num_TH, workers, function, *args):
+    # runs the function for each temperature and field pair, in worker processes.
+    # They are spawned, since a fork would copy the locks of the threads of numba
+    # and of the hdf files
+    with ProcessPoolExecutor(workers, multiprocessing.get_context("spawn")) as pool:
+        return list(
+            pool.map(
+                function,
+                repeat(hdf, num_TH),
+                range(num_TH),
+                *(repeat(arg, num_TH) for arg in args),
+            )
+        )
+
+
+def load_simulation(
+    configuration_file,
+    threads,
+    cache_dir,
+    cache_size,
+    sample_every,
+    equilibration_steps,
+    exchange_every,
+    workers,
+):
+    cache = GeometryCache(cache_dir, cache_size) if cache_dir else None
+    return Simulation.from_file(
+        configuration_file,
+        threads,
+        cache,
+        sample_every,
+        equilibration_steps,
+        exchange_every,
+        workers,
+    )
+
+
+def print_swap_statistics(simulation):
+    # the acceptance of the replica exchanges, to the standard error since the
+    # standard output may be the stream of the simulation
+    if simulation.exchange_every is None:
+        return
+    click.echo("#temperature_1 temperature_2 attempts accepted acceptance", err=True)
+    for line in simulation.swap_statistics:
+        click.echo(line, err=True)
+
+
 @main.command("simulate")
 @click.argument("configuration_file")
-def simulate(configuration_file):
-    simulation = Simulation.from_file(configuration_file)
-    print(pickle.dumps(simulation.information))
+@simulation_options
+def simulate(
+    configuration_file,
+    threads,
+    cache_dir,
+    cache_size,
+    sample_every,
+    equilibration_steps,
+    exchange_every,
+    workers,
+):
+    simulation = load_simulation(
+        configuration_file,
+        threads,
+        cache_dir,
+        cache_size,
+        sample_every,
+        equilibration_steps,
+        exchange_every,
+        workers,
+    )
+    stream = StreamWriter(click.get_binary_stream("stdout"))
+    stream.write_information(simulation.information)
     for values in simulation.run():
-        (
-            state,
-            exchange_energy,
-            anisotropy_energy,
-            magnetic_energy,
-            total_energy,
-        ) = values
-        print(pickle.dumps(state))
-        print(pickle.dumps(exchange_energy))
-        print(pickle.dumps(anisotropy_energy))
-        print(pickle.dumps(magnetic_energy))
-        print(pickle.dumps(total_energy))
+        stream.write(*values)
+    stream.flush()
+    print_swap_statistics(simulation)
+
+
+@main.command("run")
+@click.argument("configuration_file")
+@simulation_options
+@click.option("--hdf", default=None, help="The hdf file where the output is stored.")
+@click.option(
+    "--compress",
+    default=False,
+    is_flag=True,
+    help="It compresses the datasets of the hdf file.",
+)
+@click.option(
+    "--batch-size",
+    default=64,
+    show_default=True,
+    help="Number of iterations written to the hdf file at once, in the background.",
+)
+@click.option(
+    "--chunks",
+    default=None,
+    type=click.Choice(CHUNK_LAYOUTS),
+    help="Chunk layout of the states: whole frames, time series of blocks of sites, "
+    "or balanced.",
+)
+@click.option(
+    "--chunk-cache",
+    default=None,
+    type=int,
+    help="Size in bytes of the chunk cache of the hdf file.",
+)
+@click.option(
+    "--encoding",
+    default=None,
+    type=click.Choice(list(STATE_ENCODINGS)),
+    help="Store the states with two numbers per spin: the angles as float32, or the "
+    "octahedral mapping as int16.",
+)
+@click.option(
+    "--state-every",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Store the states every K iterations. If K > 1, the magnetization vectors "
+    "are stored for every iteration.",
+)
+@click.option(
+    "--observables-only",
+    default=False,
+    is_flag=True,
+    help="Do not store the states, only the energies and the total and by type "
+    "magnetization vectors.",
+)
+@click.option(
+    "--averages",
+    default=None,
+    type=click.File("w"),
+    help="The file where the averages are printed, or - for the standard output.",
+)
+@click.option(
+    "--by-types",
+    default=False,
+    is_flag=True,
+    help="It allows to compute avarages by type.",
+)
+@click.option(
+    "--components",
+    default=False,
+    is_flag=True,
+    help="It allows to compute avarages by components.",
+)
+@click.option(
+    "--discard",
+    default=0,
+    help="It allows to discard the first outputs of each pair at the time to compute "
+    "avarages. With --sample-every, an output is taken every sample-every iterations.",
+)
+@click.option("--snapshots", default=None, help="The prefix of the state images.")
+@click.option(
+    "--step",
+    default="max",
+    help="Step separation between state images. If step=max, it will be the amount "
+    "of iterations.",
+)
+def run(
+    configuration_file,
+    threads,
+    cache_dir,
+    cache_size,
+    sample_every,
+    equilibration_steps,
+    exchange_every,
+    workers,
+    hdf,
+    compress,
+    batch_size,
+    chunks,
+    chunk_cache,
+    encoding,
+    state_every,
+    observables_only,
+    averages,
+    by_types,
+    components,
+    discard,
+    snapshots,
+    step,
+):
+    """Runs a simulation and sends every step, in the same process, to the hdf file,
+    the averages and the state images."""
+    sinks = []
+    if hdf:
+        sinks.append(
+            HDFSink(
+                hdf,
+                compress,
+                batch_size,
+                chunks,
+                chunk_cache,
+                encoding,
+                state_every,
+                observables_only,
+            )
+        )
+    if averages:
+        sinks.append(AveragesSink(averages, by_types, components, discard))
+    if snapshots:
+        sinks.append(SnapshotsSink(snapshots, step))
+    if not sinks:
+        raise click.UsageError("At least one of --hdf, --averages or --snapshots.")
+
+    simulation = load_simulation(
+        configuration_file,
+        threads,
+        cache_dir,
+        cache_size,
+        sample_every,
+        equilibration_steps,
+        exchange_every,
+        workers,
+    )
+    fan_out(simulation.information, simulation.run(), sinks)
+    print_swap_statistics(simulation)
 
 
 @main.command("store-hdf")
@@ -55,62 +355,94 @@ def simulate(configuration_file):
     help="It reduces the overall number of bits and bytes of the file, but it takes "
     "much more time",
 )
-def store_hdf_cli(output, compress):
-    simulation_information = pickle.loads(eval(input()))
-    num_TH = simulation_information["num_TH"]
-    num_iterations = simulation_information["num_iterations"]
-
-    with StoreHDF(output, compress) as hdf5_file:
-        hdf5_file.populate(simulation_information)
-
-        for i in range(num_TH):
-            for j in range(num_iterations):
-                # reads
-                state = pickle.loads(eval(input()))
-                exchange_energy = pickle.loads(eval(input()))
-                anisotropy_energy = pickle.loads(eval(input()))
-                magnetic_energy = pickle.loads(eval(input()))
-                total_energy = pickle.loads(eval(input()))
-
-                # stores
-                hdf5_file.store_state(state, i, j)
-                hdf5_file.store_exchange_energy(exchange_energy, i, j)
-                hdf5_file.store_anisotropy_energy(anisotropy_energy, i, j)
-                hdf5_file.store_magnetic_energy(magnetic_energy, i, j)
-                hdf5_file.store_total_energy(total_energy, i, j)
+@click.option(
+    "--batch-size",
+    default=64,
+    show_default=True,
+    help="Number of iterations written to the hdf file at once, in the background.",
+)
+@click.option(
+    "--chunks",
+    default=None,
+    type=click.Choice(CHUNK_LAYOUTS),
+    help="Chunk layout of the states: whole frames, time series of blocks of sites, "
+    "or balanced.",
+)
+@click.option(
+    "--chunk-cache",
+    default=None,
+    type=int,
+    help="Size in bytes of the chunk cache of the hdf file.",
+)
+@click.option(
+    "--encoding",
+    default=None,
+    type=click.Choice(list(STATE_ENCODINGS)),
+    help="Store the states with two numbers per spin: the angles as float32, or the "
+    "octahedral mapping as int16.",
+)
+@click.option(
+    "--state-every",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Store the states every K iterations. If K > 1, the magnetization vectors "
+    "are stored for every iteration.",
+)
+@click.option(
+    "--observables-only",
+    default=False,
+    is_flag=True,
+    help="Do not store the states, only the energies and the total and by type "
+    "magnetization vectors.",
+)
+def store_hdf_cli(
+    output,
+    compress,
+    batch_size,
+    chunks,
+    chunk_cache,
+    encoding,
+    state_every,
+    observables_only,
+):
+    stream = StreamReader(click.get_binary_stream("stdin"))
+    sink = HDFSink(
+        output,
+        compress,
+        batch_size,
+        chunks,
+        chunk_cache,
+        encoding,
+        state_every,
+        observables_only,
+    )
+    fan_out(stream.information, stream, [sink])
 
 
 @main.command("read-hdf")
 @click.argument("file")
-def read_hdf(file):
-    with h5py.File(file, mode="r") as dataset:
-        simulation_information = {
-            "num_sites": dataset.attrs["num_sites"],
-            "parameters": {
-                "units": dataset.attrs["units"],
-                "damping": dataset.attrs["damping"],
-                "gyromagnetic": dataset.attrs["gyromagnetic"],
-                "deltat": dataset.attrs["deltat"],
-                "kb": dataset.attrs["deltat"],
-            },
-            "temperature": dataset["temperature"][:],
-            "field": dataset["field"][:],
-            "seed": dataset.attrs["seed"],
-            "num_iterations": dataset.attrs["num_iterations"],
-            "positions": dataset["positions"][:],
-            "types": dataset["types"][:],
-            "initial_state": dataset["initial_state"][:],
-            "num_TH": dataset.attrs["num_TH"],
-        }
-        print(pickle.dumps(simulation_information))
-
-        for i in range(dataset.attrs["num_TH"]):
-            for j in range(dataset.attrs["num_iterations"]):
-                print(pickle.dumps(dataset["states"][i, j]))
-                print(pickle.dumps(dataset["exchange_energy"][i, j]))
-                print(pickle.dumps(dataset["anisotropy_energy"][i, j]))
-                print(pickle.dumps(dataset["magnetic_energy"][i, j]))
-                print(pickle.dumps(dataset["total_energy"][i, j]))
+@click.option(
+    "--chunk-cache",
+    default=None,
+    type=int,
+    help="Size in bytes of the chunk cache of the hdf file.",
+)
+def read_hdf(file, chunk_cache):
+    """Sends the stored states to the standard output. If the states were stored
+    every K iterations, only those iterations are sent."""
+    try:
+        reader = ReadHDF(file, chunk_cache)
+    except (OSError, KeyError) as error:
+        raise click.UsageError(f"The file {file} could not be read: {error}")
+    with reader:
+        if not reader.has_states:
+            raise click.UsageError(f"The file {file} does not have states.")
+        stream = StreamWriter(click.get_binary_stream("stdout"))
+        stream.write_information(reader.information)
+        for values in reader:
+            stream.write(*values)
+        stream.flush()
 
 
 @main.command("compute-averages")
@@ -129,105 +461,59 @@ def read_hdf(file):
 @click.option(
     "--discard",
     default=0,
-    help="It allows to discard some iterations at the time to compute avarages.",
+    help="It allows to discard the first outputs of each pair at the time to compute "
+    "avarages. With --sample-every, an output is taken every sample-every iterations.",
 )
-def compute_averages(by_types, components, discard):
-    simulation_information = pickle.loads(eval(input()))
-
-    if discard > simulation_information["num_iterations"]:
-        raise Exception("Discard option should be less than the number of iterations !")
-
-    temperature = simulation_information["temperature"]
-    field = simulation_information["field"]
-    types = numpy.array(simulation_information["types"])
-    set_types = sorted(set(types))
-
-    print(f"#num_TH = {simulation_information['num_TH']}")
-
-    header = "#temperature field E_exchange E_anisotropy E_field E_total M_total"
-    if components:
-        header += " M_total_x M_total_y M_total_z"
-
-    if by_types:
-        for t in set_types:
-            header += f" M_{t}"
-            if components:
-                header += f" M_{t}_x M_{t}_y M_{t}_z"
-
-    print(header)
-
-    num_TH = simulation_information["num_TH"]
-    num_iterations = simulation_information["num_iterations"]
-
-    for i in range(num_TH):
-        state_arr = []
-        exchange_energy_arr = []
-        anisotropy_energy_arr = []
-        magnetic_energy_arr = []
-        total_energy_arr = []
-
-        for j in range(num_iterations):
-            # reads
-            state = pickle.loads(eval(input()))
-            exchange_energy = pickle.loads(eval(input()))
-            anisotropy_energy = pickle.loads(eval(input()))
-            magnetic_energy = pickle.loads(eval(input()))
-            total_energy = pickle.loads(eval(input()))
-
-            if j >= discard:
-                state_arr.append(state)
-                exchange_energy_arr.append(exchange_energy)
-                anisotropy_energy_arr.append(anisotropy_energy)
-                magnetic_energy_arr.append(magnetic_energy)
-                total_energy_arr.append(total_energy)
-
-        state_arr = numpy.array(state_arr)
-
-        E_exchange = numpy.mean(exchange_energy_arr)
-        E_anisotropy = numpy.mean(anisotropy_energy_arr)
-        E_field = numpy.mean(magnetic_energy_arr)
-        E_total = numpy.mean(total_energy_arr)
-
-        M_total = numpy.mean(numpy.linalg.norm(numpy.mean(state_arr, axis=1), axis=1))
-
-        if components:
-            M_total_x, M_total_y, M_total_z = numpy.mean(
-                numpy.mean(state_arr, axis=1), axis=0
-            )
-
-        mag_by_types = {}
-        mag_x_by_types = {}
-        mag_y_by_types = {}
-        mag_z_by_types = {}
-        if by_types:
-            for t in set_types:
-                mag_by_types[t] = numpy.mean(
-                    numpy.linalg.norm(
-                        numpy.mean(state_arr[:, types == t, :], axis=1), axis=1
-                    )
+@hdf_input_options
+def compute_averages(by_types, components, discard, hdf, workers, chunk_cache):
+    sink = AveragesSink(None, by_types, components, discard)
+    if hdf is None:
+        stream = StreamReader(click.get_binary_stream("stdin"))
+        fan_out(stream.information, stream, [sink])
+        return
+
+    with ReadHDF(hdf, chunk_cache) as reader:
+        # the magnetization vectors and the energies of every iteration are used
+        # when they are stored
+        observables = reader.has_observables
+        if workers == 1:
+            if observables:
+                fan_out(
+                    reader.observables_information,
+                    reader.iter_observables(),
+                    [sink],
+                    observables=True,
                 )
-                if components:
-                    mag = numpy.mean(
-                        numpy.mean(state_arr[:, types == t, :], axis=1), axis=0
-                    )
-                    mag_x_by_types[t], mag_y_by_types[t], mag_z_by_types[t] = mag
-
-        output = (
-            f"{temperature[i]} {field[i]} {E_exchange} "
-            f"{E_anisotropy} {E_field} {E_total} {M_total}"
+            else:
+                fan_out(reader.information, reader, [sink])
+            return
+        sink.start(
+            reader.observables_information if observables else reader.information
         )
-        if components:
-            output += f" {M_total_x} {M_total_y} {M_total_z}"
+        num_TH = reader.information["num_TH"]
+
+    lines = hdf_points(
+        hdf,
+        num_TH,
+        workers,
+        hdf_point_averages,
+        by_types,
+        components,
+        discard,
+        chunk_cache,
+        observables,
+    )
+    for line in lines:
+        click.echo(line, nl=False)
 
-        if by_types:
-            for t in set_types:
-                output += f" {mag_by_types[t]}"
-                if components:
-                    output += (
-                        f" {mag_x_by_types[t]} {mag_y_by_types[t]} {mag_z_by_types[t]}"
-                    )
 
-        print(output)
+@main.command("convert-sample")
+@click.argument("source")
+@click.argument("destination")
+def convert_sample_cli(source, destination):
+    """Converts a JSON sample to the binary format (a directory with one column per
+    attribute), or a binary sample to JSON."""
+    convert_sample(source, destination)
 
 
 @main.group("build-samples")
@@ -238,31 +524,86 @@ def build_samples():
 @build_samples.command("generic-sc")
 @click.argument("output")
 @click.option("--length", default=10, help="It represents the size of the sytem")
-def generic_sc(length, output):
+@click.option(
+    "--binary",
+    is_flag=True,
+    help="Save the sample in the binary format, a directory with one column per "
+    "attribute.",
+)
+def generic_sc(length, output, binary):
     sample = GenericSc(length)
     sample.temperature = __ask_for_temperature()
     sample.field = __ask_for_field()
-    sample.save(output)
+    sample.save(output, binary)
 
 
 @build_samples.command("generic-bcc")
 @click.argument("output")
 @click.option("--length", default=10, help="It represents the size of the sytem")
-def generic_bcc(length, output):
+@click.option(
+    "--binary",
+    is_flag=True,
+    help="Save the sample in the binary format, a directory with one column per "
+    "attribute.",
+)
+def generic_bcc(length, output, binary):
     sample = GenericBcc(length)
     sample.temperature = __ask_for_temperature()
     sample.field = __ask_for_field()
-    sample.save(output)
+    sample.save(output, binary)
 
 
 @build_samples.command("generic-fcc")
 @click.argument("output")
 @click.option("--length", default=10, help="It represents the size of the sytem")
-def generic_fcc(length, output):
+@click.option(
+    "--binary",
+    is_flag=True,
+    help="Save the sample in the binary format, a directory with one column per "
+    "attribute.",
+)
+def generic_fcc(length, output, binary):
     sample = GenericFcc(length)
     sample.temperature = __ask_for_temperature()
     sample.field = __ask_for_field()
-    sample.save(output)
+    sample.save(output, binary)
+
+
+@build_samples.command("find-neighbors")
+@click.argument("source")
+@click.argument("output")
+@click.option("--cutoff", type=float, required=True, help="Maximum neighbor distance.")
+@click.option(
+    "--box",
+    type=float,
+    nargs=9,
+    default=None,
+    help="The three vectors of the periodic box. By default the boundaries are open.",
+)
+@click.option(
+    "--jex",
+    type=float,
+    default=1.0,
+    help="The exchange interaction, the same for every pair. A distance dependent "
+    "exchange is only available through `Geometry.from_positions`.",
+)
+@click.option(
+    "--binary",
+    is_flag=True,
+    help="Save the sample in the binary format, a directory with one column per "
+    "attribute.",
+)
+def find_neighbors(source, output, cutoff, box, jex, binary):
+    """Replaces the neighbors of a sample with every pair of sites closer than the
+    cutoff."""
+    sample = read_sample(source)
+    sample["geometry"] = Geometry.from_positions(
+        sample["geometry"].sites, cutoff, box or None, jex
+    )
+    if binary:
+        write_binary_sample(sample, output)
+    else:
+        write_json_sample(sample, output)
 
 
 @main.group("plot")
@@ -347,43 +688,30 @@ def plot_averages(output):
     help="Color map. Matplotlib supported colormaps: "
     "https://matplotlib.org/examples/color/colormaps_reference.html",
 )
-def plot_states(output, step, size, mode, colormap):
-    simulation_information = pickle.loads(eval(input()))
-    num_TH = simulation_information["num_TH"]
-    num_iterations = simulation_information["num_iterations"]
-    positions = simulation_information["positions"]
-    temperature = simulation_information["temperature"]
-    field = simulation_information["field"]
-    initial_state = simulation_information["initial_state"]
-
-    if step == "max":
-        step = num_iterations
-    else:
-        step = int(step)
-
-    if num_iterations % step != 0:
-        raise Exception("`step` is not a multiple of `num_iterations`")
-
-    plot_state = PlotStates(positions, output, size, mode, colormap)
-    plot_state.plot(initial_state, 0, None, None, save=True)
-    click.secho("Figure was created the initial state", fg="green")
-
-    for i in range(num_TH):
-        T = temperature[i]
-        H = field[i]
-        for j in range(num_iterations):
-            # reads
-            state = pickle.loads(eval(input()))
-            _ = pickle.loads(eval(input()))
-            _ = pickle.loads(eval(input()))
-            _ = pickle.loads(eval(input()))
-            _ = pickle.loads(eval(input()))
-            if (j + 1) % step == 0:
-                plot_state.plot(state, j + 1, T, H, save=True)
-                click.secho(
-                    f"Figure was created for T={T:.2f}, H={H:.2f}, iteration={j + 1}",
-                    fg="green",
-                )
+@hdf_input_options
+def plot_states(output, step, size, mode, colormap, hdf, workers, chunk_cache):
+    sink = SnapshotsSink(output, step, size, mode, colormap)
+    if hdf is None:
+        stream = StreamReader(click.get_binary_stream("stdin"))
+        fan_out(stream.information, stream, [sink])
+        return
+
+    with ReadHDF(hdf, chunk_cache) as reader:
+        if workers == 1:
+            fan_out(reader.information, reader, [sink])
+            return
+        # the initial state is rendered here, and each pair by a worker
+        sink.start(reader.information)
+        num_TH = reader.information["num_TH"]
+
+    hdf_points(
+        hdf,
+        num_TH,
+        workers,
+        hdf_point,
+        SnapshotsSink(output, step, size, mode, colormap, initial_state=False),
+        chunk_cache,
+    )
 
 
 @plot.command("animate-states")
@@ -409,8 +737,31 @@ def plot_states(output, step, size, mode, colormap):
     "https://matplotlib.org/examples/color/colormaps_reference.html",
 )
 @click.option("--fps", default=1, help="Frames per second.")
-def animate_states(output, step, size, mode, colormap, fps):
-    simulation_information = pickle.loads(eval(input()))
+@click.option(
+    "--hdf",
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Read the hdf file written by store-hdf instead of the standard input.",
+)
+@click.option(
+    "--chunk-cache",
+    default=None,
+    type=int,
+    help="Size in bytes of the chunk cache of the hdf file.",
+)
+def animate_states(output, step, size, mode, colormap, fps, hdf, chunk_cache):
+    if hdf is None:
+        source = StreamReader(click.get_binary_stream("stdin"))
+        write_animation(source, output, step, size, mode, colormap, fps)
+        return
+
+    # the file is read while the animation is written
+    with ReadHDF(hdf, chunk_cache) as reader:
+        write_animation(reader, output, step, size, mode, colormap, fps)
+
+
+def write_animation(source, output, step, size, mode, colormap, fps):
+    simulation_information = source.information
     num_TH = simulation_information["num_TH"]
     num_iterations = simulation_information["num_iterations"]
     positions = simulation_information["positions"]
@@ -430,18 +781,11 @@ def animate_states(output, step, size, mode, colormap, fps):
         plot_state = PlotStates(positions, output, size, mode, colormap)
         yield plot_state.plot(initial_state, 0, None, None)
 
-        for i in range(num_TH):
-            T = temperature[i]
-            H = field[i]
-            for j in range(num_iterations):
-                # reads
-                state = pickle.loads(eval(input()))
-                _ = pickle.loads(eval(input()))
-                _ = pickle.loads(eval(input()))
-                _ = pickle.loads(eval(input()))
-                _ = pickle.loads(eval(input()))
-                if (j + 1) % step == 0:
-                    yield plot_state.plot(state, j + 1, T, H)
+        # the frames are given in the order of ``fan_out``
+        for k, (state, *_) in enumerate(source):
+            i, j = frame_index(k, simulation_information)
+            if (j + 1) % step == 0:
+                yield plot_state.plot(state, j + 1, temperature[i], field[i])
 
     def make_frame(t):
         return next(generator)
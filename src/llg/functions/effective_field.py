@@ -0,0 +1,112 @@
+from typing import Any, Optional
+
+import numpy
+from numba import jit, prange
+from numpy import ndarray
+
+from llg.functions.philox import gaussian_triplet
+
+
+@jit(nopython=True, error_model="numpy", inline="always")
+def spin_field_site(
+    i: int,
+    state: ndarray[(Any, 3), float],
+    magnitude_spin_moment: ndarray[Any, float],
+    indptr: ndarray[Any, int],
+    indices: ndarray[Any, int],
+    jex: ndarray[Any, float],
+    anisotropy_constants: ndarray[Any, float],
+    anisotropy_vectors: ndarray[(Any, 3), float],
+) -> tuple:
+    # the exchange and anisotropy fields of the i-th site, accumulated in
+    # registers. It is the sum of `exchange_interaction_field_csr` and
+    # `anisotropy_interaction_field`, and it is inlined in the loops over the sites,
+    # since a call per site is slower than the separate kernels.
+    exchange_x = 0.0
+    exchange_y = 0.0
+    exchange_z = 0.0
+    for link in range(indptr[i], indptr[i + 1]):
+        nhb = indices[link]
+        exchange_x += jex[link] * state[nhb, 0]
+        exchange_y += jex[link] * state[nhb, 1]
+        exchange_z += jex[link] * state[nhb, 2]
+
+    ax = anisotropy_vectors[i, 0]
+    ay = anisotropy_vectors[i, 1]
+    az = anisotropy_vectors[i, 2]
+    projection = state[i, 0] * ax + state[i, 1] * ay + state[i, 2] * az
+    anisotropy = 2 * anisotropy_constants[i] * projection / magnitude_spin_moment[i]
+
+    return (
+        exchange_x / magnitude_spin_moment[i] + anisotropy * ax,
+        exchange_y / magnitude_spin_moment[i] + anisotropy * ay,
+        exchange_z / magnitude_spin_moment[i] + anisotropy * az,
+    )
+
+
+@jit(nopython=True, inline="always")
+def external_field_site(
+    i: int,
+    magnetic_fields: ndarray[(Any, 3), float],
+    intensity: ndarray[Any, float],
+    seed: int,
+    step: int,
+    stream: int,
+) -> tuple:
+    # the magnetic and thermal fields of the i-th site. It is the sum of
+    # `magnetic_field` and `thermal_noise_field`, and the noise is skipped at null
+    # temperature, which does not change any other draw.
+    if intensity[i] == 0.0:
+        return magnetic_fields[i, 0], magnetic_fields[i, 1], magnetic_fields[i, 2]
+    gx, gy, gz = gaussian_triplet(seed, step, i, stream)
+    return (
+        magnetic_fields[i, 0] + intensity[i] * gx,
+        magnetic_fields[i, 1] + intensity[i] * gy,
+        magnetic_fields[i, 2] + intensity[i] * gz,
+    )
+
+
+@jit(nopython=True, error_model="numpy")
+def effective_field(
+    state: ndarray[(Any, 3), float],
+    magnitude_spin_moment: ndarray[Any, float],
+    indptr: ndarray[Any, int],
+    indices: ndarray[Any, int],
+    jex: ndarray[Any, float],
+    anisotropy_constants: ndarray[Any, float],
+    anisotropy_vectors: ndarray[(Any, 3), float],
+    magnetic_fields: ndarray[(Any, 3), float],
+    intensity: ndarray[Any, float],
+    seed: int,
+    step: int,
+    out: Optional[ndarray[(Any, 3), float]] = None,
+    stream: int = 0,
+) -> ndarray[(Any, 3), float]:
+    N = len(magnitude_spin_moment)
+    result = out if out is not None else numpy.empty(shape=(N, 3))
+    # the exchange, anisotropy, magnetic and thermal fields in a single sweep
+    for i in prange(N):
+        hx, hy, hz = spin_field_site(
+            i,
+            state,
+            magnitude_spin_moment,
+            indptr,
+            indices,
+            jex,
+            anisotropy_constants,
+            anisotropy_vectors,
+        )
+        ex, ey, ez = external_field_site(
+            i, magnetic_fields, intensity, seed, step, stream
+        )
+        result[i, 0] = hx + ex
+        result[i, 1] = hy + ey
+        result[i, 2] = hz + ez
+    return result
+
+
+# Thread-parallel version of the kernel above. The per-site loop runs over `prange`,
+# which is a plain `range` for the serial version.
+effective_field_parallel = jit(nopython=True, error_model="numpy", parallel=True)(
+    effective_field.py_func
+)
@@ -0,0 +1,96 @@
+from typing import Any, Optional
+
+import numpy
+from numba import jit
+from numpy import ndarray
+
+# Largest value of the octahedral components, which are stored as int16.
+OCTAHEDRAL_SCALE = 32767.0
+
+
+@jit(nopython=True, nogil=True)
+def encode_spherical(
+    state: ndarray[(Any, 3), float],
+    out: Optional[ndarray[(Any, 2), numpy.float32]] = None,
+) -> ndarray[(Any, 2), numpy.float32]:
+    # polar and azimuthal angles of each spin
+    result = (
+        out
+        if out is not None
+        else numpy.empty(shape=(len(state), 2), dtype=numpy.float32)
+    )
+    for i in range(len(state)):
+        sx, sy, sz = state[i, 0], state[i, 1], state[i, 2]
+        result[i, 0] = numpy.arctan2(numpy.sqrt(sx * sx + sy * sy), sz)
+        result[i, 1] = numpy.arctan2(sy, sx)
+    return result
+
+
+@jit(nopython=True, nogil=True)
+def decode_spherical(
+    encoded: ndarray[(Any, 2), numpy.float32],
+    out: Optional[ndarray[(Any, 3), float]] = None,
+) -> ndarray[(Any, 3), float]:
+    result = out if out is not None else numpy.empty(shape=(len(encoded), 3))
+    for i in range(len(encoded)):
+        theta = numpy.float64(encoded[i, 0])
+        phi = numpy.float64(encoded[i, 1])
+        result[i, 0] = numpy.sin(theta) * numpy.cos(phi)
+        result[i, 1] = numpy.sin(theta) * numpy.sin(phi)
+        result[i, 2] = numpy.cos(theta)
+    return result
+
+
+@jit(nopython=True, nogil=True)
+def encode_octahedral(
+    state: ndarray[(Any, 3), float],
+    out: Optional[ndarray[(Any, 2), numpy.int16]] = None,
+) -> ndarray[(Any, 2), numpy.int16]:
+    # the spin is projected on the octahedron |x| + |y| + |z| = 1, and the lower half
+    # is folded over the upper one, so it is a point of the square [-1, 1]^2
+    result = (
+        out
+        if out is not None
+        else numpy.empty(shape=(len(state), 2), dtype=numpy.int16)
+    )
+    for i in range(len(state)):
+        sx, sy, sz = state[i, 0], state[i, 1], state[i, 2]
+        norm = abs(sx) + abs(sy) + abs(sz)
+        if norm == 0.0:
+            # a null spin has no direction, it is kept as the center of the square
+            result[i, 0] = 0
+            result[i, 1] = 0
+            continue
+        u = sx / norm
+        v = sy / norm
+        if sz < 0.0:
+            fold_u = (1.0 - abs(v)) * (1.0 if u >= 0.0 else -1.0)
+            fold_v = (1.0 - abs(u)) * (1.0 if v >= 0.0 else -1.0)
+            u, v = fold_u, fold_v
+        result[i, 0] = numpy.int16(numpy.round(u * OCTAHEDRAL_SCALE))
+        result[i, 1] = numpy.int16(numpy.round(v * OCTAHEDRAL_SCALE))
+    return result
+
+
+@jit(nopython=True, nogil=True)
+def decode_octahedral(
+    encoded: ndarray[(Any, 2), numpy.int16],
+    out: Optional[ndarray[(Any, 3), float]] = None,
+) -> ndarray[(Any, 3), float]:
+    result = out if out is not None else numpy.empty(shape=(len(encoded), 3))
+    for i in range(len(encoded)):
+        u = encoded[i, 0] / OCTAHEDRAL_SCALE
+        v = encoded[i, 1] / OCTAHEDRAL_SCALE
+        sz = 1.0 - abs(u) - abs(v)
+        sx, sy = u, v
+        if sz < 0.0:
+            sx = (1.0 - abs(v)) * (1.0 if u >= 0.0 else -1.0)
+            sy = (1.0 - abs(u)) * (1.0 if v >= 0.0 else -1.0)
+        norm = numpy.sqrt(sx * sx + sy * sy + sz * sz)
+        if norm == 0.0:
+            # the null vector is kept as it is
+            norm = 1.0
+        result[i, 0] = sx / norm
+        result[i, 1] = sy / norm
+        result[i, 2] = sz / norm
+    return result
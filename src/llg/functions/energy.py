@@ -1,6 +1,7 @@
-from typing import Any
+from typing import Any, Optional
 
-from numba import jit
+import numpy
+from numba import jit, prange
 from numpy import ndarray
 
 
@@ -10,13 +11,36 @@ def compute_exchange_energy(
     exchanges: ndarray[(Any, Any), float],
     neighbors: ndarray[(Any, Any), float],
 ) -> float:
-    total = 0
+    total = 0.0
     N = len(state)
-    for i in range(N):
-        state_i = state[i]
-        exchanges_i = exchanges[i]
-        neighbors_i = state[neighbors[i]]
-        total -= (exchanges_i * (state_i * neighbors_i).sum(axis=1)).sum()
+    for i in prange(N):
+        for j in range(neighbors.shape[1]):
+            nhb = neighbors[i, j]
+            total -= exchanges[i, j] * (
+                state[i, 0] * state[nhb, 0]
+                + state[i, 1] * state[nhb, 1]
+                + state[i, 2] * state[nhb, 2]
+            )
+    return 0.5 * total
+
+
+@jit(nopython=True)
+def compute_exchange_energy_csr(
+    state: ndarray[(Any, 3), float],
+    indptr: ndarray[Any, int],
+    indices: ndarray[Any, int],
+    jex: ndarray[Any, float],
+) -> float:
+    total = 0.0
+    N = len(state)
+    for i in prange(N):
+        for link in range(indptr[i], indptr[i + 1]):
+            nhb = indices[link]
+            total -= jex[link] * (
+                state[i, 0] * state[nhb, 0]
+                + state[i, 1] * state[nhb, 1]
+                + state[i, 2] * state[nhb, 2]
+            )
     return 0.5 * total
 
 
@@ -26,7 +50,15 @@ def compute_anisotropy_energy(
     anisotropy_constants: ndarray[Any, float],
     anisotropy_vectors: ndarray[(Any, 3), float],
 ) -> float:
-    return -(anisotropy_constants * (state * anisotropy_vectors).sum(axis=1) ** 2).sum()
+    total = 0.0
+    for i in prange(len(state)):
+        projection = (
+            state[i, 0] * anisotropy_vectors[i, 0]
+            + state[i, 1] * anisotropy_vectors[i, 1]
+            + state[i, 2] * anisotropy_vectors[i, 2]
+        )
+        total -= anisotropy_constants[i] * projection * projection
+    return total
 
 
 @jit(nopython=True)
@@ -35,4 +67,74 @@ def compute_magnetic_energy(
     magnitude_spin_moment: ndarray[Any, float],
     magnetic_fields: ndarray[(Any, 3), float],
 ) -> float:
-    return -(magnitude_spin_moment * (state * magnetic_fields).sum(axis=1)).sum()
+    total = 0.0
+    for i in prange(len(state)):
+        total -= magnitude_spin_moment[i] * (
+            state[i, 0] * magnetic_fields[i, 0]
+            + state[i, 1] * magnetic_fields[i, 1]
+            + state[i, 2] * magnetic_fields[i, 2]
+        )
+    return total
+
+
+@jit(nopython=True)
+def compute_energies(
+    state: ndarray[(Any, 3), float],
+    magnitude_spin_moment: ndarray[Any, float],
+    indptr: ndarray[Any, int],
+    indices: ndarray[Any, int],
+    jex: ndarray[Any, float],
+    anisotropy_constants: ndarray[Any, float],
+    anisotropy_vectors: ndarray[(Any, 3), float],
+    magnetic_fields: ndarray[(Any, 3), float],
+    out: Optional[ndarray[Any, float]] = None,
+) -> ndarray[Any, float]:
+    # the exchange, anisotropy, magnetic, and total energies in a single sweep over
+    # the sites, instead of one sweep per term
+    result = out if out is not None else numpy.empty(shape=4)
+    exchange = 0.0
+    anisotropy = 0.0
+    magnetic = 0.0
+    for i in prange(len(state)):
+        sx = state[i, 0]
+        sy = state[i, 1]
+        sz = state[i, 2]
+        for link in range(indptr[i], indptr[i + 1]):
+            nhb = indices[link]
+            exchange -= jex[link] * (
+                sx * state[nhb, 0] + sy * state[nhb, 1] + sz * state[nhb, 2]
+            )
+        projection = (
+            sx * anisotropy_vectors[i, 0]
+            + sy * anisotropy_vectors[i, 1]
+            + sz * anisotropy_vectors[i, 2]
+        )
+        anisotropy -= anisotropy_constants[i] * projection * projection
+        magnetic -= magnitude_spin_moment[i] * (
+            sx * magnetic_fields[i, 0]
+            + sy * magnetic_fields[i, 1]
+            + sz * magnetic_fields[i, 2]
+        )
+    result[0] = 0.5 * exchange
+    result[1] = anisotropy
+    result[2] = magnetic
+    result[3] = result[0] + result[1] + result[2]
+    return result
+
+
+# Thread-parallel versions of the kernels above. The sums over `prange` are
+# turned into reductions by numba, so the results only differ from the serial
+# ones by the order of the floating-point additions.
+compute_exchange_energy_parallel = jit(nopython=True, parallel=True)(
+    compute_exchange_energy.py_func
+)
+compute_exchange_energy_csr_parallel = jit(nopython=True, parallel=True)(
+    compute_exchange_energy_csr.py_func
+)
+compute_anisotropy_energy_parallel = jit(nopython=True, parallel=True)(
+    compute_anisotropy_energy.py_func
+)
+compute_magnetic_energy_parallel = jit(nopython=True, parallel=True)(
+    compute_magnetic_energy.py_func
+)
+compute_energies_parallel = jit(nopython=True, parallel=True)(compute_energies.py_func)
@@ -1,9 +1,11 @@
-from typing import Any
+from typing import Any, Optional
 
 import numpy
-from numba import jit
+from numba import jit, prange
 from numpy import ndarray
 
+from llg.functions.philox import gaussian_triplet
+
 
 def thermal_field(
     temperature: ndarray[(Any, 3), float],
@@ -12,19 +14,75 @@ def thermal_field(
     deltat: float,
     gyromagnetic: float,
     kB: float,
+    out: Optional[ndarray[(Any, 3), float]] = None,
+    intensity: Optional[ndarray[Any, float]] = None,
 ) -> ndarray[(Any, 3), float]:
+    # the noise is keyed by a seed drawn from the numpy random state, so a seed
+    # gives the same field. The intensities and the field are written into
+    # `intensity` and `out`, so nothing is allocated when both are given.
     N = len(magnitude_spin_moment)
-    gamma = numpy.random.normal(size=(N, 3))
-    values = (2 * damping * kB * temperature) / (
-        gyromagnetic * magnitude_spin_moment * deltat
-    )
-    values = numpy.sqrt(values)
-    values = numpy.repeat(values, 3).reshape((len(values), 3))
-    return gamma * values
+    result = out if out is not None else numpy.empty(shape=(N, 3))
+    values = intensity if intensity is not None else numpy.empty(shape=N)
+    numpy.multiply(temperature, 2 * damping * kB, out=values)
+    numpy.divide(values, magnitude_spin_moment, out=values)
+    numpy.divide(values, gyromagnetic * deltat, out=values)
+    numpy.sqrt(values, out=values)
+    seed = numpy.random.randint(2**63 - 1)
+    return thermal_noise_field(values, seed, 0, result)
+
+
+@jit(nopython=True, error_model="numpy")
+def thermal_intensity(
+    temperature: ndarray[Any, float],
+    magnitude_spin_moment: ndarray[Any, float],
+    damping: float,
+    deltat: float,
+    gyromagnetic: float,
+    kB: float,
+    out: Optional[ndarray[Any, float]] = None,
+) -> ndarray[Any, float]:
+    # the standard deviation of the thermal field of each site, which only changes
+    # with the temperature
+    result = out if out is not None else numpy.empty(shape=len(magnitude_spin_moment))
+    for i in range(len(magnitude_spin_moment)):
+        result[i] = numpy.sqrt(
+            (2 * damping * kB * temperature[i])
+            / (gyromagnetic * magnitude_spin_moment[i] * deltat)
+        )
+    return result
+
+
+@jit(nopython=True, nogil=True)
+def thermal_noise_field(
+    intensity: ndarray[Any, float],
+    seed: int,
+    step: int,
+    out: Optional[ndarray[(Any, 3), float]] = None,
+    stream: int = 0,
+) -> ndarray[(Any, 3), float]:
+    # the noise of each site is a Philox draw keyed by the seed, the step and the
+    # site, so it does not depend on the number of threads or on the order of the
+    # sites
+    result = out if out is not None else numpy.empty(shape=(len(intensity), 3))
+    for i in prange(len(intensity)):
+        gx, gy, gz = gaussian_triplet(seed, step, i, stream)
+        result[i, 0] = intensity[i] * gx
+        result[i, 1] = intensity[i] * gy
+        result[i, 2] = intensity[i] * gz
+    return result
+
+
+thermal_noise_field_parallel = jit(nopython=True, nogil=True, parallel=True)(
+    thermal_noise_field.py_func
+)
 
 
 @jit(nopython=True)
 def magnetic_field(
-    magnetic_fields: ndarray[(Any, 3), float]
+    magnetic_fields: ndarray[(Any, 3), float],
+    out: Optional[ndarray[(Any, 3), float]] = None,
 ) -> ndarray[(Any, 3), float]:
-    return magnetic_fields
+    if out is None:
+        return magnetic_fields
+    out[:] = magnetic_fields
+    return out
@@ -1,35 +1,678 @@
-from typing import Any
+from collections import namedtuple
+from functools import lru_cache
+from typing import Any, Optional
 
 import numpy
-from numba import jit
+from numba import jit, prange
 from numpy import ndarray
 
-from llg.functions.external_fields import magnetic_field, thermal_field
+from llg.functions.effective_field import external_field_site, spin_field_site
+from llg.functions.energy import compute_energies, compute_energies_parallel
+from llg.functions.external_fields import (
+    magnetic_field,
+    thermal_field,
+    thermal_intensity,
+)
 from llg.functions.spin_fields import (
     anisotropy_interaction_field,
-    exchange_interaction_field,
+    anisotropy_interaction_field_parallel,
+    exchange_interaction_field_csr,
+    exchange_interaction_field_csr_parallel,
+)
+
+# Work buffers of the Heun scheme. Each of them has the shape of the state, so
+# a workspace allocated once can be reused by every step of a simulation.
+Workspace = namedtuple(
+    "Workspace", ["Hext", "Heff", "Hspin", "dS", "dS_prime", "state_prime"]
 )
 
 
+def allocate_workspace(num_sites: int, num_replicas: Optional[int] = None) -> Workspace:
+    # the buffers have a leading axis of replicas if `num_replicas` is given
+    shape = (num_sites, 3) if num_replicas is None else (num_replicas, num_sites, 3)
+    return Workspace(*(numpy.empty(shape=shape) for _ in Workspace._fields))
+
+
+@jit(nopython=True)
+def dS_llg_site(
+    sx: float,
+    sy: float,
+    sz: float,
+    hx: float,
+    hy: float,
+    hz: float,
+    damping: float,
+    gyromagnetic: float,
+) -> tuple:
+    alpha = -gyromagnetic / (1 + damping * damping)
+    cross1_x = sy * hz - sz * hy
+    cross1_y = sz * hx - sx * hz
+    cross1_z = sx * hy - sy * hx
+    cross2_x = sy * cross1_z - sz * cross1_y
+    cross2_y = sz * cross1_x - sx * cross1_z
+    cross2_z = sx * cross1_y - sy * cross1_x
+    return (
+        alpha * (cross1_x + damping * cross2_x),
+        alpha * (cross1_y + damping * cross2_y),
+        alpha * (cross1_z + damping * cross2_z),
+    )
+
+
 @jit(nopython=True)
 def dS_llg(
     state: ndarray[(Any, 3), float],
     Heff: ndarray[(Any, 3), float],
     damping: float,
     gyromagnetic: float,
+    out: Optional[ndarray[(Any, 3), float]] = None,
 ) -> ndarray[(Any, 3), float]:
-    alpha = -gyromagnetic / (1 + damping * damping)
-    cross1 = numpy.cross(state, Heff)
-    cross2 = numpy.cross(state, cross1)
-    return alpha * (cross1 + damping * cross2)
+    result = out if out is not None else numpy.empty(shape=state.shape)
+    for i in prange(len(state)):
+        result[i, 0], result[i, 1], result[i, 2] = dS_llg_site(
+            state[i, 0],
+            state[i, 1],
+            state[i, 2],
+            Heff[i, 0],
+            Heff[i, 1],
+            Heff[i, 2],
+            damping,
+            gyromagnetic,
+        )
+    return result
+
+
+@jit(nopython=True, error_model="numpy")
+def normalize(
+    matrix: ndarray[(Any, 3), float], out: Optional[ndarray[(Any, 3), float]] = None
+) -> ndarray[(Any, 3), float]:
+    result = out if out is not None else numpy.empty(shape=matrix.shape)
+    for i in prange(len(matrix)):
+        norm = numpy.sqrt(
+            matrix[i, 0] * matrix[i, 0]
+            + matrix[i, 1] * matrix[i, 1]
+            + matrix[i, 2] * matrix[i, 2]
+        )
+        result[i, 0] = matrix[i, 0] / norm
+        result[i, 1] = matrix[i, 1] / norm
+        result[i, 2] = matrix[i, 2] / norm
+    return result
+
+
+@jit(nopython=True, error_model="numpy")
+def heun_predictor(
+    state: ndarray[(Any, 3), float],
+    Heff: ndarray[(Any, 3), float],
+    Hspin: ndarray[(Any, 3), float],
+    Hext: ndarray[(Any, 3), float],
+    damping: float,
+    deltat: float,
+    gyromagnetic: float,
+    dS: ndarray[(Any, 3), float],
+    state_prime: ndarray[(Any, 3), float],
+) -> ndarray[(Any, 3), float]:
+    # computes dS from the sum of the fields and the normalized state_prime
+    for i in prange(len(state)):
+        dS[i, 0], dS[i, 1], dS[i, 2] = dS_llg_site(
+            state[i, 0],
+            state[i, 1],
+            state[i, 2],
+            Heff[i, 0] + Hspin[i, 0] + Hext[i, 0],
+            Heff[i, 1] + Hspin[i, 1] + Hext[i, 1],
+            Heff[i, 2] + Hspin[i, 2] + Hext[i, 2],
+            damping,
+            gyromagnetic,
+        )
+        x = state[i, 0] + deltat * dS[i, 0]
+        y = state[i, 1] + deltat * dS[i, 1]
+        z = state[i, 2] + deltat * dS[i, 2]
+        norm = numpy.sqrt(x * x + y * y + z * z)
+        state_prime[i, 0] = x / norm
+        state_prime[i, 1] = y / norm
+        state_prime[i, 2] = z / norm
+    return state_prime
+
+
+@jit(nopython=True, error_model="numpy")
+def heun_corrector(
+    state: ndarray[(Any, 3), float],
+    state_prime: ndarray[(Any, 3), float],
+    Heff: ndarray[(Any, 3), float],
+    Hspin: ndarray[(Any, 3), float],
+    Hext: ndarray[(Any, 3), float],
+    dS: ndarray[(Any, 3), float],
+    damping: float,
+    deltat: float,
+    gyromagnetic: float,
+    out: ndarray[(Any, 3), float],
+) -> ndarray[(Any, 3), float]:
+    # computes dS_prime from the fields at state_prime and the normalized new
+    # state. `out` may be `state`, since only the i-th rows are read to write
+    # the i-th row of `out`.
+    for i in prange(len(state)):
+        dS_prime_x, dS_prime_y, dS_prime_z = dS_llg_site(
+            state_prime[i, 0],
+            state_prime[i, 1],
+            state_prime[i, 2],
+            Heff[i, 0] + Hspin[i, 0] + Hext[i, 0],
+            Heff[i, 1] + Hspin[i, 1] + Hext[i, 1],
+            Heff[i, 2] + Hspin[i, 2] + Hext[i, 2],
+            damping,
+            gyromagnetic,
+        )
+        x = state[i, 0] + 0.5 * (dS[i, 0] + dS_prime_x) * deltat
+        y = state[i, 1] + 0.5 * (dS[i, 1] + dS_prime_y) * deltat
+        z = state[i, 2] + 0.5 * (dS[i, 2] + dS_prime_z) * deltat
+        norm = numpy.sqrt(x * x + y * y + z * z)
+        out[i, 0] = x / norm
+        out[i, 1] = y / norm
+        out[i, 2] = z / norm
+    return out
+
+
+@jit(nopython=True, error_model="numpy", inline="always")
+def fused_predictor_site(
+    i: int,
+    state: ndarray[(Any, 3), float],
+    magnitude_spin_moment: ndarray[Any, float],
+    damping: float,
+    deltat: float,
+    gyromagnetic: float,
+    indptr: ndarray[Any, int],
+    indices: ndarray[Any, int],
+    jex: ndarray[Any, float],
+    anisotropy_constants: ndarray[Any, float],
+    anisotropy_vectors: ndarray[(Any, 3), float],
+    magnetic_fields: ndarray[(Any, 3), float],
+    intensity: ndarray[Any, float],
+    seed: int,
+    step: int,
+    stream: int,
+    Hext: ndarray[(Any, 3), float],
+    dS: ndarray[(Any, 3), float],
+    state_prime: ndarray[(Any, 3), float],
+) -> None:
+    # the predictor of the i-th site, with its effective field computed in place.
+    # The external fields are kept in `Hext` for the corrector, so the noise is
+    # drawn once per step.
+    hx, hy, hz = spin_field_site(
+        i,
+        state,
+        magnitude_spin_moment,
+        indptr,
+        indices,
+        jex,
+        anisotropy_constants,
+        anisotropy_vectors,
+    )
+    Hext[i, 0], Hext[i, 1], Hext[i, 2] = external_field_site(
+        i, magnetic_fields, intensity, seed, step, stream
+    )
+    dS[i, 0], dS[i, 1], dS[i, 2] = dS_llg_site(
+        state[i, 0],
+        state[i, 1],
+        state[i, 2],
+        hx + Hext[i, 0],
+        hy + Hext[i, 1],
+        hz + Hext[i, 2],
+        damping,
+        gyromagnetic,
+    )
+    x = state[i, 0] + deltat * dS[i, 0]
+    y = state[i, 1] + deltat * dS[i, 1]
+    z = state[i, 2] + deltat * dS[i, 2]
+    norm = numpy.sqrt(x * x + y * y + z * z)
+    state_prime[i, 0] = x / norm
+    state_prime[i, 1] = y / norm
+    state_prime[i, 2] = z / norm
+
+
+@jit(nopython=True, error_model="numpy", inline="always")
+def fused_corrector_site(
+    i: int,
+    state: ndarray[(Any, 3), float],
+    state_prime: ndarray[(Any, 3), float],
+    magnitude_spin_moment: ndarray[Any, float],
+    damping: float,
+    deltat: float,
+    gyromagnetic: float,
+    indptr: ndarray[Any, int],
+    indices: ndarray[Any, int],
+    jex: ndarray[Any, float],
+    anisotropy_constants: ndarray[Any, float],
+    anisotropy_vectors: ndarray[(Any, 3), float],
+    Hext: ndarray[(Any, 3), float],
+    dS: ndarray[(Any, 3), float],
+    out: ndarray[(Any, 3), float],
+) -> None:
+    # the corrector of the i-th site, with the spin fields at state_prime computed
+    # in place and the external fields of the predictor
+    hx, hy, hz = spin_field_site(
+        i,
+        state_prime,
+        magnitude_spin_moment,
+        indptr,
+        indices,
+        jex,
+        anisotropy_constants,
+        anisotropy_vectors,
+    )
+    dS_prime_x, dS_prime_y, dS_prime_z = dS_llg_site(
+        state_prime[i, 0],
+        state_prime[i, 1],
+        state_prime[i, 2],
+        hx + Hext[i, 0],
+        hy + Hext[i, 1],
+        hz + Hext[i, 2],
+        damping,
+        gyromagnetic,
+    )
+    x = state[i, 0] + 0.5 * (dS[i, 0] + dS_prime_x) * deltat
+    y = state[i, 1] + 0.5 * (dS[i, 1] + dS_prime_y) * deltat
+    z = state[i, 2] + 0.5 * (dS[i, 2] + dS_prime_z) * deltat
+    norm = numpy.sqrt(x * x + y * y + z * z)
+    out[i, 0] = x / norm
+    out[i, 1] = y / norm
+    out[i, 2] = z / norm
+
+
+@jit(nopython=True, error_model="numpy")
+def fused_predictor(
+    state: ndarray[(Any, 3), float],
+    magnitude_spin_moment: ndarray[Any, float],
+    damping: float,
+    deltat: float,
+    gyromagnetic: float,
+    indptr: ndarray[Any, int],
+    indices: ndarray[Any, int],
+    jex: ndarray[Any, float],
+    anisotropy_constants: ndarray[Any, float],
+    anisotropy_vectors: ndarray[(Any, 3), float],
+    magnetic_fields: ndarray[(Any, 3), float],
+    intensity: ndarray[Any, float],
+    seed: int,
+    step: int,
+    Hext: ndarray[(Any, 3), float],
+    dS: ndarray[(Any, 3), float],
+    state_prime: ndarray[(Any, 3), float],
+) -> ndarray[(Any, 3), float]:
+    # `heun_predictor` with the effective field of each site computed in the same
+    # sweep, instead of being read from the field buffers
+    for i in prange(len(state)):
+        fused_predictor_site(
+            i,
+            state,
+            magnitude_spin_moment,
+            damping,
+            deltat,
+            gyromagnetic,
+            indptr,
+            indices,
+            jex,
+            anisotropy_constants,
+            anisotropy_vectors,
+            magnetic_fields,
+            intensity,
+            seed,
+            step,
+            0,
+            Hext,
+            dS,
+            state_prime,
+        )
+    return state_prime
+
+
+@jit(nopython=True, error_model="numpy")
+def fused_corrector(
+    state: ndarray[(Any, 3), float],
+    state_prime: ndarray[(Any, 3), float],
+    magnitude_spin_moment: ndarray[Any, float],
+    damping: float,
+    deltat: float,
+    gyromagnetic: float,
+    indptr: ndarray[Any, int],
+    indices: ndarray[Any, int],
+    jex: ndarray[Any, float],
+    anisotropy_constants: ndarray[Any, float],
+    anisotropy_vectors: ndarray[(Any, 3), float],
+    Hext: ndarray[(Any, 3), float],
+    dS: ndarray[(Any, 3), float],
+    out: ndarray[(Any, 3), float],
+) -> ndarray[(Any, 3), float]:
+    # `heun_corrector` with the spin fields at state_prime computed in the same
+    # sweep, and the external fields of the predictor. `out` may be `state`.
+    for i in prange(len(state)):
+        fused_corrector_site(
+            i,
+            state,
+            state_prime,
+            magnitude_spin_moment,
+            damping,
+            deltat,
+            gyromagnetic,
+            indptr,
+            indices,
+            jex,
+            anisotropy_constants,
+            anisotropy_vectors,
+            Hext,
+            dS,
+            out,
+        )
+    return out
+
+
+@jit(nopython=True, error_model="numpy")
+def fused_predictor_replicas(
+    states: ndarray[(Any, Any, 3), float],
+    magnitude_spin_moment: ndarray[Any, float],
+    damping: float,
+    deltat: float,
+    gyromagnetic: float,
+    indptr: ndarray[Any, int],
+    indices: ndarray[Any, int],
+    jex: ndarray[Any, float],
+    anisotropy_constants: ndarray[Any, float],
+    anisotropy_vectors: ndarray[(Any, 3), float],
+    magnetic_fields: ndarray[(Any, Any, 3), float],
+    intensity: ndarray[(Any, Any), float],
+    seed: int,
+    step: int,
+    Hext: ndarray[(Any, Any, 3), float],
+    dS: ndarray[(Any, Any, 3), float],
+    state_prime: ndarray[(Any, Any, 3), float],
+) -> ndarray[(Any, Any, 3), float]:
+    # `fused_predictor` for several replicas of the state, each one with its own
+    # magnetic fields and thermal intensities, and the noise of the r-th replica is
+    # the r-th stream of the generator. A single loop runs over the replicas and,
+    # inside each replica, over the sites, since a sweep over the sites of a
+    # replica reads contiguous memory, which is faster than loading the neighbors
+    # of a site once for every replica.
+    num_sites = states.shape[1]
+    for k in prange(states.shape[0] * num_sites):
+        r = k // num_sites
+        i = k - r * num_sites
+        fused_predictor_site(
+            i,
+            states[r],
+            magnitude_spin_moment,
+            damping,
+            deltat,
+            gyromagnetic,
+            indptr,
+            indices,
+            jex,
+            anisotropy_constants,
+            anisotropy_vectors,
+            magnetic_fields[r],
+            intensity[r],
+            seed,
+            step,
+            r,
+            Hext[r],
+            dS[r],
+            state_prime[r],
+        )
+    return state_prime
+
+
+@jit(nopython=True, error_model="numpy")
+def fused_corrector_replicas(
+    states: ndarray[(Any, Any, 3), float],
+    state_prime: ndarray[(Any, Any, 3), float],
+    magnitude_spin_moment: ndarray[Any, float],
+    damping: float,
+    deltat: float,
+    gyromagnetic: float,
+    indptr: ndarray[Any, int],
+    indices: ndarray[Any, int],
+    jex: ndarray[Any, float],
+    anisotropy_constants: ndarray[Any, float],
+    anisotropy_vectors: ndarray[(Any, 3), float],
+    Hext: ndarray[(Any, Any, 3), float],
+    dS: ndarray[(Any, Any, 3), float],
+    out: ndarray[(Any, Any, 3), float],
+) -> ndarray[(Any, Any, 3), float]:
+    # `fused_corrector` for several replicas of the state. `out` may be `states`.
+    num_sites = states.shape[1]
+    for k in prange(states.shape[0] * num_sites):
+        r = k // num_sites
+        i = k - r * num_sites
+        fused_corrector_site(
+            i,
+            states[r],
+            state_prime[r],
+            magnitude_spin_moment,
+            damping,
+            deltat,
+            gyromagnetic,
+            indptr,
+            indices,
+            jex,
+            anisotropy_constants,
+            anisotropy_vectors,
+            Hext[r],
+            dS[r],
+            out[r],
+        )
+    return out
+
+
+# Thread-parallel versions of the kernels above. The per-site loops run over
+# `prange`, which is a plain `range` for the serial versions.
+dS_llg_parallel = jit(nopython=True, parallel=True)(dS_llg.py_func)
+normalize_parallel = jit(nopython=True, error_model="numpy", parallel=True)(
+    normalize.py_func
+)
+heun_predictor_parallel = jit(nopython=True, error_model="numpy", parallel=True)(
+    heun_predictor.py_func
+)
+heun_corrector_parallel = jit(nopython=True, error_model="numpy", parallel=True)(
+    heun_corrector.py_func
+)
+fused_predictor_parallel = jit(nopython=True, error_model="numpy", parallel=True)(
+    fused_predictor.py_func
+)
+fused_corrector_parallel = jit(nopython=True, error_model="numpy", parallel=True)(
+    fused_corrector.py_func
+)
+fused_predictor_replicas_parallel = jit(
+    nopython=True, error_model="numpy", parallel=True
+)(fused_predictor_replicas.py_func)
+fused_corrector_replicas_parallel = jit(
+    nopython=True, error_model="numpy", parallel=True
+)(fused_corrector_replicas.py_func)
+
+
+@jit(nopython=True)
+def spin_fields(
+    state: ndarray[(Any, 3), float],
+    magnitude_spin_moment: ndarray[Any, float],
+    indptr: ndarray[Any, int],
+    indices: ndarray[Any, int],
+    jex: ndarray[Any, float],
+    anisotropy_constants: ndarray[Any, float],
+    anisotropy_vectors: ndarray[(Any, 3), float],
+    workspace: Workspace,
+    parallel: bool,
+) -> None:
+    # writes the exchange field in `workspace.Heff` and the anisotropy field
+    # in `workspace.Hspin`
+    if parallel:
+        exchange_interaction_field_csr_parallel(
+            state, magnitude_spin_moment, indptr, indices, jex, workspace.Heff
+        )
+        anisotropy_interaction_field_parallel(
+            state,
+            magnitude_spin_moment,
+            anisotropy_constants,
+            anisotropy_vectors,
+            workspace.Hspin,
+        )
+    else:
+        exchange_interaction_field_csr(
+            state, magnitude_spin_moment, indptr, indices, jex, workspace.Heff
+        )
+        anisotropy_interaction_field(
+            state,
+            magnitude_spin_moment,
+            anisotropy_constants,
+            anisotropy_vectors,
+            workspace.Hspin,
+        )
 
 
 @jit(nopython=True)
-def normalize(matrix: ndarray[(Any, 3), float]) -> ndarray[(Any, 3), float]:
-    norms = numpy.sqrt((matrix * matrix).sum(axis=1))
-    norms_repeated = numpy.repeat(norms, 3)
-    norms_repeated_reshaped = norms_repeated.reshape((len(norms), 3))
-    return matrix / norms_repeated_reshaped
+def heun_step(
+    state: ndarray[(Any, 3), float],
+    Hext: ndarray[(Any, 3), float],
+    magnitude_spin_moment: ndarray[Any, float],
+    damping: float,
+    deltat: float,
+    gyromagnetic: float,
+    indptr: ndarray[Any, int],
+    indices: ndarray[Any, int],
+    jex: ndarray[Any, float],
+    anisotropy_constants: ndarray[Any, float],
+    anisotropy_vectors: ndarray[(Any, 3), float],
+    workspace: Workspace,
+    out: ndarray[(Any, 3), float],
+    parallel: bool = False,
+) -> ndarray[(Any, 3), float]:
+    # Every intermediate result is written into the workspace buffers, and
+    # `out` may be `state` itself. The neighbors are given in CSR layout.
+
+    # predictor step. The effective field is the sum of the external fields
+    # and the spin fields.
+    spin_fields(
+        state,
+        magnitude_spin_moment,
+        indptr,
+        indices,
+        jex,
+        anisotropy_constants,
+        anisotropy_vectors,
+        workspace,
+        parallel,
+    )
+    predictor_arguments = (
+        state,
+        workspace.Heff,
+        workspace.Hspin,
+        Hext,
+        damping,
+        deltat,
+        gyromagnetic,
+        workspace.dS,
+        workspace.state_prime,
+    )
+    if parallel:
+        heun_predictor_parallel(*predictor_arguments)
+    else:
+        heun_predictor(*predictor_arguments)
+
+    # corrector step. The effective field is evaluated at state_prime.
+    spin_fields(
+        workspace.state_prime,
+        magnitude_spin_moment,
+        indptr,
+        indices,
+        jex,
+        anisotropy_constants,
+        anisotropy_vectors,
+        workspace,
+        parallel,
+    )
+    corrector_arguments = (
+        state,
+        workspace.state_prime,
+        workspace.Heff,
+        workspace.Hspin,
+        Hext,
+        workspace.dS,
+        damping,
+        deltat,
+        gyromagnetic,
+        out,
+    )
+    if parallel:
+        return heun_corrector_parallel(*corrector_arguments)
+    return heun_corrector(*corrector_arguments)
+
+
+@jit(nopython=True)
+def fused_step(
+    state: ndarray[(Any, 3), float],
+    magnitude_spin_moment: ndarray[Any, float],
+    damping: float,
+    deltat: float,
+    gyromagnetic: float,
+    indptr: ndarray[Any, int],
+    indices: ndarray[Any, int],
+    jex: ndarray[Any, float],
+    anisotropy_constants: ndarray[Any, float],
+    anisotropy_vectors: ndarray[(Any, 3), float],
+    magnetic_fields: ndarray[(Any, 3), float],
+    intensity: ndarray[Any, float],
+    seed: int,
+    step: int,
+    workspace: Workspace,
+    out: ndarray[(Any, 3), float],
+    parallel: bool = False,
+) -> ndarray[(Any, 3), float]:
+    # a Heun step with a single sweep over the sites for the predictor and another
+    # for the corrector. Only `workspace.Hext`, `workspace.dS` and
+    # `workspace.state_prime` are used, and `out` may be `state`.
+    predictor_arguments = (
+        state,
+        magnitude_spin_moment,
+        damping,
+        deltat,
+        gyromagnetic,
+        indptr,
+        indices,
+        jex,
+        anisotropy_constants,
+        anisotropy_vectors,
+        magnetic_fields,
+        intensity,
+        seed,
+        step,
+        workspace.Hext,
+        workspace.dS,
+        workspace.state_prime,
+    )
+    if parallel:
+        fused_predictor_parallel(*predictor_arguments)
+    else:
+        fused_predictor(*predictor_arguments)
+
+    corrector_arguments = (
+        state,
+        workspace.state_prime,
+        magnitude_spin_moment,
+        damping,
+        deltat,
+        gyromagnetic,
+        indptr,
+        indices,
+        jex,
+        anisotropy_constants,
+        anisotropy_vectors,
+        workspace.Hext,
+        workspace.dS,
+        out,
+    )
+    if parallel:
+        return fused_corrector_parallel(*corrector_arguments)
+    return fused_corrector(*corrector_arguments)
+
+
+@lru_cache(maxsize=8)
+def rectangular_indptr(num_sites: int, num_neighbors: int) -> ndarray[Any, int]:
+    # the row pointers of a CSR layout with a constant row length, which are kept
+    # for the next steps
+    return numpy.arange(0, num_sites * num_neighbors + 1, num_neighbors)
 
 
 def integrate(
@@ -45,50 +688,255 @@ def integrate(
     neighbors: ndarray[(Any, Any), float],
     anisotropy_constants: ndarray[Any, float],
     anisotropy_vectors: ndarray[(Any, 3), float],
-) -> float:
+    workspace: Optional[Workspace] = None,
+    out: Optional[ndarray[(Any, 3), float]] = None,
+    parallel: bool = False,
+) -> ndarray[(Any, 3), float]:
+    result = out if out is not None else numpy.empty(shape=(len(state), 3))
+
     # compute external fields. These fields does not change
     # because they don't depend on the state
+    if workspace is None:
+        workspace = allocate_workspace(len(state))
+    # `dS` is only written by the step, so a column of it holds the intensities
     Hext = thermal_field(
-        temperature, magnitude_spin_moment, damping, deltat, gyromagnetic, kB
+        temperature,
+        magnitude_spin_moment,
+        damping,
+        deltat,
+        gyromagnetic,
+        kB,
+        workspace.Hext,
+        workspace.dS[:, 0],
     )
     Hext += magnetic_field(magnetic_fields)
 
-    # predictor step
-
-    # compute the effective field as the sum of external fields and
-    # spin fields
-    Heff = Hext + exchange_interaction_field(
-        state, magnitude_spin_moment, exchanges, neighbors
-    )
-    Heff = Heff + anisotropy_interaction_field(
-        state, magnitude_spin_moment, anisotropy_constants, anisotropy_vectors
+    # the rectangular neighbors are a CSR layout with a constant row length. The
+    # views of contiguous float arrays are not copied.
+    num_sites, num_neighbors = neighbors.shape
+    return heun_step(
+        state,
+        Hext,
+        magnitude_spin_moment,
+        damping,
+        deltat,
+        gyromagnetic,
+        rectangular_indptr(num_sites, num_neighbors),
+        neighbors.ravel(),
+        exchanges.ravel().astype(float, copy=False),
+        anisotropy_constants,
+        anisotropy_vectors,
+        workspace,
+        result,
+        parallel,
     )
 
-    # compute dS based on the LLG equation
-    dS = dS_llg(state, Heff, damping, gyromagnetic)
 
-    # compute the state_prime
-    state_prime = state + deltat * dS
+@jit(nopython=True, nogil=True)
+def integrate_n(
+    state: ndarray[(Any, 3), float],
+    magnitude_spin_moment: ndarray[Any, float],
+    temperature: ndarray[Any, float],
+    damping: float,
+    deltat: float,
+    gyromagnetic: float,
+    kB: float,
+    magnetic_fields: ndarray[(Any, 3), float],
+    indptr: ndarray[Any, int],
+    indices: ndarray[Any, int],
+    jex: ndarray[Any, float],
+    anisotropy_constants: ndarray[Any, float],
+    anisotropy_vectors: ndarray[(Any, 3), float],
+    num_steps: int,
+    workspace: Optional[Workspace] = None,
+    out: Optional[ndarray[(Any, 3), float]] = None,
+    parallel: bool = False,
+    seed: int = 0,
+    step: int = 0,
+    intensity: Optional[ndarray[Any, float]] = None,
+    energies: Optional[ndarray[Any, float]] = None,
+) -> ndarray[(Any, 3), float]:
+    # advances `num_steps` fused Heun steps without going back to the interpreter,
+    # and the neighbors are given in CSR layout. The thermal noise of the k-th
+    # step is keyed by `seed` and `step + k`, so a run split in several calls gives
+    # the same trajectory, with any number of threads. `intensity` is the output of
+    # `thermal_intensity`, which only has to be computed once per temperature. If
+    # `energies` is given, the exchange, anisotropy, magnetic, and total energies of
+    # the final state are written in it, from a single sweep over the sites.
+    N = len(magnitude_spin_moment)
+    if workspace is None:
+        workspace = Workspace(
+            numpy.empty(shape=(N, 3)),
+            numpy.empty(shape=(N, 3)),
+            numpy.empty(shape=(N, 3)),
+            numpy.empty(shape=(N, 3)),
+            numpy.empty(shape=(N, 3)),
+            numpy.empty(shape=(N, 3)),
+        )
+    result = out if out is not None else numpy.empty(shape=state.shape)
+    result[:] = state
 
-    # normalize state_prime
-    state_prime = normalize(state_prime)
+    if intensity is None:
+        intensity = thermal_intensity(
+            temperature, magnitude_spin_moment, damping, deltat, gyromagnetic, kB
+        )
 
-    # corrector step
+    for k in range(num_steps):
+        fused_step(
+            result,
+            magnitude_spin_moment,
+            damping,
+            deltat,
+            gyromagnetic,
+            indptr,
+            indices,
+            jex,
+            anisotropy_constants,
+            anisotropy_vectors,
+            magnetic_fields,
+            intensity,
+            seed,
+            step + k,
+            workspace,
+            result,
+            parallel,
+        )
 
-    # compute the effective field prime by using the state_prime. We
-    # use the Heff variable for this in order to reutilize the memory.
-    Heff = Hext + exchange_interaction_field(
-        state_prime, magnitude_spin_moment, exchanges, neighbors
-    )
-    Heff = Heff + anisotropy_interaction_field(
-        state_prime, magnitude_spin_moment, anisotropy_constants, anisotropy_vectors
-    )
+    if energies is not None:
+        energy_arguments = (
+            result,
+            magnitude_spin_moment,
+            indptr,
+            indices,
+            jex,
+            anisotropy_constants,
+            anisotropy_vectors,
+            magnetic_fields,
+            energies,
+        )
+        if parallel:
+            compute_energies_parallel(*energy_arguments)
+        else:
+            compute_energies(*energy_arguments)
+
+    return result
+
+
+@jit(nopython=True, nogil=True)
+def integrate_replicas_n(
+    states: ndarray[(Any, Any, 3), float],
+    magnitude_spin_moment: ndarray[Any, float],
+    temperature: ndarray[(Any, Any), float],
+    damping: float,
+    deltat: float,
+    gyromagnetic: float,
+    kB: float,
+    magnetic_fields: ndarray[(Any, Any, 3), float],
+    indptr: ndarray[Any, int],
+    indices: ndarray[Any, int],
+    jex: ndarray[Any, float],
+    anisotropy_constants: ndarray[Any, float],
+    anisotropy_vectors: ndarray[(Any, 3), float],
+    num_steps: int,
+    workspace: Optional[Workspace] = None,
+    out: Optional[ndarray[(Any, Any, 3), float]] = None,
+    parallel: bool = False,
+    seed: int = 0,
+    step: int = 0,
+    intensity: Optional[ndarray[(Any, Any), float]] = None,
+    energies: Optional[ndarray[(Any, 4), float]] = None,
+) -> ndarray[(Any, Any, 3), float]:
+    # `integrate_n` for R independent replicas of the state, given as a (R, N, 3)
+    # tensor, which share the geometry. The temperatures, the magnetic fields and
+    # the intensities have a leading axis of replicas, so the replicas may be at
+    # different temperatures. The noise of the r-th replica is the r-th stream of
+    # the generator, so the first replica follows the trajectory of `integrate_n`.
+    # The workspace is given by `allocate_workspace(N, R)`, and the energies of
+    # each replica are written in the rows of `energies`.
+    if workspace is None:
+        workspace = Workspace(
+            numpy.empty(shape=states.shape),
+            numpy.empty(shape=states.shape),
+            numpy.empty(shape=states.shape),
+            numpy.empty(shape=states.shape),
+            numpy.empty(shape=states.shape),
+            numpy.empty(shape=states.shape),
+        )
+    result = out if out is not None else numpy.empty(shape=states.shape)
+    result[:] = states
+
+    if intensity is None:
+        intensity = numpy.empty(shape=temperature.shape)
+        for r in range(len(temperature)):
+            thermal_intensity(
+                temperature[r],
+                magnitude_spin_moment,
+                damping,
+                deltat,
+                gyromagnetic,
+                kB,
+                intensity[r],
+            )
 
-    # compute dS_prime employing the Heff prime and the state_prime
-    dS_prime = dS_llg(state_prime, Heff, damping, gyromagnetic)
+    for k in range(num_steps):
+        predictor_arguments = (
+            result,
+            magnitude_spin_moment,
+            damping,
+            deltat,
+            gyromagnetic,
+            indptr,
+            indices,
+            jex,
+            anisotropy_constants,
+            anisotropy_vectors,
+            magnetic_fields,
+            intensity,
+            seed,
+            step + k,
+            workspace.Hext,
+            workspace.dS,
+            workspace.state_prime,
+        )
+        corrector_arguments = (
+            result,
+            workspace.state_prime,
+            magnitude_spin_moment,
+            damping,
+            deltat,
+            gyromagnetic,
+            indptr,
+            indices,
+            jex,
+            anisotropy_constants,
+            anisotropy_vectors,
+            workspace.Hext,
+            workspace.dS,
+            result,
+        )
+        if parallel:
+            fused_predictor_replicas_parallel(*predictor_arguments)
+            fused_corrector_replicas_parallel(*corrector_arguments)
+        else:
+            fused_predictor_replicas(*predictor_arguments)
+            fused_corrector_replicas(*corrector_arguments)
 
-    # compute the new state
-    integrate = state + 0.5 * (dS + dS_prime) * deltat
+    if energies is not None:
+        for r in range(len(result)):
+            energy_arguments = (
+                result[r],
+                magnitude_spin_moment,
+                indptr,
+                indices,
+                jex,
+                anisotropy_constants,
+                anisotropy_vectors,
+                magnetic_fields[r],
+                energies[r],
+            )
+            if parallel:
+                compute_energies_parallel(*energy_arguments)
+            else:
+                compute_energies(*energy_arguments)
 
-    # normalize the new state
-    return normalize(integrate)
+    return result
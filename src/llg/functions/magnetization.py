@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Optional
 
 import numpy
 from numba import jit
@@ -6,19 +6,42 @@ from numpy import ndarray
 
 
 @jit(nopython=True)
-def magnetization_vector(state: ndarray[(Any, 3), float]) -> ndarray[(Any, 3), float]:
-    return state.sum(axis=0) / len(state)
+def magnetization_vector(
+    state: ndarray[(Any, 3), float], out: Optional[ndarray[Any, float]] = None
+) -> ndarray[(Any, 3), float]:
+    result = out if out is not None else numpy.empty(shape=3)
+    result[:] = 0.0
+    for i in range(len(state)):
+        result[0] += state[i, 0]
+        result[1] += state[i, 1]
+        result[2] += state[i, 2]
+    result /= len(state)
+    return result
 
 
-@jit(nopython=True)
+@jit(nopython=True, error_model="numpy")
 def magnetization_vector_by_type(
-    state: ndarray[(Any, 3), float], num_types: int, types: ndarray[Any, float]
+    state: ndarray[(Any, 3), float],
+    num_types: int,
+    types: ndarray[Any, float],
+    out: Optional[ndarray[(Any, 3), float]] = None,
 ) -> ndarray[(Any, Any, 3), float]:
-    out = numpy.zeros(shape=(num_types, 3))
+    result = out if out is not None else numpy.empty(shape=(num_types, 3))
+    result[:] = 0.0
+    counts = numpy.zeros(shape=num_types)
+    for i in range(len(state)):
+        t = int(types[i])
+        if t < 0 or t >= num_types:
+            continue
+        result[t, 0] += state[i, 0]
+        result[t, 1] += state[i, 1]
+        result[t, 2] += state[i, 2]
+        counts[t] += 1
     for t in range(num_types):
-        mask = types == t
-        out[t] = state[mask].sum(axis=0) / numpy.sum(mask)
-    return out
+        result[t, 0] /= counts[t]
+        result[t, 1] /= counts[t]
+        result[t, 2] /= counts[t]
+    return result
 
 
 @jit(nopython=True)
@@ -30,7 +53,13 @@ def total_magnetization(state: ndarray[(Any, 3), float]) -> float:
 
 @jit(nopython=True)
 def magnetization_by_type(
-    state: ndarray[(Any, 3), float], num_types: int, types: ndarray[Any, float]
+    state: ndarray[(Any, 3), float],
+    num_types: int,
+    types: ndarray[Any, float],
+    out: Optional[ndarray[Any, float]] = None,
 ) -> ndarray[Any, float]:
+    result = out if out is not None else numpy.empty(shape=num_types)
     mag = magnetization_vector_by_type(state, num_types, types)
-    return numpy.sqrt((mag * mag).sum(axis=1))
+    for t in range(num_types):
+        result[t] = numpy.sqrt(mag[t, 0] ** 2 + mag[t, 1] ** 2 + mag[t, 2] ** 2)
+    return result
@@ -0,0 +1,128 @@
+from typing import Any, Callable, Optional, Union
+
+import numpy
+from numba import jit
+from numpy import ndarray
+
+from llg.geometry import Links
+
+
+@jit(nopython=True)
+def search_cells(
+    positions: ndarray[(Any, 3), float],
+    cells: ndarray[(Any, 3), int],
+    cell_start: ndarray[Any, int],
+    cell_sites: ndarray[Any, int],
+    num_cells: ndarray[Any, int],
+    box: ndarray[(3, 3), float],
+    periodic: bool,
+    cutoff: float,
+    indptr: Optional[ndarray[Any, int]] = None,
+    indices: Optional[ndarray[Any, int]] = None,
+    distances: Optional[ndarray[Any, float]] = None,
+) -> ndarray[Any, int]:
+    # without indptr it only counts the neighbors of each site
+    cutoff2 = cutoff * cutoff
+    counts = numpy.zeros(len(positions), dtype=numpy.int64)
+    for i in range(len(positions)):
+        for dx in range(-1, 2):
+            for dy in range(-1, 2):
+                for dz in range(-1, 2):
+                    cx = cells[i, 0] + dx
+                    cy = cells[i, 1] + dy
+                    cz = cells[i, 2] + dz
+                    # the image of the box where the neighbor cell is. With less
+                    # than three cells along an axis, the same cell is visited in
+                    # different images
+                    sx = cx // num_cells[0]
+                    sy = cy // num_cells[1]
+                    sz = cz // num_cells[2]
+                    if not periodic and (sx != 0 or sy != 0 or sz != 0):
+                        continue
+                    cell = (
+                        (cx - sx * num_cells[0]) * num_cells[1]
+                        + (cy - sy * num_cells[1])
+                    ) * num_cells[2] + (cz - sz * num_cells[2])
+                    shift_x = sx * box[0, 0] + sy * box[1, 0] + sz * box[2, 0]
+                    shift_y = sx * box[0, 1] + sy * box[1, 1] + sz * box[2, 1]
+                    shift_z = sx * box[0, 2] + sy * box[1, 2] + sz * box[2, 2]
+                    for n in range(cell_start[cell], cell_start[cell + 1]):
+                        j = cell_sites[n]
+                        if i == j and sx == 0 and sy == 0 and sz == 0:
+                            continue
+                        rx = positions[j, 0] + shift_x - positions[i, 0]
+                        ry = positions[j, 1] + shift_y - positions[i, 1]
+                        rz = positions[j, 2] + shift_z - positions[i, 2]
+                        r2 = rx * rx + ry * ry + rz * rz
+                        if r2 > cutoff2:
+                            continue
+                        if (
+                            indptr is not None
+                            and indices is not None
+                            and distances is not None
+                        ):
+                            k = indptr[i] + counts[i]
+                            indices[k] = j
+                            distances[k] = numpy.sqrt(r2)
+                        counts[i] += 1
+    return counts
+
+
+def find_neighbors(
+    positions: ndarray[(Any, 3), float],
+    cutoff: float,
+    box: Optional[ndarray[(3, 3), float]] = None,
+    jex: Union[float, Callable] = 1.0,
+) -> Links:
+    # the sites are binned in cells at least as wide as the cutoff, so the neighbors
+    # of a site are in its cell or in the 26 cells around it
+    points = numpy.ascontiguousarray(positions, dtype=float).reshape(-1, 3)
+    num_sites = len(points)
+    periodic = box is not None
+
+    if periodic:
+        vectors = numpy.asarray(box, dtype=float).reshape(3, 3)
+        fractional = points @ numpy.linalg.inv(vectors)
+        # the sites are wrapped into the box
+        images = numpy.floor(fractional)
+        points = points - images @ vectors
+        fractional -= images
+        widths = abs(numpy.linalg.det(vectors)) / numpy.linalg.norm(
+            numpy.cross(vectors[[1, 2, 0]], vectors[[2, 0, 1]]), axis=1
+        )
+        if widths.min() < cutoff:
+            raise Exception("The cutoff can not be larger than the width of the box.")
+    else:
+        lower = points.min(axis=0) if num_sites else numpy.zeros(3)
+        widths = (points.max(axis=0) - lower) if num_sites else numpy.zeros(3)
+        fractional = (points - lower) / numpy.where(widths > 0, widths, 1.0)
+        vectors = numpy.zeros((3, 3))
+
+    num_cells = numpy.maximum(numpy.floor(widths / cutoff), 1).astype(numpy.int64)
+    # sparse sites do not need more cells than sites
+    while numpy.prod(num_cells) > max(num_sites, 1) and num_cells.max() > 1:
+        num_cells = numpy.maximum(num_cells // 2, 1)
+
+    cells = numpy.minimum((fractional * num_cells).astype(numpy.int64), num_cells - 1)
+    cell = numpy.ravel_multi_index(cells.T, num_cells)
+    cell_sites = numpy.argsort(cell, kind="stable")
+    cell_start = numpy.zeros(numpy.prod(num_cells) + 1, dtype=numpy.int64)
+    numpy.cumsum(
+        numpy.bincount(cell, minlength=len(cell_start) - 1), out=cell_start[1:]
+    )
+
+    arguments = (points, cells, cell_start, cell_sites, num_cells, vectors, periodic)
+    counts = search_cells(*arguments, float(cutoff))
+    indptr = numpy.zeros(num_sites + 1, dtype=numpy.int64)
+    numpy.cumsum(counts, out=indptr[1:])
+    indices = numpy.empty(indptr[-1], dtype=numpy.int64)
+    distances = numpy.empty(indptr[-1])
+    search_cells(*arguments, float(cutoff), indptr, indices, distances)
+
+    if callable(jex):
+        jex = jex(distances)
+    return Links(
+        source=numpy.repeat(numpy.arange(num_sites, dtype=numpy.int64), counts),
+        target=indices,
+        jex=numpy.broadcast_to(numpy.asarray(jex, dtype=float), indices.shape).copy(),
+    )
@@ -0,0 +1,73 @@
+from typing import Tuple, Union
+
+import numpy
+from numba import jit
+
+# Philox4x32-10, the counter-based generator of Salmon et al. (2011). Every call
+# maps a counter of four 32-bit words and a key of two words to four random words,
+# so the noise of a site at a step is computed from the seed, the step and the site
+# alone, in any order and on any thread.
+PHILOX_M0 = numpy.uint64(0xD2511F53)
+PHILOX_M1 = numpy.uint64(0xCD9E8D57)
+PHILOX_W0 = numpy.uint64(0x9E3779B9)
+PHILOX_W1 = numpy.uint64(0xBB67AE85)
+PHILOX_ROUNDS = 10
+MASK32 = numpy.uint64(0xFFFFFFFF)
+SHIFT32 = numpy.uint64(32)
+
+# 2^-32, which maps a 32-bit word to [0, 1)
+TO_UNIT = 2.3283064365386963e-10
+
+# a word of the counter or the key
+Word = Union[int, numpy.uint64]
+
+
+@jit(nopython=True, nogil=True)
+def philox4x32(
+    c0: Word, c1: Word, c2: Word, c3: Word, k0: Word, k1: Word
+) -> Tuple[numpy.uint64, numpy.uint64, numpy.uint64, numpy.uint64]:
+    # the words are kept in the low halves of unsigned 64-bit integers
+    x0 = numpy.uint64(c0) & MASK32
+    x1 = numpy.uint64(c1) & MASK32
+    x2 = numpy.uint64(c2) & MASK32
+    x3 = numpy.uint64(c3) & MASK32
+    key0 = numpy.uint64(k0) & MASK32
+    key1 = numpy.uint64(k1) & MASK32
+    for _ in range(PHILOX_ROUNDS):
+        product0 = PHILOX_M0 * x0
+        product1 = PHILOX_M1 * x2
+        x0, x1, x2, x3 = (
+            (product1 >> SHIFT32) ^ x1 ^ key0,
+            product1 & MASK32,
+            (product0 >> SHIFT32) ^ x3 ^ key1,
+            product0 & MASK32,
+        )
+        key0 = (key0 + PHILOX_W0) & MASK32
+        key1 = (key1 + PHILOX_W1) & MASK32
+    return x0, x1, x2, x3
+
+
+@jit(nopython=True, nogil=True)
+def gaussian_triplet(seed: int, step: int, site: int, stream: int = 0) -> tuple:
+    # three standard normal numbers for the site at the step, from the Box-Muller
+    # transform of the four words of a single Philox call
+    seed64 = numpy.uint64(seed)
+    step64 = numpy.uint64(step)
+    x0, x1, x2, x3 = philox4x32(
+        site,
+        step64 & MASK32,
+        step64 >> SHIFT32,
+        stream,
+        seed64 & MASK32,
+        seed64 >> SHIFT32,
+    )
+    # the first uniform is in (0, 1], so its logarithm is finite
+    radius0 = numpy.sqrt(-2.0 * numpy.log((numpy.float64(x0) + 1.0) * TO_UNIT))
+    angle0 = 2.0 * numpy.pi * numpy.float64(x1) * TO_UNIT
+    radius1 = numpy.sqrt(-2.0 * numpy.log((numpy.float64(x2) + 1.0) * TO_UNIT))
+    angle1 = 2.0 * numpy.pi * numpy.float64(x3) * TO_UNIT
+    return (
+        radius0 * numpy.cos(angle0),
+        radius0 * numpy.sin(angle0),
+        radius1 * numpy.cos(angle1),
+    )
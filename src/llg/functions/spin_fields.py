@@ -1,44 +1,93 @@
-from typing import Any
+from typing import Any, Optional
 
 import numpy
-from numba import jit
+from numba import jit, prange
 from numpy import ndarray
 
 
-@jit(nopython=True)
+@jit(nopython=True, error_model="numpy")
 def exchange_interaction_field(
     state: ndarray[(Any, 3), float],
     magnitude_spin_moment: ndarray[Any, float],
     exchanges: ndarray[(Any, Any), float],
     neighbors: ndarray[(Any, Any), float],
+    out: Optional[ndarray[(Any, 3), float]] = None,
 ) -> ndarray[(Any, 3), float]:
     N = len(magnitude_spin_moment)
-    out = numpy.zeros(shape=(N, 3))
-    for i in range(N):
-        exchanges_i = exchanges[i]
-        exchanges_i_repeated = numpy.repeat(exchanges_i, 3)
-        exchanges_i_repeated_reshaped = exchanges_i_repeated.reshape(
-            (len(exchanges_i), 3)
-        )
-        neighbors_i = state[neighbors[i]]
-        out[i] = (exchanges_i_repeated_reshaped * neighbors_i).sum(
-            axis=0
-        ) / magnitude_spin_moment[i]
-    return out
+    result = out if out is not None else numpy.empty(shape=(N, 3))
+    for i in prange(N):
+        field_x = 0.0
+        field_y = 0.0
+        field_z = 0.0
+        for j in range(neighbors.shape[1]):
+            jex = exchanges[i, j]
+            nhb = neighbors[i, j]
+            field_x += jex * state[nhb, 0]
+            field_y += jex * state[nhb, 1]
+            field_z += jex * state[nhb, 2]
+        result[i, 0] = field_x / magnitude_spin_moment[i]
+        result[i, 1] = field_y / magnitude_spin_moment[i]
+        result[i, 2] = field_z / magnitude_spin_moment[i]
+    return result
+
 
+@jit(nopython=True, error_model="numpy")
+def exchange_interaction_field_csr(
+    state: ndarray[(Any, 3), float],
+    magnitude_spin_moment: ndarray[Any, float],
+    indptr: ndarray[Any, int],
+    indices: ndarray[Any, int],
+    jex: ndarray[Any, float],
+    out: Optional[ndarray[(Any, 3), float]] = None,
+) -> ndarray[(Any, 3), float]:
+    N = len(magnitude_spin_moment)
+    result = out if out is not None else numpy.empty(shape=(N, 3))
+    for i in prange(N):
+        field_x = 0.0
+        field_y = 0.0
+        field_z = 0.0
+        for link in range(indptr[i], indptr[i + 1]):
+            nhb = indices[link]
+            field_x += jex[link] * state[nhb, 0]
+            field_y += jex[link] * state[nhb, 1]
+            field_z += jex[link] * state[nhb, 2]
+        result[i, 0] = field_x / magnitude_spin_moment[i]
+        result[i, 1] = field_y / magnitude_spin_moment[i]
+        result[i, 2] = field_z / magnitude_spin_moment[i]
+    return result
 
-@jit(nopython=True)
+
+@jit(nopython=True, error_model="numpy")
 def anisotropy_interaction_field(
     state: ndarray[(Any, 3), float],
     magnitude_spin_moment: ndarray[Any, float],
     anisotropy_constants: ndarray[Any, float],
     anisotropy_vectors: ndarray[(Any, 3), float],
+    out: Optional[ndarray[(Any, 3), float]] = None,
 ) -> ndarray[(Any, 3), float]:
-    values = (
-        anisotropy_constants
-        * (state * anisotropy_vectors).sum(axis=1)
-        / magnitude_spin_moment
-    )
-    values_repeated = numpy.repeat(values, 3)
-    values_repeated_reshaped = values_repeated.reshape((len(values), 3))
-    return 2 * values_repeated_reshaped * anisotropy_vectors
+    N = len(magnitude_spin_moment)
+    result = out if out is not None else numpy.empty(shape=(N, 3))
+    for i in prange(N):
+        projection = (
+            state[i, 0] * anisotropy_vectors[i, 0]
+            + state[i, 1] * anisotropy_vectors[i, 1]
+            + state[i, 2] * anisotropy_vectors[i, 2]
+        )
+        value = 2 * anisotropy_constants[i] * projection / magnitude_spin_moment[i]
+        result[i, 0] = value * anisotropy_vectors[i, 0]
+        result[i, 1] = value * anisotropy_vectors[i, 1]
+        result[i, 2] = value * anisotropy_vectors[i, 2]
+    return result
+
+
+# Thread-parallel versions of the kernels above. The per-site loops run over
+# `prange`, which is a plain `range` for the serial versions.
+exchange_interaction_field_parallel = jit(
+    nopython=True, error_model="numpy", parallel=True
+)(exchange_interaction_field.py_func)
+exchange_interaction_field_csr_parallel = jit(
+    nopython=True, error_model="numpy", parallel=True
+)(exchange_interaction_field_csr.py_func)
+anisotropy_interaction_field_parallel = jit(
+    nopython=True, error_model="numpy", parallel=True
+)(anisotropy_interaction_field.py_func)
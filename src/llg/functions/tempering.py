@@ -0,0 +1,36 @@
+from typing import Any
+
+import numpy
+from numba import jit
+from numpy import ndarray
+
+
+@jit(nopython=True)
+def exchange_replicas(
+    states: ndarray[(Any, Any, 3), float],
+    energies: ndarray[(Any, 4), float],
+    betas: ndarray[Any, float],
+    parity: int,
+    uniforms: ndarray[Any, float],
+    attempts: ndarray[Any, int],
+    acceptances: ndarray[Any, int],
+) -> ndarray[(Any, Any, 3), float]:
+    # a sweep of replica exchange over the pairs (r, r + 1) of adjacent temperatures
+    # with r of the given parity, so that the pairs do not overlap. A pair swaps its
+    # states and energies with the Metropolis probability
+    # min(1, exp((beta_r - beta_r+1) * (E_r - E_r+1))) of the total energies, and the
+    # r-th uniform number decides the r-th pair.
+    for r in range(parity, len(betas) - 1, 2):
+        attempts[r] += 1
+        delta = (betas[r] - betas[r + 1]) * (energies[r, 3] - energies[r + 1, 3])
+        if delta >= 0.0 or uniforms[r] < numpy.exp(delta):
+            acceptances[r] += 1
+            for i in range(states.shape[1]):
+                for k in range(3):
+                    states[r, i, k], states[r + 1, i, k] = (
+                        states[r + 1, i, k],
+                        states[r, i, k],
+                    )
+            for k in range(4):
+                energies[r, k], energies[r + 1, k] = energies[r + 1, k], energies[r, k]
+    return states
@@ -1,29 +1,66 @@
-import json
 from collections import namedtuple
+from functools import cached_property
+from operator import itemgetter
 
 import numpy
 
 from llg.site import Site
 
+# Columns of the sites. Each field is an array with one row per site.
+Sites = namedtuple(
+    "Sites",
+    [
+        "index",
+        "position",
+        "type",
+        "mu",
+        "anisotropy_constant",
+        "anisotopy_axis",
+        "field_axis",
+    ],
+)
+
+# Columns of the links. Each field is an array with one row per link.
+Links = namedtuple("Links", ["source", "target", "jex"])
+
+# Compressed sparse row layout of the neighbors. The neighbors of the site `i` are
+# `indices[indptr[i]:indptr[i + 1]]` and their exchanges are the same slice of `jex`.
+CSR = namedtuple("CSR", ["indptr", "indices", "jex"])
+
 
 class Geometry:
-    """This is a class is created to get the object sites.
+    """This is a class is created to get the object sites. The sites and the links
+    are stored as contiguous numpy columns, and the arrays derived from them are
+    computed once and cached.
 
-    :param sites: The dictionary that contains an index, position, type, mu,
+    :param sites: The columns with the index, position, type, mu,
     anisotropy_constant, anisotopy_axis, and field_axis of each site.
-    :type sites: dict
-    :param neighbors: The dictionary that contains a source, target, and jex.
-    :type neighbors: dict
+    :type sites: Sites
+    :param links: The columns with the source, target, and jex of each link.
+    :type links: Links
     """
 
-    def __init__(self, sites):
+    def __init__(self, sites, links, csr=None, type_codes=None):
         """The constructor for Geometry class.
 
-        :param sites: The dictionary that contains an index, position, type, mu,
+        :param sites: The columns with the index, position, type, mu,
         anisotropy_constant, anisotopy_axis, and field_axis of each site.
-        :type sites: dict
+        :type sites: Sites
+        :param links: The columns with the source, target, and jex of each link.
+        :type links: Links
+        :param csr: The CSR layout of the links, if it was already computed.
+        :type csr: CSR
+        :param type_codes: The type code of each site, if they were already computed.
+        :type type_codes: numpy.ndarray
         """
         self.__sites = sites
+        self.__links = links
+
+        # precomputed values of the cached properties
+        if csr is not None:
+            self.__dict__["csr"] = csr
+        if type_codes is not None:
+            self.__dict__["type_codes"] = type_codes
 
     @classmethod
     def from_file(cls, geometry_file):
@@ -31,43 +68,111 @@ class Geometry:
 
         :param geometry_file: File that contains index, position, type, mu,
         anisotropy_constant, anisotopy_axis, and field_axis of each site. Also it
-        contains a source, target, and jex.
+        contains a source, target, and jex. It can also be a binary sample directory.
         :type geometry_file: file
 
         :return: Object that contains the complete information.
         :rtype: Object
         """
+        # the sample formats are built on top of the geometry
+        from llg.sample_file import read_sample
 
-        with open(geometry_file) as file:
-            geometry = json.load(file)["geometry"]
-
-        return Geometry.from_dict(geometry)
+        return read_sample(geometry_file)["geometry"]
 
     @classmethod
     def from_dict(cls, geometry_dict):
-        """It creates the geometry dictionary. The dictionary contain the indexes as
-        keys but the values are the same objects,such as, if we alter ``sites_dict``
-        values, we also alter the corresponding one in ``sites``.
+        """It creates the geometry from a dictionary. The sites and the neighbors are
+        read straight into columns, without creating a ``Site`` per site.
 
         :param geometry_dict: Dictionary that contains index, position, type, mu,
         anisotropy_constant, anisotopy_axis, and field_axis of each site. Also it
         contains a source, target, and jex.
         :type geometry_dict: dict
         """
-        sites = geometry_dict["sites"]
-        neighbors = geometry_dict["neighbors"]
+        sites = Geometry.read_site_columns(geometry_dict["sites"])
+        links = Geometry.read_link_columns(geometry_dict.get("neighbors", []))
+
+        Geometry.validate(sites, links)
+
+        return cls(sites, links)
+
+    @classmethod
+    def from_sites(cls, sites):
+        """It creates the geometry from a list of ``Site`` objects and their
+        neighbors.
+
+        :param sites: The list of sites.
+        :type sites: list
+        """
+        site_dicts = [
+            {
+                "index": site.index,
+                "position": site.position,
+                "type": site.type,
+                "mu": site.mu,
+                "anisotropy_constant": site.anisotropy_constant,
+                "anisotopy_axis": site.anisotopy_axis,
+                "field_axis": site.field_axis,
+            }
+            for site in sites
+        ]
+        neighbors_dicts = [
+            {"source": site.index, "target": nhb.index, "jex": jex}
+            for site in sites
+            for nhb, jex in zip(site.neighbors, site.jexs)
+        ]
+
+        site_columns = Geometry.read_site_columns(site_dicts)
+        link_columns = Geometry.read_link_columns(neighbors_dicts)
+
+        Geometry.validate(site_columns, link_columns)
+
+        return cls(site_columns, link_columns)
+
+    @classmethod
+    def from_positions(cls, sites, cutoff, box=None, jex=1.0):
+        """It creates the geometry linking every pair of sites closer than a cutoff.
+        The neighbors are found with a cell list, in a time proportional to the
+        number of sites.
+
+        :param sites: The columns of the sites.
+        :type sites: Sites
+        :param cutoff: The maximum distance between neighbors.
+        :type cutoff: float
+        :param box: The three vectors of the periodic box, one per row. If it is None,
+        the boundaries are open.
+        :type box: list
+        :param jex: The exchange interaction, or a function that gives it from an
+        array of distances.
+        :type jex: float/callable
+        """
+        from llg.functions.neighbors import find_neighbors
+
+        links = find_neighbors(sites.position, cutoff, box, jex)
+        index = numpy.asarray(sites.index)
+        links = Links(index[links.source], index[links.target], links.jex)
 
-        sites = Geometry.read_sites(sites)
-        sites_dict = {site.index: site for site in sites}
+        Geometry.validate(sites, links)
 
-        neighbors = Geometry.read_neighbors(neighbors)
+        return cls(sites, links)
 
-        for link in neighbors:
-            site = sites_dict[link.source]
-            nhb = sites_dict[link.target]
-            site.append_neighbor(nhb, link.jex)
+    @property
+    def sites(self):
+        """It provides the columns of the sites.
+
+        :return: Return the ``Sites`` columns.
+        :rtype: Sites
+        """
+        return self.__sites
+
+    @property
+    def links(self):
+        """It provides the columns of the links.
 
-        return cls(sites)
+        :return: Return the ``Links`` columns.
+        :rtype: Links
+        """
+        return self.__links
 
     @property
     def positions(self):
@@ -76,16 +181,85 @@ class Geometry:
 
         :return: Return a property attribute of position.
         """
-        return [site.position for site in self.__sites]
+        return self.__sites.position
 
-    @property
+    @cached_property
     def types(self):
         """It provides an interface to instance attribute types. It encapsulates
         instance attribute types and provides a property Site class.
 
         :return: Return a property attribute of types.
         """
-        return [site.type for site in self.__sites]
+        return self.__sites.type.tolist()
+
+    @cached_property
+    def type_names(self):
+        """It provides the sorted list of the different types of the sites.
+
+        :return: Return the list of types.
+        :rtype: list
+        """
+        return numpy.unique(self.__sites.type).tolist()
+
+    @cached_property
+    def type_codes(self):
+        """It provides the type of each site as an integer code, which is the position
+        of its type in ``type_names``.
+
+        :return: Return the type code of each site.
+        :rtype: numpy.ndarray
+        """
+        return numpy.searchsorted(self.type_names, self.__sites.type).astype(
+            numpy.int64
+        )
+
+    @staticmethod
+    def read_site_columns(site_dicts: list):
+        """It reads the sites into columns.
+
+        :param site_dicts: Dictionary that contains index, position, type, mu,
+        anisotropy_constant, anisotopy_axis, and field_axis of each site.
+        :type site_dicts: dict
+
+        :return: Columns with the sites values.
+        :rtype: Sites
+        """
+
+        def column(field, dtype=None):
+            return numpy.array(list(map(itemgetter(field), site_dicts)), dtype=dtype)
+
+        return Sites(
+            index=column("index", numpy.int64),
+            position=column("position", float).reshape(-1, 3),
+            type=column("type", str),
+            mu=column("mu", float),
+            anisotropy_constant=column("anisotropy_constant", float),
+            anisotopy_axis=column("anisotopy_axis", float).reshape(-1, 3),
+            field_axis=column("field_axis", float).reshape(-1, 3),
+        )
+
+    @staticmethod
+    def read_link_columns(neighbors_dicts: list):
+        """It reads the neighbors into columns.
+
+        :param neighbors_dicts: Dictionary that contains a source, target, and
+        jex of each site.
+        :type neighbors_dicts: dict
+
+        :return: Columns with the links values.
+        :rtype: Links
+        """
+
+        def column(field, dtype):
+            return numpy.array(
+                list(map(itemgetter(field), neighbors_dicts)), dtype=dtype
+            )
+
+        return Links(
+            source=column("source", numpy.int64),
+            target=column("target", numpy.int64),
+            jex=column("jex", float),
+        )
 
     @staticmethod
     def read_sites(site_dicts: list):
@@ -99,10 +273,12 @@ class Geometry:
         :rtype: Object
         """
         output_sites = []
+        indexes = set()
         for site_dict in site_dicts:
             site = Site.from_dict(site_dict)
-            if site in output_sites:
+            if site.index in indexes:
                 raise Exception(f"Site with the index {site.index} already exists !!!")
+            indexes.add(site.index)
             output_sites.append(site)
         return output_sites
 
@@ -128,6 +304,99 @@ class Geometry:
 
         return links
 
+    @staticmethod
+    def check(sites, links):
+        """It checks the columns of the sites and the links in a single pass, and
+        returns every violation found: columns with a wrong number of rows, duplicated
+        indexes, links that refer to sites that do not exist, and links without a
+        reverse link with the same jex. The checks are vectorized, so they scale as a
+        sort of the links.
+
+        :param sites: The columns of the sites.
+        :type sites: Sites
+        :param links: The columns of the links.
+        :type links: Links
+
+        :return: The list of violations. It is empty for a valid geometry.
+        :rtype: list
+        """
+        errors = []
+
+        for name, columns in (("sites", sites), ("links", links)):
+            num_rows = len(columns[0])
+            for field, column in zip(columns._fields, columns):
+                if len(column) != num_rows:
+                    errors.append(
+                        f"The column {field} of the {name} has {len(column)} rows, "
+                        f"but there are {num_rows} {name}."
+                    )
+        if errors:
+            # the other checks need consistent columns
+            return errors
+
+        indexes, counts = numpy.unique(sites.index, return_counts=True)
+        for index in indexes[counts > 1]:
+            errors.append(f"Site with the index {index} already exists !!!")
+
+        valid = numpy.ones(len(links.source), dtype=bool)
+        for name, column in (("source", links.source), ("target", links.target)):
+            positions = numpy.searchsorted(indexes, column)
+            exists = numpy.zeros(len(column), dtype=bool)
+            inside = positions < len(indexes)
+            exists[inside] = indexes[positions[inside]] == column[inside]
+            for link in numpy.flatnonzero(~exists):
+                errors.append(
+                    f"Link {link} has the {name} {column[link]}, which is not a site."
+                )
+            valid &= exists
+
+        # every link (source, target) is encoded as an integer key, and it should
+        # find the key of (target, source) among the keys of the valid links
+        num_keys = len(indexes)
+        sources = numpy.searchsorted(indexes, links.source[valid])
+        targets = numpy.searchsorted(indexes, links.target[valid])
+        jexs = links.jex[valid]
+        keys = sources * num_keys + targets
+        order = numpy.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        reverse_keys = targets * num_keys + sources
+        positions = numpy.minimum(
+            numpy.searchsorted(sorted_keys, reverse_keys), max(len(keys) - 1, 0)
+        )
+        has_reverse = sorted_keys[positions] == reverse_keys
+        same_jex = numpy.isclose(jexs[order[positions]], jexs)
+        for link in numpy.flatnonzero(~(has_reverse & same_jex)):
+            link_index = numpy.flatnonzero(valid)[link]
+            source = links.source[link_index]
+            target = links.target[link_index]
+            if has_reverse[link]:
+                errors.append(
+                    f"Link {link_index} from {source} to {target} has a reverse link "
+                    "with a different jex."
+                )
+            else:
+                errors.append(
+                    f"Link {link_index} from {source} to {target} has no reverse link."
+                )
+
+        return errors
+
+    @staticmethod
+    def validate(sites, links):
+        """It checks the columns of the sites and the links, and raises an exception
+        with every violation found.
+
+        :param sites: The columns of the sites.
+        :type sites: Sites
+        :param links: The columns of the links.
+        :type links: Links
+
+        :raises :class:`Exception`: The geometry is not valid.
+        """
+        errors = Geometry.check(sites, links)
+        if errors:
+            raise Exception("The geometry is not valid:\n" + "\n".join(errors))
+
     @property
     def num_interactions(self):
         """It provides an interface to instance attribute num_interactions. It
@@ -136,10 +405,7 @@ class Geometry:
 
         :return: Return a property attribute of num_interactions.
         """
-        count = 0
-        for site in self.__sites:
-            count += len(site.neighbors)
-        return count
+        return len(self.__links.source)
 
     @property
     def num_sites(self):
@@ -148,7 +414,7 @@ class Geometry:
 
         :return: Return a property attribute of num_sites.
         """
-        return len(self.__sites)
+        return len(self.__sites.index)
 
     @property
     def spin_norms(self):
@@ -157,7 +423,7 @@ class Geometry:
 
         :return: Return a property attribute of spin_norms.
         """
-        return numpy.array([site.mu for site in self.__sites])
+        return self.__sites.mu
 
     @property
     def field_axes(self):
@@ -166,9 +432,9 @@ class Geometry:
 
         :return: Return a property attribute of field_axes.
         """
-        return numpy.array([site.field_axis for site in self.__sites])
+        return self.__sites.field_axis
 
-    @property
+    @cached_property
     def num_neighbors(self):
         """It provides an interface to instance attribute num_neighbors. It
         encapsulates instance attribute num_neighbors and provides a property Site
@@ -176,7 +442,7 @@ class Geometry:
 
         :return: Return a property attribute of num_neighbors.
         """
-        return [len(site.neighbors) for site in self.__sites]
+        return numpy.diff(self.csr.indptr).tolist()
 
     @property
     def anisotropy_constants(self):
@@ -186,7 +452,7 @@ class Geometry:
 
         :return: Return a property attribute of anisotropy_constants.
         """
-        return numpy.array([site.anisotropy_constant for site in self.__sites])
+        return self.__sites.anisotropy_constant
 
     @property
     def anisotropy_axes(self):
@@ -196,28 +462,85 @@ class Geometry:
 
         :return: Return a property attribute of anisotropy_axes.
         """
-        return numpy.array([site.anisotopy_axis for site in self.__sites])
+        return self.__sites.anisotopy_axis
 
-    @property
+    @cached_property
     def exchanges(self):
         """It provides an interface to instance attribute exchanges. It encapsulates
-        instance attribute exchanges and provides a property Site class.
+        instance attribute exchanges and provides a property Site class. It requires
+        the same number of neighbors for every site.
 
         :return: Return a property attribute of exchanges.
         """
-        jexs = []
-        for site in self.__sites:
-            jexs.append(site.jexs)
-        return numpy.array(jexs)
+        return self.csr.jex.reshape(self.num_sites, self.__rectangular_width())
 
-    @property
+    @cached_property
     def neighbors(self):
         """It provides an interface to instance attribute neighbors. It encapsulates
-        instance attribute neighbors and provides a property Site class.
+        instance attribute neighbors and provides a property Site class. It requires
+        the same number of neighbors for every site.
 
         :return: Return a property attribute of neighbors.
         """
-        neighbors_ = []
-        for site in self.__sites:
-            neighbors_.append([nbh.index for nbh in site.neighbors])
-        return numpy.array(neighbors_)
+        return self.csr.indices.reshape(self.num_sites, self.__rectangular_width())
+
+    def __rectangular_width(self):
+        num_neighbors = numpy.diff(self.csr.indptr)
+        if len(num_neighbors) and numpy.any(num_neighbors != num_neighbors[0]):
+            raise Exception(
+                "The sites do not have the same number of neighbors. Use `csr`."
+            )
+        return num_neighbors[0] if len(num_neighbors) else 0
+
+    @cached_property
+    def csr(self):
+        """It provides the neighbors in compressed sparse row layout. Contrary to
+        ``neighbors`` and ``exchanges``, it does not require the same number of
+        neighbors for every site. It is built from the links, keeping their order for
+        each source.
+
+        :return: Return a ``CSR`` with the ``indptr``, ``indices``, and ``jex`` arrays.
+        :rtype: CSR
+        """
+        return Geometry.build_csr(
+            self.__sites.index,
+            self.__links.source,
+            self.__links.target,
+            self.__links.jex,
+        )
+
+    @staticmethod
+    def build_csr(indexes, sources, targets, jexs):
+        """It builds the compressed sparse row layout of a list of links.
+
+        :param indexes: The index of each site, in the order of the sites.
+        :type indexes: list
+        :param sources: The index of the source site of each link.
+        :type sources: list
+        :param targets: The index of the target site of each link.
+        :type targets: list
+        :param jexs: The exchange interaction of each link.
+        :type jexs: list
+
+        :return: Return a ``CSR`` with the ``indptr``, ``indices``, and ``jex`` arrays.
+        :rtype: CSR
+        """
+        indexes = numpy.asarray(indexes)
+        num_sites = len(indexes)
+
+        # the links refer to the sites by their index, which is translated to
+        # the position of the site in the arrays
+        order = numpy.argsort(indexes, kind="stable")
+        sorted_indexes = indexes[order]
+        sources = order[numpy.searchsorted(sorted_indexes, sources)]
+        targets = order[numpy.searchsorted(sorted_indexes, targets)]
+
+        by_source = numpy.argsort(sources, kind="stable")
+        indptr = numpy.zeros(num_sites + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(sources, minlength=num_sites), out=indptr[1:])
+
+        return CSR(
+            indptr=indptr,
+            indices=numpy.ascontiguousarray(targets[by_source], dtype=numpy.int64),
+            jex=numpy.asarray(jexs, dtype=float)[by_source],
+        )
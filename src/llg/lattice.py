@@ -0,0 +1,240 @@
+from functools import cached_property
+
+import numpy
+
+from llg.geometry import CSR, Geometry, Links, Sites
+
+
+class Lattice:
+    """This is a class for create a Bravais lattice with a basis. The sites and the
+    neighbors are generated with numpy over all the cells at once, and the neighbors
+    are emitted directly in compressed sparse row layout.
+
+    The sites are ordered by cell, with the cells in row-major order of ``shape``,
+    and by basis site inside each cell.
+
+    :param vectors: The three lattice vectors, one per row.
+    :type vectors: list
+    :param basis: The positions of the sites of the unit cell, in fractional
+    coordinates of the lattice vectors.
+    :type basis: list
+    :param shape: The number of cells along each lattice vector. A single number is
+    used for the three of them.
+    :type shape: int/list
+    :param periodic: If the boundary conditions are periodic along each lattice
+    vector. A single value is used for the three of them.
+    :type periodic: bool/list
+    """
+
+    def __init__(self, vectors, basis, shape, periodic=True):
+        """The constructor for Lattice class."""
+        self.vectors = numpy.asarray(vectors, dtype=float).reshape(3, 3)
+        self.basis = numpy.asarray(basis, dtype=float).reshape(-1, 3)
+        self.shape = tuple(int(n) for n in numpy.broadcast_to(shape, (3,)))
+        self.periodic = numpy.broadcast_to(numpy.asarray(periodic, dtype=bool), (3,))
+
+        if min(self.shape) < 1:
+            raise Exception("The lattice needs at least one cell along each vector.")
+
+    @property
+    def num_cells(self):
+        """It gives the number of unit cells.
+
+        :return: Number of cells.
+        :rtype: int
+        """
+        return int(numpy.prod(self.shape))
+
+    @property
+    def num_sites(self):
+        """It gives the number of sites.
+
+        :return: Number of sites.
+        :rtype: int
+        """
+        return self.num_cells * len(self.basis)
+
+    @cached_property
+    def cells(self):
+        """It gives the integer coordinates of every cell, in row-major order.
+
+        :return: Array with one row per cell.
+        :rtype: numpy.ndarray
+        """
+        return numpy.indices(self.shape).reshape(3, -1).T
+
+    @cached_property
+    def positions(self):
+        """It gives the cartesian position of every site.
+
+        :return: Array with one row per site.
+        :rtype: numpy.ndarray
+        """
+        fractional = self.cells[:, numpy.newaxis, :] + self.basis[numpy.newaxis]
+        return (fractional @ self.vectors).reshape(-1, 3)
+
+    def shells(self, num_shells):
+        """It finds the neighbors of the basis sites up to the shell ``num_shells``.
+        The shells are the distinct distances between sites, from the nearest one.
+
+        :param num_shells: The number of shells.
+        :type num_shells: int
+
+        :return: The distances of the shells, and an array with one row per neighbor
+        with the source basis site, the target basis site, the cell offset of the
+        target, and the shell.
+        :rtype: tuple
+        """
+        num_basis = len(self.basis)
+        # any point out of the cell offsets [-reach, reach] is at least
+        # (reach - 1) * spacing away, with spacing the distance between cell faces
+        volume = abs(numpy.linalg.det(self.vectors))
+        spacing = volume / max(
+            numpy.linalg.norm(numpy.cross(self.vectors[i - 2], self.vectors[i - 1]))
+            for i in range(3)
+        )
+
+        reach = 1
+        while True:
+            steps = numpy.arange(-reach, reach + 1)
+            offsets = numpy.stack(
+                numpy.meshgrid(steps, steps, steps, indexing="ij"), axis=-1
+            ).reshape(-1, 3)
+            source, target, offset = (
+                grid.ravel()
+                for grid in numpy.meshgrid(
+                    numpy.arange(num_basis),
+                    numpy.arange(num_basis),
+                    numpy.arange(len(offsets)),
+                    indexing="ij",
+                )
+            )
+            offsets = offsets[offset]
+            vectors = (offsets + self.basis[target] - self.basis[source]) @ self.vectors
+            distances = numpy.round(numpy.linalg.norm(vectors, axis=1), 8)
+
+            nonzero = distances > 0
+            source, target = source[nonzero], target[nonzero]
+            offsets, distances = offsets[nonzero], distances[nonzero]
+
+            shell_distances = numpy.unique(distances)[:num_shells]
+            if len(shell_distances) == num_shells and shell_distances[-1] < (
+                reach - 1
+            ) * spacing * (1 - 1e-8):
+                break
+            reach += 1
+
+        shell = numpy.searchsorted(shell_distances, distances)
+        within = shell < num_shells
+        neighbors = numpy.column_stack((source, target, offsets, shell))[within]
+
+        # the neighbors of each basis site go by shell
+        source, target, x, y, z, shell = neighbors.T
+        order = numpy.lexsort((z, y, x, target, shell, source))
+        return shell_distances, neighbors[order]
+
+    def csr(self, num_shells=1, jex=1.0):
+        """It builds the neighbors of every site in compressed sparse row layout. Along
+        a periodic vector the offsets are wrapped, and along an open one the neighbors
+        out of the lattice are dropped.
+
+        :param num_shells: The number of shells of neighbors.
+        :type num_shells: int
+        :param jex: The exchange interaction of each shell. A single number is used
+        for all of them.
+        :type jex: float/list
+
+        :return: Return a ``CSR`` with the ``indptr``, ``indices``, and ``jex`` arrays.
+        :rtype: CSR
+        """
+        jex = numpy.broadcast_to(numpy.asarray(jex, dtype=float), (num_shells,))
+        _, neighbors = self.shells(num_shells)
+
+        num_basis = len(self.basis)
+        shape = numpy.array(self.shape)
+        counts = numpy.bincount(neighbors[:, 0], minlength=num_basis)
+        width = counts.max() if len(neighbors) else 0
+
+        # one padded row per site, with -1 where there is no neighbor
+        targets = numpy.full((self.num_cells, num_basis, width), -1, dtype=numpy.int64)
+        jexs = numpy.zeros((num_basis, width))
+        for b in range(num_basis):
+            for k, (_, target, *offset, shell) in enumerate(
+                neighbors[neighbors[:, 0] == b]
+            ):
+                cells = self.cells + offset
+                valid = numpy.all(
+                    self.periodic | ((cells >= 0) & (cells < shape)), axis=1
+                )
+                cells = cells % shape
+                cell_index = numpy.ravel_multi_index(cells.T, self.shape)
+                index = cell_index * num_basis + target
+                targets[:, b, k] = numpy.where(valid, index, -1)
+                jexs[b, k] = jex[shell]
+
+        targets = targets.reshape(self.num_sites, width)
+        valid = targets >= 0
+        indptr = numpy.zeros(self.num_sites + 1, dtype=numpy.int64)
+        numpy.cumsum(valid.sum(axis=1), out=indptr[1:])
+        jexs = numpy.broadcast_to(
+            jexs[numpy.newaxis], (self.num_cells, num_basis, width)
+        ).reshape(self.num_sites, width)
+
+        return CSR(indptr=indptr, indices=targets[valid], jex=jexs[valid])
+
+    def geometry(
+        self,
+        num_shells=1,
+        jex=1.0,
+        type="generic",
+        mu=1.0,
+        anisotropy_constant=0.0,
+        anisotopy_axis=(0.0, 0.0, 0.0),
+        field_axis=(0.0, 0.0, 0.0),
+    ):
+        """It builds the geometry of the lattice, with the same attributes for every
+        site. The links are in the order of the sources, so the CSR layout is given to
+        the geometry as it is.
+
+        :param num_shells: The number of shells of neighbors.
+        :type num_shells: int
+        :param jex: The exchange interaction of each shell.
+        :type jex: float/list
+        :param type: The type of the sites.
+        :type type: str
+        :param mu: The spin norm of the sites.
+        :type mu: float
+        :param anisotropy_constant: The anisotropy constant of the sites.
+        :type anisotropy_constant: float
+        :param anisotopy_axis: The anisotropy axis of the sites.
+        :type anisotopy_axis: list
+        :param field_axis: The field axis of the sites.
+        :type field_axis: list
+
+        :return: The geometry.
+        :rtype: Geometry
+        """
+        num_sites = self.num_sites
+        csr = self.csr(num_shells, jex)
+
+        sites = Sites(
+            index=numpy.arange(num_sites, dtype=numpy.int64),
+            position=self.positions,
+            type=numpy.full(num_sites, type),
+            mu=numpy.full(num_sites, mu, dtype=float),
+            anisotropy_constant=numpy.full(num_sites, anisotropy_constant, dtype=float),
+            anisotopy_axis=numpy.tile(
+                numpy.asarray(anisotopy_axis, dtype=float), (num_sites, 1)
+            ),
+            field_axis=numpy.tile(
+                numpy.asarray(field_axis, dtype=float), (num_sites, 1)
+            ),
+        )
+        links = Links(
+            source=numpy.repeat(
+                numpy.arange(num_sites, dtype=numpy.int64), numpy.diff(csr.indptr)
+            ),
+            target=csr.indices,
+            jex=csr.jex,
+        )
+        return Geometry(sites, links, csr, numpy.zeros(num_sites, dtype=numpy.int64))
@@ -1,5 +1,6 @@
-from itertools import product
+import numpy
 
+from llg.lattice import Lattice
 from llg.sample import Sample
 
 
@@ -55,27 +56,7 @@ class GenericSc(Sample):
         super().__init__()
 
         self.length = length
-
-        index = {}
-        for x, y, z in product(range(self.length), repeat=3):
-            index[(x, y, z)] = len(index)
-
-        for position, i in index.items():
-            site = {"index": i, "position": position}
-            self.sites.append(site)
-
-        pairs = []
-        for position, i in index.items():
-            x, y, z = position
-            pairs.append((i, index[((x + 1) % length, y, z)]))
-            pairs.append((i, index[((x - 1) % length, y, z)]))
-            pairs.append((i, index[(x, (y + 1) % length, z)]))
-            pairs.append((i, index[(x, (y - 1) % length, z)]))
-            pairs.append((i, index[(x, y, (z + 1) % length)]))
-            pairs.append((i, index[(x, y, (z - 1) % length)]))
-
-        for i, j in pairs:
-            self.neighbors.append({"source": i, "target": j})
+        self.lattice = Lattice(numpy.eye(3), [[0.0, 0.0, 0.0]], length)
 
 
 class GenericBcc(Sample):
@@ -131,46 +112,7 @@ class GenericBcc(Sample):
         super().__init__()
 
         self.length = length
-
-        index = {}
-        for x, y, z in product(range(self.length), repeat=3):
-            index[(x, y, z)] = len(index)
-            index[(x + 0.5, y + 0.5, z + 0.5)] = len(index)
-
-        for position, i in index.items():
-            site = {"index": i, "position": position}
-            self.sites.append(site)
-
-        pairs = []
-        for position, i in index.items():
-            x, y, z = position
-            pairs.append(
-                (i, index[((x + 0.5) % length, (y + 0.5) % length, (z + 0.5) % length)])
-            )
-            pairs.append(
-                (i, index[((x + 0.5) % length, (y + 0.5) % length, (z - 0.5) % length)])
-            )
-            pairs.append(
-                (i, index[((x + 0.5) % length, (y - 0.5) % length, (z + 0.5) % length)])
-            )
-            pairs.append(
-                (i, index[((x + 0.5) % length, (y - 0.5) % length, (z - 0.5) % length)])
-            )
-            pairs.append(
-                (i, index[((x - 0.5) % length, (y + 0.5) % length, (z + 0.5) % length)])
-            )
-            pairs.append(
-                (i, index[((x - 0.5) % length, (y + 0.5) % length, (z - 0.5) % length)])
-            )
-            pairs.append(
-                (i, index[((x - 0.5) % length, (y - 0.5) % length, (z + 0.5) % length)])
-            )
-            pairs.append(
-                (i, index[((x - 0.5) % length, (y - 0.5) % length, (z - 0.5) % length)])
-            )
-
-        for i, j in pairs:
-            self.neighbors.append({"source": i, "target": j})
+        self.lattice = Lattice(numpy.eye(3), [[0.0, 0.0, 0.0], [0.5, 0.5, 0.5]], length)
 
 
 class GenericFcc(Sample):
@@ -226,34 +168,13 @@ class GenericFcc(Sample):
         super().__init__()
 
         self.length = length
-
-        index = {}
-
-        for x, y, z in product(range(self.length), repeat=3):
-            index[(x, y, z)] = len(index)
-            index[(x + 0.5, y + 0.5, z)] = len(index)
-            index[(x + 0.5, y, z + 0.5)] = len(index)
-            index[(x, y + 0.5, z + 0.5)] = len(index)
-
-        for position, i in index.items():
-            site = {"index": i, "position": position}
-            self.sites.append(site)
-
-        pairs = []
-        for position, i in index.items():
-            x, y, z = position
-            pairs.append((i, index[((x + 0.5) % length, (y + 0.5) % length, z)]))
-            pairs.append((i, index[((x + 0.5) % length, (y - 0.5) % length, z)]))
-            pairs.append((i, index[((x - 0.5) % length, (y + 0.5) % length, z)]))
-            pairs.append((i, index[((x - 0.5) % length, (y - 0.5) % length, z)]))
-            pairs.append((i, index[(x, (y + 0.5) % length, (z + 0.5) % length)]))
-            pairs.append((i, index[(x, (y + 0.5) % length, (z - 0.5) % length)]))
-            pairs.append((i, index[(x, (y - 0.5) % length, (z + 0.5) % length)]))
-            pairs.append((i, index[(x, (y - 0.5) % length, (z - 0.5) % length)]))
-            pairs.append((i, index[((x + 0.5) % length, y, (z + 0.5) % length)]))
-            pairs.append((i, index[((x + 0.5) % length, y, (z - 0.5) % length)]))
-            pairs.append((i, index[((x - 0.5) % length, y, (z + 0.5) % length)]))
-            pairs.append((i, index[((x - 0.5) % length, y, (z - 0.5) % length)]))
-
-        for i, j in pairs:
-            self.neighbors.append({"source": i, "target": j})
+        self.lattice = Lattice(
+            numpy.eye(3),
+            [
+                [0.0, 0.0, 0.0],
+                [0.5, 0.5, 0.0],
+                [0.5, 0.0, 0.5],
+                [0.0, 0.5, 0.5],
+            ],
+            length,
+        )
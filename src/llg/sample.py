@@ -1,4 +1,7 @@
-import json
+import numpy
+
+from llg.geometry import Geometry
+from llg.sample_file import write_binary_sample, write_json_sample
 
 
 class Sample:
@@ -43,14 +46,21 @@ class Sample:
     :type seed: int, optional.
     :param initial_state: It receives the initial state of the sites in the system.
     :type initial_state: list, optional.
+    :param lattice: It receives the lattice of the sites in the system. If it is
+    given, the geometry is generated from it at once. If ``sites`` or ``neighbors``
+    are read, they are generated from the lattice as lists, and then the geometry is
+    built from the lists instead, so the changes made to them are kept.
+    :type lattice: Lattice, optional.
+    :param num_shells: It receives the number of shells of neighbors of the lattice.
+    :type num_shells: int
     """
 
     def __init__(self):
         """
         The constructor for Sample class.
         """
-        self.sites = []
-        self.neighbors = []
+        self.__sites = None
+        self.__neighbors = None
         self.units = "adim"
         self.damping = 1.0
         self.gyromagnetic = 1.0
@@ -69,6 +79,64 @@ class Sample:
         self.seed = None
         self.initial_state = None
 
+        self.lattice = None
+        self.num_shells = 1
+
+    @property
+    def sites(self):
+        """It gives the list of sites. If there is a lattice, it is generated from it
+        the first time.
+
+        :return: The sites, with their index and position.
+        :rtype: list
+        """
+        if self.__sites is None:
+            self.__generate_lists()
+        return self.__sites
+
+    @sites.setter
+    def sites(self, sites):
+        self.__sites = sites
+
+    @property
+    def neighbors(self):
+        """It gives the list of neighbors. If there is a lattice, it is generated from
+        it the first time.
+
+        :return: The neighbors, with their source and target, and their exchange
+        interaction if there is one per shell.
+        :rtype: list
+        """
+        if self.__neighbors is None:
+            self.__generate_lists()
+        return self.__neighbors
+
+    @neighbors.setter
+    def neighbors(self, neighbors):
+        self.__neighbors = neighbors
+
+    def __generate_lists(self):
+        # the lists of the lattice, or empty ones. The other attributes of the sites
+        # and the neighbors take the values of the sample when it is built.
+        sites, neighbors = [], []
+        if self.lattice is not None:
+            csr = self.lattice.csr(self.num_shells, self.jex)
+            for i, position in enumerate(self.lattice.positions.tolist()):
+                sites.append({"index": i, "position": position})
+            sources = numpy.repeat(numpy.arange(len(sites)), numpy.diff(csr.indptr))
+            shells = numpy.ndim(self.jex) > 0
+            for i, j, jex in zip(
+                sources.tolist(), csr.indices.tolist(), csr.jex.tolist()
+            ):
+                neighbor = {"source": i, "target": j}
+                if shells:
+                    neighbor["jex"] = jex
+                neighbors.append(neighbor)
+        if self.__sites is None:
+            self.__sites = sites
+        if self.__neighbors is None:
+            self.__neighbors = neighbors
+
     def build(self):
         """It is a function responsible for building the sample. It receives all the
         attributes of the Sample class. This function ensures that all attributes were
@@ -76,9 +144,64 @@ class Sample:
 
         :raises :class:`Exception`: index and positions are required !
 
-        :return: It is a dictionary with all the attributes organized.
+        :return: It is a dictionary with all the attributes organized. The geometry is
+        a dictionary with the lists of sites and neighbors, so it can be serialized as
+        JSON.
         :rtype: dict
         """
+        return self.__build(self.__geometry_dict())
+
+    def __build(self, geometry):
+        sample = {
+            "geometry": geometry,
+            "parameters": {
+                "units": self.units,
+                "damping": self.damping,
+                "gyromagnetic": self.gyromagnetic,
+                "deltat": self.deltat,
+            },
+            "temperature": self.temperature,
+            "field": self.field,
+            "num_iterations": self.num_iterations,
+        }
+
+        if self.seed:
+            sample["seed"] = self.seed
+
+        if self.initial_state:
+            sample["initial_state"] = self.initial_state
+
+        return sample
+
+    def build_geometry(self):
+        """It builds the geometry of the sample as a ``Geometry``. If there is a
+        lattice, and its ``sites`` and ``neighbors`` were not read, it is generated
+        from it at once, without the lists of sites and neighbors.
+
+        :raises :class:`Exception`: index and positions are required !
+
+        :return: The geometry.
+        :rtype: Geometry
+        """
+        if (
+            self.lattice is not None
+            and self.__sites is None
+            and self.__neighbors is None
+        ):
+            return self.lattice.geometry(
+                self.num_shells,
+                jex=self.jex,
+                type=self.type,
+                mu=self.mu,
+                anisotropy_constant=self.anisotropy_constant,
+                anisotopy_axis=self.anisotopy_axis,
+                field_axis=self.field_axis,
+            )
+        return Geometry.from_dict(self.__geometry_dict())
+
+    def __geometry_dict(self):
+        # the sites and the neighbors, where the missing attributes take the values
+        # of the sample
         for site in self.sites:
             if "index" not in site or "position" not in site:
                 raise Exception("index and positions are required !")
@@ -105,29 +228,21 @@ class Sample:
             if "jex" not in neighbor:
                 neighbor["jex"] = self.jex
 
-        sample = {
-            "geometry": {"sites": self.sites, "neighbors": self.neighbors},
-            "parameters": {
-                "units": self.units,
-                "damping": self.damping,
-                "gyromagnetic": self.gyromagnetic,
-                "deltat": self.deltat,
-            },
-            "temperature": self.temperature,
-            "field": self.field,
-            "num_iterations": self.num_iterations,
-        }
-
-        if self.seed:
-            sample["seed"] = self.seed
+        return {"sites": self.sites, "neighbors": self.neighbors}
 
-        if self.initial_state:
-            sample["initial_state"] = self.initial_state
-
-        return sample
-
-    def save(self, output):
+    def save(self, output, binary=False):
         """It is a function to save all the information created in the ``build``
-        function in a json file."""
-        with open(output, "w") as outfile:
-            json.dump(self.build(), outfile, sort_keys=False, indent=2)
+        function in a json file. The geometry is built by ``build_geometry``, so a
+        lattice is not turned into lists of sites and neighbors.
+
+        :param output: The output file, or directory for the binary format.
+        :type output: str
+        :param binary: If it is True, the sample is saved in the binary format, with
+        one typed column per attribute of the sites and the neighbors.
+        :type binary: bool
+        """
+        sample = self.__build(self.build_geometry())
+        if binary:
+            write_binary_sample(sample, output)
+        else:
+            write_json_sample(sample, output)
@@ -0,0 +1,168 @@
+import json
+import os
+
+import numpy
+
+from llg.geometry import Geometry, Links, Sites
+
+# Name of the file, inside a binary sample directory, with everything but the
+# geometry and the initial state.
+SAMPLE_FILE = "sample.json"
+
+
+def is_binary_sample(path):
+    """It checks if a sample is in the binary format, that is, a directory with a
+    ``sample.json`` file and one ``.npy`` file per column of the geometry.
+
+    :param path: The path of the sample.
+    :type path: str
+
+    :return: True if it is a binary sample.
+    :rtype: bool
+    """
+    return os.path.isdir(path) and os.path.isfile(os.path.join(path, SAMPLE_FILE))
+
+
+def read_sample(path, cache=None):
+    """It reads a sample in any of the supported formats. The ``geometry`` of the
+    returned dictionary is a ``Geometry``.
+
+    :param path: The path of the sample. It is a JSON file or a binary sample
+    directory.
+    :type path: str
+    :param cache: The ``GeometryCache`` with the compiled samples. If it is None,
+    the sample is always read from ``path``.
+    :type cache: GeometryCache
+
+    :return: The sample.
+    :rtype: dict
+    """
+    if cache is not None:
+        return cache.load(path, read_sample)
+
+    if is_binary_sample(path):
+        return read_binary_sample(path)
+
+    with open(path) as file:
+        sample = json.load(file)
+
+    sample["geometry"] = Geometry.from_dict(sample["geometry"])
+    return sample
+
+
+def read_binary_sample(directory, mmap_mode="r", validate=True):
+    """It reads a binary sample. The columns are memory-mapped, so they are not
+    copied until they are used.
+
+    :param directory: The directory of the binary sample.
+    :type directory: str
+    :param mmap_mode: The mode used to memory-map the columns. If it is None, they
+    are read into memory.
+    :type mmap_mode: str
+    :param validate: If the geometry is validated, as it is done for a JSON sample.
+    It reads every column once.
+    :type validate: bool
+
+    :raises :class:`Exception`: The geometry is not valid.
+
+    :return: The sample. Its ``geometry`` is a ``Geometry``.
+    :rtype: dict
+    """
+    with open(os.path.join(directory, SAMPLE_FILE)) as file:
+        sample = json.load(file)
+
+    def load(group, field):
+        return numpy.load(
+            os.path.join(directory, group, f"{field}.npy"), mmap_mode=mmap_mode
+        )
+
+    sites = Sites(*(load("sites", field) for field in Sites._fields))
+    links = Links(*(load("neighbors", field) for field in Links._fields))
+    if validate:
+        Geometry.validate(sites, links)
+    sample["geometry"] = Geometry(sites, links)
+
+    initial_state_file = os.path.join(directory, "initial_state.npy")
+    if os.path.isfile(initial_state_file):
+        sample["initial_state"] = numpy.load(initial_state_file, mmap_mode=mmap_mode)
+
+    return sample
+
+
+def write_binary_sample(sample, directory):
+    """It writes a sample in the binary format. The geometry is validated, and each
+    column of the sites and the neighbors is stored as a typed ``.npy`` file.
+
+    :param sample: The sample, as built by ``Sample.build``, or as returned by
+    ``read_sample``.
+    :type sample: dict
+    :param directory: The directory of the binary sample. It is created if it does
+    not exist.
+    :type directory: str
+    """
+    sample = dict(sample)
+    geometry = sample.pop("geometry")
+    if isinstance(geometry, Geometry):
+        Geometry.validate(geometry.sites, geometry.links)
+    else:
+        geometry = Geometry.from_dict(geometry)
+    initial_state = sample.pop("initial_state", None)
+
+    for group, columns in (("sites", geometry.sites), ("neighbors", geometry.links)):
+        os.makedirs(os.path.join(directory, group), exist_ok=True)
+        for field, column in zip(columns._fields, columns):
+            numpy.save(os.path.join(directory, group, f"{field}.npy"), column)
+
+    initial_state_file = os.path.join(directory, "initial_state.npy")
+    if initial_state is not None:
+        numpy.save(initial_state_file, numpy.asarray(initial_state, dtype=float))
+    elif os.path.isfile(initial_state_file):
+        os.remove(initial_state_file)
+
+    with open(os.path.join(directory, SAMPLE_FILE), "w") as file:
+        json.dump(sample, file, sort_keys=False, indent=2)
+
+
+def write_json_sample(sample, output):
+    """It writes a sample in the JSON format.
+
+    :param sample: The sample, as built by ``Sample.build``, or as returned by
+    ``read_sample``.
+    :type sample: dict
+    :param output: The JSON file.
+    :type output: str
+    """
+    sample = dict(sample)
+    geometry = sample["geometry"]
+    if isinstance(geometry, Geometry):
+        sites, links = geometry.sites, geometry.links
+        sample["geometry"] = {
+            "sites": [
+                dict(zip(Sites._fields, values))
+                for values in zip(*(column.tolist() for column in sites))
+            ],
+            "neighbors": [
+                dict(zip(Links._fields, values))
+                for values in zip(*(column.tolist() for column in links))
+            ],
+        }
+    if "initial_state" in sample:
+        sample["initial_state"] = numpy.asarray(sample["initial_state"]).tolist()
+
+    with open(output, "w") as outfile:
+        json.dump(sample, outfile, sort_keys=False, indent=2)
+
+
+def convert_sample(source, destination):
+    """It converts a JSON sample to the binary format, or a binary sample to the
+    JSON format.
+
+    :param source: The JSON file or the binary sample directory.
+    :type source: str
+    :param destination: The output, in the other format.
+    :type destination: str
+    """
+    if is_binary_sample(source):
+        write_json_sample(read_binary_sample(source), destination)
+    else:
+        write_binary_sample(read_sample(source), destination)
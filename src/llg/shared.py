@@ -0,0 +1,64 @@
+from multiprocessing import shared_memory
+
+import numpy
+
+
+class SharedArrays:
+    """This is a class for place numpy arrays in shared memory, so that the worker
+    processes map them instead of receiving a copy each. The blocks are released by
+    the process that created them, when it is closed.
+
+    :param arrays: The arrays by name. Their dtypes can not hold python objects.
+    :type arrays: dict
+    """
+
+    def __init__(self, arrays):
+        """The constructor for SharedArrays class."""
+        self.blocks = []
+        self.handles = {}
+        try:
+            for name, array in arrays.items():
+                array = numpy.ascontiguousarray(array)
+                if array.dtype.hasobject:
+                    raise Exception(f"The array `{name}` can not be shared.")
+                block = shared_memory.SharedMemory(
+                    create=True, size=max(array.nbytes, 1)
+                )
+                self.blocks.append(block)
+                numpy.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+                self.handles[name] = (block.name, array.shape, array.dtype.str)
+        except BaseException:
+            self.close()
+            raise
+
+    @staticmethod
+    def attach(handles):
+        """It maps the arrays of a ``SharedArrays`` in another process.
+
+        :param handles: The ``handles`` of the ``SharedArrays``.
+        :type handles: dict
+
+        :return: The arrays by name, and the blocks, which have to be kept while the
+        arrays are used.
+        :rtype: tuple
+        """
+        arrays = {}
+        blocks = []
+        for name, (block_name, shape, dtype) in handles.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            arrays[name] = numpy.ndarray(shape, dtype, buffer=block.buf)
+        return arrays, blocks
+
+    def close(self):
+        """It releases the blocks."""
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
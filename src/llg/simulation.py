@@ -1,13 +1,27 @@
-import json
+import multiprocessing
+import queue
 import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Optional
 
+import numba
 import numpy
 from tqdm import tqdm
 
 from llg.bucket import Bucket
-from llg.functions import energy, heun
+from llg.functions import external_fields, heun, tempering
+from llg.geometry import CSR, Geometry, Links, Sites
+from llg.sample_file import read_sample
+from llg.shared import SharedArrays
 from llg.system import System
 
+# the outputs of a worker process are sent in batches of about this size in bytes,
+# and at most ``WORKER_QUEUE_SIZE`` batches of a pair wait to be read
+WORKER_BATCH_BYTES = 2**24
+WORKER_QUEUE_SIZE = 2
+
 
 def get_random_state(num_sites):
     random_state = numpy.random.normal(size=(num_sites, 3))
@@ -32,8 +46,34 @@ class Simulation:
     :type num_iterations: int
     :param seed: The seed for the random state.
     :type seed: int
-    :param initial_state: The initial state of the sites in te system.
+    :param initial_state: The initial state of the sites in te system. If there are
+    replicas, it may also have a state per replica.
     :type initial_state: list
+    :param threads: The number of threads used by the kernels. If it is greater than
+    one, the thread-parallel kernels are used. By default, the serial ones are used.
+    :type threads: int
+    :param sample_every: The number of iterations between two outputs. The steps in
+    between are advanced by the compiled integrator, and the energies are only
+    computed for the outputs. It should be a divisor of the number of iterations.
+    :type sample_every: int
+    :param equilibration_steps: The number of iterations advanced at each temperature
+    and field pair before the first output.
+    :type equilibration_steps: int
+    :param replicas: The number of independent replicas of the state, which are
+    advanced together with their own noise. If it is given, the states have a leading
+    axis of replicas and the energies are arrays with a value per replica.
+    :type replicas: int
+    :param exchange_every: The number of iterations between two replica exchanges.
+    If it is given, the simulation runs in parallel tempering: a replica of the state
+    is advanced at each temperature, all of them together, and the replicas of
+    adjacent temperatures exchange their states with the Metropolis criterion. It
+    needs a single field and positive temperatures.
+    :type exchange_every: int
+    :param workers: The number of processes. If it is greater than one, the
+    temperature and field pairs are run independently by a pool of processes, and
+    every pair starts from the initial state instead of the last state of the
+    previous pair.
+    :type workers: int
     """
 
     def __init__(
@@ -44,6 +84,12 @@ class Simulation:
         num_iterations=None,
         seed=None,
         initial_state=None,
+        threads=None,
+        sample_every=1,
+        equilibration_steps=0,
+        replicas=None,
+        exchange_every=None,
+        workers=None,
     ):
         """
         The constructor for Simulation class.
@@ -64,55 +110,171 @@ class Simulation:
             self.seed = random.getrandbits(32)
 
         numpy.random.seed(self.seed)
-        if initial_state:
-            self.initial_state = initial_state
+        num_sites = self.system.geometry.num_sites
+        if replicas is not None and replicas < 1:
+            raise Exception("`replicas` should be a positive integer.")
+        self.replicas = replicas
+
+        if exchange_every is not None:
+            if exchange_every < 1:
+                raise Exception("`exchange_every` should be a positive integer.")
+            if replicas is not None:
+                raise Exception("`replicas` and `exchange_every` are exclusive.")
+            if len(numpy.unique(field.values)) > 1:
+                raise Exception("The parallel tempering needs a single field.")
+            if min(temperature.values) <= 0:
+                raise Exception("The parallel tempering needs positive temperatures.")
+            # a replica per temperature
+            replicas = len(temperature)
+        self.exchange_every = exchange_every
+
+        if workers is not None and workers < 1:
+            raise Exception("`workers` should be a positive integer.")
+        if workers and workers > 1 and exchange_every is not None:
+            raise Exception("`workers` and `exchange_every` are exclusive.")
+        self.workers = workers
+
+        # the statistics of the replica exchanges, by pair of adjacent temperatures
+        num_pairs = len(temperature) - 1 if exchange_every is not None else 0
+        self.swap_attempts = numpy.zeros(num_pairs, dtype=numpy.int64)
+        self.swap_acceptances = numpy.zeros(num_pairs, dtype=numpy.int64)
+
+        # the number of replicas of the state, also in parallel tempering, and their
+        # initial states
+        self.__num_replicas = replicas
+        self.initial_states = None
+        if initial_state is not None:
+            self.set_initial_state(initial_state)
+        elif replicas is None:
+            self.set_initial_state(get_random_state(num_sites))
         else:
-            self.initial_state = get_random_state(self.system.geometry.num_sites)
+            self.set_initial_state(
+                [get_random_state(num_sites) for _ in range(replicas)]
+            )
+
+        # the number of threads of numba is fixed by the environment variable
+        # ``NUMBA_NUM_THREADS``, and defaults to the number of cores
+        max_threads: int = numba.config.NUMBA_NUM_THREADS  # type: ignore[attr-defined]
+        if threads and threads > max_threads:
+            raise Exception(
+                f"`threads` should be at most {max_threads}, set the environment "
+                "variable NUMBA_NUM_THREADS to use more threads."
+            )
+        self.threads = threads
+
+        if sample_every < 1 or self.num_iterations % sample_every != 0:
+            raise Exception("`sample_every` is not a divisor of `num_iterations`")
+        if equilibration_steps < 0:
+            raise Exception("`equilibration_steps` should not be negative.")
+        self.sample_every = sample_every
+        self.equilibration_steps = equilibration_steps
 
-        self.initial_state = numpy.array(self.initial_state)
+        # buffers reused by every step of the integrator
+        self.workspace = heun.allocate_workspace(num_sites, replicas)
 
     @classmethod
-    def from_file(cls, simulation_file):
+    def from_file(
+        cls,
+        simulation_file,
+        threads=None,
+        cache=None,
+        sample_every=None,
+        equilibration_steps=None,
+        exchange_every=None,
+        workers=None,
+    ):
         """It is a function decorator, it creates the simulation file.
 
         :param simulation_file: File that contains index, position, type, mu,
         anisotropy_constant, anisotopy_axis, and field_axis of each site. Also it
-        contains a source, target, and jex.
+        contains a source, target, and jex. It can also be a binary sample directory.
         :type simulation_file: file
+        :param threads: The number of threads used by the kernels.
+        :type threads: int
+        :param cache: The ``GeometryCache`` used to load the compiled geometry.
+        :type cache: GeometryCache
+        :param sample_every: The number of iterations between two outputs. If it is
+        None, it is read from the file, or it is 1.
+        :type sample_every: int
+        :param equilibration_steps: The number of iterations before the first output of
+        each pair. If it is None, it is read from the file, or it is 0.
+        :type equilibration_steps: int
+        :param exchange_every: The number of iterations between two replica exchanges
+        of the parallel tempering. If it is None, it is read from the file, or the
+        simulation is not run in parallel tempering.
+        :type exchange_every: int
+        :param workers: The number of processes for the temperature and field pairs.
+        :type workers: int
 
         :return: Object that contains the ``system object``, temperature, field,
         num_iterations, seed and initial_state.
         :rtype: Object
         """
-        with open(simulation_file) as file:
-            simulation_dict = json.load(file)
+        simulation_dict = read_sample(simulation_file, cache)
 
-        system = System.from_file(simulation_file)
+        system = System.from_dict(simulation_dict)
         initial_state = simulation_dict.get("initial_state")
         num_iterations = simulation_dict.get("num_iterations")
         seed = simulation_dict.get("seed")
+        if sample_every is None:
+            sample_every = simulation_dict.get("sample_every", 1)
+        if equilibration_steps is None:
+            equilibration_steps = simulation_dict.get("equilibration_steps", 0)
+        if exchange_every is None:
+            exchange_every = simulation_dict.get("exchange_every")
 
         temperature = Bucket(simulation_dict["temperature"])
         field = Bucket(simulation_dict["field"])
         temperature, field = Bucket.match_sizes(temperature, field)
 
-        return cls(system, temperature, field, num_iterations, seed, initial_state)
+        return cls(
+            system,
+            temperature,
+            field,
+            num_iterations,
+            seed,
+            initial_state,
+            threads,
+            sample_every,
+            equilibration_steps,
+            None,
+            exchange_every,
+            workers,
+        )
 
     def set_num_iterations(self, num_iterations):
         """It is a function to set the number of iterations.
 
-        :param num_iterations: The number of iterations for evolve the system.
+        :param num_iterations: The number of iterations for evolve the system. It
+        should be a multiple of ``sample_every``.
         :type num_iterations: int
         """
+        if num_iterations % self.sample_every != 0:
+            raise Exception("`sample_every` is not a divisor of `num_iterations`")
         self.num_iterations = num_iterations
 
     def set_initial_state(self, initial_state):
-        """It is a function to set the initial state for each site.
+        """It is a function to set the initial state for each site. If there are
+        replicas, every replica starts from it, or it may have a state per replica,
+        and then ``initial_state`` is the state of the first one.
 
         :param initial_state: The initial state of the sites in te system.
         :type initial_state: list
         """
-        self.initial_state = numpy.array(initial_state)
+        initial_state = numpy.array(initial_state)
+        if self.__num_replicas is None:
+            self.initial_state = initial_state
+        elif initial_state.ndim == 2:
+            # every replica starts from the same state
+            self.initial_state = initial_state
+            self.initial_states = numpy.repeat(
+                initial_state[numpy.newaxis], self.__num_replicas, axis=0
+            )
+        else:
+            if len(initial_state) != self.__num_replicas:
+                raise Exception("There should be an initial state per replica.")
+            self.initial_state = initial_state[0]
+            self.initial_states = initial_state
 
     @property
     def information(self):
@@ -129,7 +291,11 @@ class Simulation:
         :rtype: float/list
         :return: seed
         :rtype: int
-        :return: num_iterations
+        :return: num_iterations, the number of outputs of each pair
+        :rtype: int
+        :return: sample_every
+        :rtype: int
+        :return: equilibration_steps
         :rtype: int
         :return: positions
         :rtype: list
@@ -137,8 +303,16 @@ class Simulation:
         :rtype: str
         :return: initial_state
         :rtype: list
+        :return: initial_states, the initial states of the replicas, or None
+        :rtype: list
         :return: num_TH
         :rtype: int
+        :return: num_replicas
+        :rtype: int
+        :return: exchange_every
+        :rtype: int
+        :return: tempering, if the frames of ``run`` are interleaved by iteration
+        :rtype: bool
         """
         return {
             "num_sites": self.system.geometry.num_sites,
@@ -146,11 +320,17 @@ class Simulation:
             "temperature": self.temperature.values,
             "field": self.field.values,
             "seed": self.seed,
-            "num_iterations": self.num_iterations,
+            "num_iterations": self.num_iterations // self.sample_every,
+            "sample_every": self.sample_every,
+            "equilibration_steps": self.equilibration_steps,
             "positions": self.system.geometry.positions,
             "types": self.system.geometry.types,
             "initial_state": self.initial_state,
+            "initial_states": self.initial_states,
             "num_TH": len(self.temperature),
+            "num_replicas": self.replicas or 1,
+            "exchange_every": self.exchange_every,
+            "tempering": self.exchange_every is not None,
         }
 
     def run(self):
@@ -159,6 +339,34 @@ class Simulation:
         calculate the exchange energy, anisotropy energy, magnetic energy, and hence,
         the total energy of the system.
 
+        The steps between two outputs are advanced inside a single compiled call
+        (``heun.integrate_n``), and the state and the energies are only computed and
+        yielded every ``sample_every`` iterations, after ``equilibration_steps``
+        iterations at each temperature and field pair. The neighbors are taken in CSR
+        layout, so the sites may have different numbers of neighbors.
+
+        The integration is carried out in place over the buffers of ``workspace``,
+        so the yielded states are copies of the evolving state.
+
+        The energies of each output are computed by ``heun.integrate_n`` in a single
+        sweep over the sites, after the last step of the call.
+
+        The thermal noise is drawn inside the compiled kernels from a counter-based
+        generator keyed by the seed, the step and the site, so a seed gives the same
+        trajectory with any number of threads.
+
+        If ``replicas`` is given, the replicas are advanced together by
+        ``heun.integrate_replicas_n`` with the r-th stream of the generator, and
+        the first replica follows the trajectory of a single state.
+
+        If ``exchange_every`` is given, the simulation runs in parallel tempering, and
+        the frames of every temperature are interleaved: the outputs of the first
+        iteration of every temperature, then the ones of the second iteration, and so
+        on.
+
+        If ``workers`` is greater than one, the pairs are run by a pool of processes,
+        each one from the initial state, as given by ``run_point``.
+
         :param spin_norms: It receives the spin norms of the sites in the system.
         :type spin_norms: list
         :param damping: It receives the damping constant of the sites in the system.
@@ -191,58 +399,463 @@ class Simulation:
         :param state: It receives the initial state of the system.
         :type state: list
         """
+        if self.exchange_every is not None:
+            yield from self.__run_tempering()
+        elif self.workers and self.workers > 1:
+            yield from self.__run_workers()
+        else:
+            # every pair starts from the last state of the previous one
+            state = numpy.array(self.__initial_states(), dtype=float)
+            for i in range(len(self.temperature)):
+                yield from self.run_point(i, state)
+
+    def run_point(self, i, state=None, progress=True):
+        """This function creates a generator of the outputs of a temperature and field
+        pair, as given by ``run``. The noise is keyed by the step of the pair in the
+        whole run, so the outputs only depend on the state at the beginning of the
+        pair.
+
+        :param i: The index of the temperature and field pair.
+        :type i: int
+        :param state: The state at the beginning of the pair, which is evolved in
+        place. By default, it is a copy of the initial state.
+        :type state: numpy.ndarray
+        :param progress: If the progress bar is shown.
+        :type progress: bool
+        """
         spin_norms = self.system.geometry.spin_norms
         damping = self.system.damping
         deltat = self.system.deltat
         gyromagnetic = self.system.gyromagnetic
         kb = self.system.kb
         field_axes = self.system.geometry.field_axes
-        exchanges = self.system.geometry.exchanges
-        neighbors = self.system.geometry.neighbors
+        csr = self.system.geometry.csr
         anisotropy_constants = self.system.geometry.anisotropy_constants
         anisotropy_vectors = self.system.geometry.anisotropy_axes
         num_sites = self.system.geometry.num_sites
-        state = self.initial_state
-
-        for T, H in zip(self.temperature, self.field):
-            temperatures = numpy.array([T] * num_sites)
-            magnetic_fields = H * field_axes
-
-            for _ in tqdm(range(self.num_iterations)):
-                state = heun.integrate(
-                    state,
-                    spin_norms,
-                    temperatures,
-                    damping,
-                    deltat,
-                    gyromagnetic,
-                    kb,
-                    magnetic_fields,
-                    exchanges,
-                    neighbors,
-                    anisotropy_constants,
-                    anisotropy_vectors,
-                )
+        if state is None:
+            state = numpy.array(self.__initial_states(), dtype=float)
+        sample_every = self.sample_every
+        equilibration_steps = self.equilibration_steps
+        parallel = self.__set_threads()
 
-                exchange_energy_value = energy.compute_exchange_energy(
-                    state, exchanges, neighbors
-                )
-                anisotropy_energy_value = energy.compute_anisotropy_energy(
-                    state, anisotropy_constants, anisotropy_vectors
-                )
-                magnetic_energy_value = energy.compute_magnetic_energy(
-                    state, spin_norms, magnetic_fields
+        # the exchange, anisotropy, magnetic, and total energies, computed by the
+        # integrator in a single sweep after the last step of each call
+        if self.replicas is None:
+            integrate_n = heun.integrate_n
+            energies = numpy.empty(4)
+        else:
+            integrate_n = heun.integrate_replicas_n
+            energies = numpy.empty((self.replicas, 4))
+
+        T = self.temperature.values[i]
+        H = self.field.values[i]
+        temperatures = numpy.array([T] * num_sites, dtype=float)
+        magnetic_fields = H * field_axes
+        intensity = external_fields.thermal_intensity(
+            temperatures, spin_norms, damping, deltat, gyromagnetic, kb
+        )
+        if self.replicas is not None:
+            # every replica is at the same temperature and field
+            temperatures, magnetic_fields, intensity = (
+                numpy.repeat(values[numpy.newaxis], self.replicas, axis=0)
+                for values in (temperatures, magnetic_fields, intensity)
+            )
+
+        # the noise is keyed by the seed and the global step
+        first_step = i * (equilibration_steps + self.num_iterations)
+        if equilibration_steps:
+            state = integrate_n(
+                state,
+                spin_norms,
+                temperatures,
+                damping,
+                deltat,
+                gyromagnetic,
+                kb,
+                magnetic_fields,
+                csr.indptr,
+                csr.indices,
+                csr.jex,
+                anisotropy_constants,
+                anisotropy_vectors,
+                equilibration_steps,
+                self.workspace,
+                state,
+                parallel,
+                self.seed,
+                first_step,
+                intensity,
+            )
+
+        for k in tqdm(range(self.num_iterations // sample_every), disable=not progress):
+            step = first_step + equilibration_steps + k * sample_every
+            state = integrate_n(
+                state,
+                spin_norms,
+                temperatures,
+                damping,
+                deltat,
+                gyromagnetic,
+                kb,
+                magnetic_fields,
+                csr.indptr,
+                csr.indices,
+                csr.jex,
+                anisotropy_constants,
+                anisotropy_vectors,
+                sample_every,
+                self.workspace,
+                state,
+                parallel,
+                self.seed,
+                step,
+                intensity,
+                energies,
+            )
+
+            if self.replicas is None:
+                yield (state.copy(), *energies.tolist())
+            else:
+                yield (state.copy(), *energies.T.copy())
+
+    def __initial_states(self):
+        # the states the pairs start from, with a leading axis of replicas if any
+        if self.initial_states is None:
+            return self.initial_state
+        return self.initial_states
+
+    def __set_threads(self):
+        # it sets the threads of the kernels, and tells if the parallel ones are used
+        parallel = bool(self.threads and self.threads > 1)
+        if parallel:
+            numba.set_num_threads(self.threads)
+        return parallel
+
+    def __run_workers(self):
+        # the pairs are run by a pool of processes, which map the geometry and the
+        # initial state from shared memory, so every pair starts from the initial
+        # state. A pair sends its outputs in batches through the bounded queue of its
+        # slot, and there is a slot per process, so the outputs in memory do not
+        # depend on the number of iterations. The outputs are given pair by pair, in
+        # order, and the pair of a slot is submitted when the previous one is read.
+        # The processes are spawned, since the threads of the kernels do not survive
+        # a fork.
+        geometry = self.system.geometry
+        arrays = {
+            "type_codes": geometry.type_codes,
+            "initial_state": self.__initial_states(),
+        }
+        for group, columns in (
+            ("sites", geometry.sites),
+            ("links", geometry.links),
+            ("csr", geometry.csr),
+        ):
+            for field, column in zip(columns._fields, columns):
+                arrays[f"{group}.{field}"] = column
+        arguments = (
+            self.system.parameters,
+            self.temperature,
+            self.field,
+            self.num_iterations,
+            self.seed,
+            self.threads,
+            self.sample_every,
+            self.equilibration_steps,
+            self.replicas,
+        )
+
+        context = multiprocessing.get_context("spawn")
+        queues = [context.Queue(WORKER_QUEUE_SIZE) for _ in range(self.workers)]
+        stop = context.Event()
+        points = iter(range(len(self.temperature)))
+        with SharedArrays(arrays) as shared, ProcessPoolExecutor(
+            self.workers,
+            context,
+            initializer=initialize_worker,
+            initargs=(shared.handles, arguments, queues, stop),
+        ) as pool:
+            try:
+                pending = deque(
+                    (i, pool.submit(run_worker_point, i, i % self.workers))
+                    for i in islice(points, self.workers)
                 )
-                total_energy_value = (
-                    exchange_energy_value
-                    + anisotropy_energy_value
-                    + magnetic_energy_value
+                for _ in tqdm(range(len(self.temperature))):
+                    i, future = pending.popleft()
+                    for states, energies in receive_batches(
+                        queues[i % self.workers], future
+                    ):
+                        for state, values in zip(states, energies):
+                            yield (state, *values)
+                    pending.extend(
+                        (i, pool.submit(run_worker_point, i, i % self.workers))
+                        for i in islice(points, 1)
+                    )
+            finally:
+                # the pairs of an unfinished run do not wait for their batches to
+                # be read
+                stop.set()
+
+    def __run_tempering(self):
+        # a replica per temperature, advanced together by `integrate_replicas_n` with
+        # the r-th stream of the generator. The steps are split at the outputs and at
+        # the exchanges, since both need the energies of the replicas.
+        spin_norms = self.system.geometry.spin_norms
+        damping = self.system.damping
+        deltat = self.system.deltat
+        gyromagnetic = self.system.gyromagnetic
+        kb = self.system.kb
+        field_axes = self.system.geometry.field_axes
+        csr = self.system.geometry.csr
+        anisotropy_constants = self.system.geometry.anisotropy_constants
+        anisotropy_vectors = self.system.geometry.anisotropy_axes
+        num_sites = self.system.geometry.num_sites
+        states = numpy.array(self.initial_states, dtype=float)
+        num_replicas = len(states)
+        parallel = self.__set_threads()
+
+        temperature = numpy.array(self.temperature.values, dtype=float)
+        temperatures = numpy.repeat(temperature[:, numpy.newaxis], num_sites, axis=1)
+        magnetic_fields = numpy.array([H * field_axes for H in self.field])
+        intensity = numpy.array(
+            [
+                external_fields.thermal_intensity(
+                    row, spin_norms, damping, deltat, gyromagnetic, kb
                 )
+                for row in temperatures
+            ]
+        )
+        betas = 1 / (kb * temperature)
+        energies = numpy.empty((num_replicas, 4))
+
+        self.swap_attempts[:] = 0
+        self.swap_acceptances[:] = 0
+
+        num_steps = self.equilibration_steps + self.num_iterations
+        next_output = self.equilibration_steps + self.sample_every
+        next_exchange = self.exchange_every
+        num_exchanges = 0
+        step = 0
+        progress = tqdm(total=num_steps)
+        while step < num_steps:
+            stop = min(next_output, next_exchange, num_steps)
+            states = heun.integrate_replicas_n(
+                states,
+                spin_norms,
+                temperatures,
+                damping,
+                deltat,
+                gyromagnetic,
+                kb,
+                magnetic_fields,
+                csr.indptr,
+                csr.indices,
+                csr.jex,
+                anisotropy_constants,
+                anisotropy_vectors,
+                stop - step,
+                self.workspace,
+                states,
+                parallel,
+                self.seed,
+                step,
+                intensity,
+                energies,
+            )
+            progress.update(stop - step)
+            step = stop
 
-                yield (
-                    state,
-                    exchange_energy_value,
-                    anisotropy_energy_value,
-                    magnetic_energy_value,
-                    total_energy_value,
+            if step == next_exchange:
+                # the even and the odd pairs alternate
+                tempering.exchange_replicas(
+                    states,
+                    energies,
+                    betas,
+                    num_exchanges % 2,
+                    numpy.random.uniform(size=num_replicas - 1),
+                    self.swap_attempts,
+                    self.swap_acceptances,
                 )
+                num_exchanges += 1
+                next_exchange += self.exchange_every
+
+            if step == next_output:
+                for r in range(num_replicas):
+                    yield (states[r].copy(), *energies[r].tolist())
+                next_output += self.sample_every
+        progress.close()
+
+    @property
+    def swap_statistics(self):
+        """It gives the statistics of the replica exchanges of the last parallel
+        tempering run, for each pair of adjacent temperatures.
+
+        :return: The lines with the two temperatures, the number of attempts, the
+        number of accepted exchanges and the acceptance rate.
+        :rtype: list
+        """
+        statistics = []
+        for r, (attempts, acceptances) in enumerate(
+            zip(self.swap_attempts, self.swap_acceptances)
+        ):
+            rate = acceptances / attempts if attempts else numpy.nan
+            statistics.append(
+                f"{self.temperature.values[r]} {self.temperature.values[r + 1]} "
+                f"{attempts} {acceptances} {rate}"
+            )
+        return statistics
+
+
+class Worker:
+    """This is a class for the state of a worker process of ``Simulation.run``: its
+    simulation, the queues of the slots, and the event that stops the run.
+
+    :param simulation: The simulation of the process.
+    :type simulation: Simulation
+    :param queues: The queues where the pairs of each slot send their outputs.
+    :type queues: list
+    :param stop: The event set when the outputs are no longer read.
+    :type stop: multiprocessing.Event
+    :param blocks: The shared memory blocks of the arrays of the simulation, which
+    are kept while it runs.
+    :type blocks: list
+    """
+
+    def __init__(self, simulation, queues, stop, blocks=None):
+        """The constructor for Worker class."""
+        self.simulation = simulation
+        self.queues = queues
+        self.stop = stop
+        self.blocks = blocks or []
+
+    def run_point(self, i, slot):
+        """It runs a temperature and field pair, and sends its outputs in batches
+        through the queue of the slot. The end of the pair is sent as None, even if
+        it fails.
+
+        :param i: The index of the temperature and field pair.
+        :type i: int
+        :param slot: The index of the queue.
+        :type slot: int
+        """
+        simulation = self.simulation
+        num_replicas = simulation.replicas or 1
+        state_bytes = num_replicas * simulation.system.geometry.num_sites * 3 * 8
+        batch_length = max(1, WORKER_BATCH_BYTES // state_bytes)
+        states = []
+        energies = []
+        try:
+            for state, *values in simulation.run_point(i, progress=False):
+                states.append(state)
+                energies.append(values)
+                if len(states) == batch_length:
+                    if not self.send(slot, (numpy.array(states), energies)):
+                        return
+                    states = []
+                    energies = []
+            if states:
+                self.send(slot, (numpy.array(states), energies))
+        finally:
+            self.send(slot, None)
+
+    def send(self, slot, batch):
+        """It puts a batch in the queue of a slot, while the outputs are read.
+
+        :param slot: The index of the queue.
+        :type slot: int
+        :param batch: The states and the energies of consecutive outputs.
+        :type batch: tuple
+
+        :return: If the batch was sent.
+        :rtype: bool
+        """
+        while not self.stop.is_set():
+            try:
+                self.queues[slot].put(batch, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+
+# the state of the worker process, built by ``initialize_worker``
+worker: Optional[Worker] = None
+
+
+def initialize_worker(handles, arguments, queues, stop):
+    """It builds the simulation of a worker process from the arrays in shared memory.
+
+    :param handles: The ``handles`` of the ``SharedArrays`` of the geometry and the
+    initial state.
+    :type handles: dict
+    :param arguments: The parameters, temperature, field, num_iterations, seed,
+    threads, sample_every, equilibration_steps, and replicas of the simulation.
+    :type arguments: tuple
+    :param queues: The queues where the pairs of each slot send their outputs.
+    :type queues: list
+    :param stop: The event set when the outputs are no longer read.
+    :type stop: multiprocessing.Event
+    """
+    global worker
+    arrays, blocks = SharedArrays.attach(handles)
+    geometry = Geometry(
+        Sites(*(arrays[f"sites.{field}"] for field in Sites._fields)),
+        Links(*(arrays[f"links.{field}"] for field in Links._fields)),
+        CSR(*(arrays[f"csr.{field}"] for field in CSR._fields)),
+        arrays["type_codes"],
+    )
+    parameters, temperature, field, *settings, replicas = arguments
+    num_iterations, seed, threads, sample_every, equilibration_steps = settings
+    simulation = Simulation(
+        System(geometry, parameters),
+        temperature,
+        field,
+        num_iterations,
+        seed,
+        arrays["initial_state"],
+        threads,
+        sample_every,
+        equilibration_steps,
+        replicas,
+    )
+    for slot in queues:
+        # the process does not wait at exit for the batches nobody reads
+        slot.cancel_join_thread()
+    worker = Worker(simulation, queues, stop, blocks)
+
+
+def run_worker_point(i, slot):
+    """It runs a temperature and field pair in the worker process, with
+    ``Worker.run_point``.
+
+    :param i: The index of the temperature and field pair.
+    :type i: int
+    :param slot: The index of the queue.
+    :type slot: int
+    """
+    if worker is None:
+        raise Exception("The worker process is not initialized.")
+    worker.run_point(i, slot)
+
+
+def receive_batches(slot, future):
+    """It iterates over the batches of a pair run by ``run_worker_point``, until its
+    end. If the pair failed, its exception is raised.
+
+    :param slot: The queue of the pair.
+    :type slot: multiprocessing.Queue
+    :param future: The future of the pair.
+    :type future: concurrent.futures.Future
+    """
+    while True:
+        try:
+            batch = slot.get(timeout=0.1)
+        except queue.Empty:
+            if future.done() and future.exception() is not None:
+                # the process of the pair was lost before the end was sent
+                future.result()
+            continue
+        if batch is None:
+            future.result()
+            return
+        yield batch
@@ -0,0 +1,580 @@
+import io
+import sys
+
+import click
+import numpy
+
+from llg.functions.magnetization import (
+    magnetization_vector,
+    magnetization_vector_by_type,
+)
+from llg.store import ReadHDF, StoreHDF
+
+
+class Sink:
+    """This is the base class for the consumers of the output of ``Simulation``. A
+    sink receives the information of the simulation, then every step of every
+    temperature and field pair, in order, and it is closed at the end.
+    """
+
+    def start(self, information):
+        """It receives the information of the simulation.
+
+        :param information: The information, as given by ``Simulation.information``.
+        :type information: dict
+        """
+
+    def write(
+        self,
+        i,
+        j,
+        state,
+        exchange_energy,
+        anisotropy_energy,
+        magnetic_energy,
+        total_energy,
+    ):
+        """It receives a step. The state may be overwritten after the call, so it has
+        to be copied to be kept.
+
+        :param i: The index of the temperature and field pair.
+        :type i: int
+        :param j: The iteration.
+        :type j: int
+        :param state: The state of the sites.
+        :type state: numpy.ndarray
+        :param exchange_energy: The exchange energy.
+        :type exchange_energy: float
+        :param anisotropy_energy: The anisotropy energy.
+        :type anisotropy_energy: float
+        :param magnetic_energy: The magnetic energy.
+        :type magnetic_energy: float
+        :param total_energy: The total energy.
+        :type total_energy: float
+        """
+
+    def write_observables(
+        self,
+        i,
+        j,
+        magnetization,
+        magnetization_by_type,
+        exchange_energy,
+        anisotropy_energy,
+        magnetic_energy,
+        total_energy,
+    ):
+        """It receives a step of a hdf file without states, as given by
+        ``ReadHDF.observables``. By default, the sinks need the states.
+
+        :param i: The index of the temperature and field pair.
+        :type i: int
+        :param j: The iteration.
+        :type j: int
+        :param magnetization: The magnetization vector.
+        :type magnetization: numpy.ndarray
+        :param magnetization_by_type: The magnetization vectors by type, in the order
+        of the sorted types.
+        :type magnetization_by_type: numpy.ndarray
+        :param exchange_energy: The exchange energy.
+        :type exchange_energy: float
+        :param anisotropy_energy: The anisotropy energy.
+        :type anisotropy_energy: float
+        :param magnetic_energy: The magnetic energy.
+        :type magnetic_energy: float
+        :param total_energy: The total energy.
+        :type total_energy: float
+        """
+        raise Exception(f"{self.__class__.__name__} needs the states.")
+
+    def close(self, error=None):
+        """It is called after the last step, or when the steps are stopped by an
+        error.
+
+        :param error: The error that stopped the steps, or None.
+        :type error: BaseException
+        """
+
+
+def frame_index(k, information):
+    """It gives the temperature and field pair and the iteration of a frame of
+    ``Simulation.run``. The frames are given pair by pair, or iteration by iteration
+    if the simulation runs in parallel tempering.
+
+    :param k: The index of the frame.
+    :type k: int
+    :param information: The information, as given by ``Simulation.information``.
+    :type information: dict
+
+    :return: The index of the temperature and field pair, and the iteration.
+    :rtype: tuple
+    """
+    if information.get("tempering", False):
+        j, i = divmod(k, information["num_TH"])
+    else:
+        i, j = divmod(k, information["num_iterations"])
+    return i, j
+
+
+def fan_out(information, frames, sinks, observables=False):
+    """It sends the output of a simulation to several sinks.
+
+    :param information: The information, as given by ``Simulation.information``.
+    :type information: dict
+    :param frames: The state and the four energies of each step, as yielded by
+    ``Simulation.run``. They are given pair by pair, or iteration by iteration if the
+    simulation runs in parallel tempering.
+    :type frames: iterable
+    :param sinks: The sinks.
+    :type sinks: list
+    :param observables: If the frames are the magnetization vectors and the energies
+    given by ``ReadHDF.iter_observables``, which are sent to ``write_observables``.
+    :type observables: bool
+    """
+    if information.get("num_replicas", 1) > 1:
+        raise Exception("The sinks take the output of a single replica.")
+    # the sinks are closed even if they are not fully started
+    started = []
+    error = None
+    try:
+        for sink in sinks:
+            started.append(sink)
+            sink.start(information)
+        for k, values in enumerate(frames):
+            i, j = frame_index(k, information)
+            for sink in sinks:
+                if observables:
+                    sink.write_observables(i, j, *values)
+                else:
+                    sink.write(i, j, *values)
+    except BaseException as exception:
+        error = exception
+        raise
+    finally:
+        for sink in reversed(started):
+            sink.close(error)
+
+
+class HDFSink(Sink):
+    """This is a class for store the output of the simulation in a hdf file.
+
+    :param filename: The hdf file.
+    :type filename: str
+    :param compress: If the datasets are compressed.
+    :type compress: bool
+    :param batch_size: The number of iterations written at once.
+    :type batch_size: int
+    :param chunks: The layout of the chunks of the states.
+    :type chunks: str
+    :param cache_size: The size in bytes of the chunk cache of the file.
+    :type cache_size: int
+    :param encoding: The encoding of the states.
+    :type encoding: str
+    :param state_every: The states are stored every ``state_every`` iterations.
+    :type state_every: int
+    :param observables_only: If only the energies and the magnetization vectors are
+    stored.
+    :type observables_only: bool
+    """
+
+    def __init__(
+        self,
+        filename,
+        compress=False,
+        batch_size=64,
+        chunks=None,
+        cache_size=None,
+        encoding=None,
+        state_every=1,
+        observables_only=False,
+    ):
+        """The constructor for HDFSink class."""
+        self.store = StoreHDF(
+            filename,
+            compress,
+            batch_size,
+            chunks,
+            cache_size,
+            encoding,
+            state_every,
+            observables_only,
+        )
+
+    def start(self, information):
+        self.store.open()
+        self.store.populate(information)
+
+    def write(
+        self,
+        i,
+        j,
+        state,
+        exchange_energy,
+        anisotropy_energy,
+        magnetic_energy,
+        total_energy,
+    ):
+        self.store.store(
+            state,
+            exchange_energy,
+            anisotropy_energy,
+            magnetic_energy,
+            total_energy,
+            i,
+            j,
+        )
+
+    def close(self, error=None):
+        # after an error, the open blocks are not written
+        self.store.close(flush=error is None)
+
+
+class RunningStatistics:
+    """This is a class for the running mean of several observables, updated sample
+    by sample, so the memory does not depend on the number of samples.
+
+    :param num_observables: The number of observables.
+    :type num_observables: int
+    """
+
+    def __init__(self, num_observables):
+        """The constructor for RunningStatistics class."""
+        self.count = 0
+        self.mean = numpy.zeros(num_observables)
+        self.__delta = numpy.empty(num_observables)
+
+    def reset(self):
+        """It discards every sample."""
+        self.count = 0
+        self.mean[:] = 0.0
+
+    def update(self, values):
+        """It adds a sample.
+
+        :param values: The value of each observable.
+        :type values: numpy.ndarray
+        """
+        self.count += 1
+        numpy.subtract(values, self.mean, out=self.__delta)
+        self.__delta /= self.count
+        self.mean += self.__delta
+
+
+class AveragesSink(Sink):
+    """This is a class for compute the averages of the energies and the magnetization
+    for each temperature and field pair. A line is printed as soon as every pair is
+    finished. The averages are accumulated step by step for each pair, so the memory
+    does not depend on the number of iterations, and the pairs may be interleaved.
+
+    :param output: The text file where the averages are printed.
+    :type output: file
+    :param by_types: If the magnetization is also averaged by type.
+    :type by_types: bool
+    :param components: If the components of the magnetization are also averaged.
+    :type components: bool
+    :param discard: The number of outputs discarded at the beginning of each pair. If
+    the simulation is sampled, it counts outputs, not iterations.
+    :type discard: int
+    :param header: If the header is printed.
+    :type header: bool
+    """
+
+    def __init__(
+        self, output=None, by_types=False, components=False, discard=0, header=True
+    ):
+        """The constructor for AveragesSink class."""
+        self.output = output
+        self.by_types = by_types
+        self.components = components
+        self.discard = discard
+        self.header = header
+
+    def print(self, line):
+        print(line, file=self.output or sys.stdout)
+
+    def start(self, information):
+        # at least one output of each pair is averaged
+        if self.discard >= information["num_iterations"]:
+            raise Exception("`discard` should be less than `num_iterations`")
+
+        self.temperature = information["temperature"]
+        self.field = information["field"]
+        self.num_iterations = information["num_iterations"]
+        self.set_types, type_codes = numpy.unique(
+            numpy.array(information["types"]), return_inverse=True
+        )
+        self.type_codes = type_codes.astype(numpy.int64)
+
+        # the energies, then the norm and the components of the magnetization, in
+        # total and by type
+        num_types = len(self.set_types) if self.by_types else 0
+        self.statistics = [
+            RunningStatistics(4 + 4 * (1 + num_types))
+            for _ in range(information["num_TH"])
+        ]
+        self.values = numpy.empty(4 + 4 * (1 + num_types))
+        self.magnetization = self.values[4:].reshape(1 + num_types, 4)
+
+        if not self.header:
+            return
+
+        self.print(f"#num_TH = {information['num_TH']}")
+
+        header = "#temperature field E_exchange E_anisotropy E_field E_total M_total"
+        if self.components:
+            header += " M_total_x M_total_y M_total_z"
+
+        if self.by_types:
+            for t in self.set_types:
+                header += f" M_{t}"
+                if self.components:
+                    header += f" M_{t}_x M_{t}_y M_{t}_z"
+
+        self.print(header)
+
+    def write(
+        self,
+        i,
+        j,
+        state,
+        exchange_energy,
+        anisotropy_energy,
+        magnetic_energy,
+        total_energy,
+    ):
+        if j >= self.discard:
+            magnetization_vector(state, self.magnetization[0, 1:])
+            if self.by_types:
+                magnetization_vector_by_type(
+                    state,
+                    len(self.set_types),
+                    self.type_codes,
+                    self.magnetization[1:, 1:],
+                )
+        self.accumulate(
+            i, j, exchange_energy, anisotropy_energy, magnetic_energy, total_energy
+        )
+
+    def write_observables(
+        self,
+        i,
+        j,
+        magnetization,
+        magnetization_by_type,
+        exchange_energy,
+        anisotropy_energy,
+        magnetic_energy,
+        total_energy,
+    ):
+        if j >= self.discard:
+            self.magnetization[0, 1:] = magnetization
+            if self.by_types:
+                self.magnetization[1:, 1:] = magnetization_by_type
+        self.accumulate(
+            i, j, exchange_energy, anisotropy_energy, magnetic_energy, total_energy
+        )
+
+    def accumulate(
+        self, i, j, exchange_energy, anisotropy_energy, magnetic_energy, total_energy
+    ):
+        """It accumulates a step, whose magnetization vectors are already in
+        ``magnetization``, and it prints the averages after the last step of the pair.
+
+        :param i: The index of the temperature and field pair.
+        :type i: int
+        :param j: The iteration.
+        :type j: int
+        :param exchange_energy: The exchange energy.
+        :type exchange_energy: float
+        :param anisotropy_energy: The anisotropy energy.
+        :type anisotropy_energy: float
+        :param magnetic_energy: The magnetic energy.
+        :type magnetic_energy: float
+        :param total_energy: The total energy.
+        :type total_energy: float
+        """
+        if j == 0:
+            self.statistics[i].reset()
+
+        if j >= self.discard:
+            self.values[:4] = (
+                exchange_energy,
+                anisotropy_energy,
+                magnetic_energy,
+                total_energy,
+            )
+            self.magnetization[:, 0] = numpy.linalg.norm(
+                self.magnetization[:, 1:], axis=1
+            )
+            self.statistics[i].update(self.values)
+
+        if j == self.num_iterations - 1:
+            self.print(self.averages(i))
+
+    def averages(self, i):
+        """It gives the averages of a temperature and field pair.
+
+        :param i: The index of the temperature and field pair.
+        :type i: int
+
+        :return: The line with the averages.
+        :rtype: str
+        """
+        mean = self.statistics[i].mean
+        E_exchange, E_anisotropy, E_field, E_total = mean[:4]
+        magnetization = mean[4:].reshape(-1, 4)
+
+        output = (
+            f"{self.temperature[i]} {self.field[i]} {E_exchange} "
+            f"{E_anisotropy} {E_field} {E_total} {magnetization[0, 0]}"
+        )
+        if self.components:
+            M_total_x, M_total_y, M_total_z = magnetization[0, 1:]
+            output += f" {M_total_x} {M_total_y} {M_total_z}"
+
+        if self.by_types:
+            for mag in magnetization[1:]:
+                output += f" {mag[0]}"
+                if self.components:
+                    output += f" {mag[1]} {mag[2]} {mag[3]}"
+
+        return output
+
+
+class SnapshotsSink(Sink):
+    """This is a class for render the state every ``step`` iterations.
+
+    :param output: The prefix of the images.
+    :type output: str
+    :param step: The separation between images. If it is "max", it is the number of
+    iterations.
+    :type step: str/int
+    :param size: The length of the images in pixels.
+    :type size: int
+    :param mode: The color mode (azimuthal/polar).
+    :type mode: str
+    :param colormap: The matplotlib colormap.
+    :type colormap: str
+    :param initial_state: If the initial state is also rendered.
+    :type initial_state: bool
+    """
+
+    def __init__(
+        self,
+        output,
+        step="max",
+        size=500,
+        mode="azimuthal",
+        colormap="hsv",
+        initial_state=True,
+    ):
+        """The constructor for SnapshotsSink class."""
+        self.output = output
+        self.step = step
+        self.size = size
+        self.mode = mode
+        self.colormap = colormap
+        self.initial_state = initial_state
+
+    def start(self, information):
+        # the rendering dependencies are only needed by this sink
+        from llg.plot_states import PlotStates
+
+        num_iterations = information["num_iterations"]
+        self.temperature = information["temperature"]
+        self.field = information["field"]
+
+        if self.step == "max":
+            self.step = num_iterations
+        else:
+            self.step = int(self.step)
+
+        if num_iterations % self.step != 0:
+            raise Exception("`step` is not a multiple of `num_iterations`")
+
+        self.plot_state = PlotStates(
+            information["positions"], self.output, self.size, self.mode, self.colormap
+        )
+        if self.initial_state:
+            self.plot_state.plot(information["initial_state"], 0, None, None, save=True)
+            click.secho("Figure was created the initial state", fg="green")
+
+    def write(
+        self,
+        i,
+        j,
+        state,
+        exchange_energy,
+        anisotropy_energy,
+        magnetic_energy,
+        total_energy,
+    ):
+        if (j + 1) % self.step == 0:
+            T = self.temperature[i]
+            H = self.field[i]
+            self.plot_state.plot(state, j + 1, T, H, save=True)
+            click.secho(
+                f"Figure was created for T={T:.2f}, H={H:.2f}, iteration={j + 1}",
+                fg="green",
+            )
+
+
+def hdf_point(filename, i, sink, cache_size=None, observables=False):
+    """It sends the frames of a temperature and field pair of a hdf file to a sink.
+    It is run by the worker processes of the commands that read hdf files, so every
+    worker opens the file.
+
+    :param filename: The hdf file.
+    :type filename: str
+    :param i: The index of the temperature and field pair.
+    :type i: int
+    :param sink: The sink, which is not started.
+    :type sink: Sink
+    :param cache_size: The size in bytes of the chunk cache of the file.
+    :type cache_size: int
+    :param observables: If the magnetization vectors and the energies of every
+    iteration are sent to ``write_observables``, instead of the stored states.
+    :type observables: bool
+    """
+    with ReadHDF(filename, cache_size) as reader:
+        if observables:
+            sink.start(reader.observables_information)
+            frames, write = reader.observables(i), sink.write_observables
+        else:
+            sink.start(reader.information)
+            frames, write = reader.frames(i), sink.write
+        try:
+            for j, values in enumerate(frames):
+                write(i, j, *values)
+        finally:
+            sink.close()
+
+
+def hdf_point_averages(
+    filename, i, by_types, components, discard, cache_size=None, observables=False
+):
+    """It computes the averages of a temperature and field pair of a hdf file.
+
+    :param filename: The hdf file.
+    :type filename: str
+    :param i: The index of the temperature and field pair.
+    :type i: int
+    :param by_types: If the magnetization is also averaged by type.
+    :type by_types: bool
+    :param components: If the components of the magnetization are also averaged.
+    :type components: bool
+    :param discard: The number of outputs discarded at the beginning of the pair.
+    :type discard: int
+    :param cache_size: The size in bytes of the chunk cache of the file.
+    :type cache_size: int
+    :param observables: If the averages are computed from the magnetization vectors
+    and the energies of every iteration, instead of the stored states.
+    :type observables: bool
+
+    :return: The line with the averages.
+    :rtype: str
+    """
+    output = io.StringIO()
+    sink = AveragesSink(output, by_types, components, discard, header=False)
+    hdf_point(filename, i, sink, cache_size, observables)
+    return output.getvalue()
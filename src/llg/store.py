@@ -1,31 +1,211 @@
+import queue
+import threading
+
 import h5py
+import numpy
+
+from llg.functions.encoding import (
+    decode_octahedral,
+    decode_spherical,
+    encode_octahedral,
+    encode_spherical,
+)
+from llg.functions.magnetization import (
+    magnetization_vector,
+    magnetization_vector_by_type,
+)
+
+# Encodings of the states, with two numbers per spin instead of three float64. The
+# values are the type of the stored numbers, and the functions to encode and decode a
+# state. "spherical" stores the polar and azimuthal angles as float32, and
+# "octahedral" stores the octahedral mapping of the spins as int16.
+STATE_ENCODINGS = {
+    "spherical": (numpy.float32, encode_spherical, decode_spherical),
+    "octahedral": (numpy.int16, encode_octahedral, decode_octahedral),
+}
+
+# Layouts of the chunks of the states. "frame" keeps whole states together, for
+# reading frames, "site" keeps long time series of blocks of sites, and "balanced"
+# is in between.
+CHUNK_LAYOUTS = ("frame", "site", "balanced")
+
+# Size in bytes of the chunks of the states.
+CHUNK_BYTES = 2**20
+
+# Size in bytes of the slabs of states read at once by ``ReadHDF``.
+SLAB_BYTES = 2**26
+
+
+def decode_states(states, encoding=None):
+    """It decodes stored states into float64 unit vectors.
+
+    :param states: The stored states, with the components in the last axis.
+    :type states: numpy.ndarray
+    :param encoding: The encoding, one of ``STATE_ENCODINGS``. If it is None, the
+    states are returned as they are.
+    :type encoding: str
+
+    :return: The states, with three components in the last axis.
+    :rtype: numpy.ndarray
+    """
+    if encoding is None:
+        return states
+    _, _, decode = STATE_ENCODINGS[encoding]
+    decoded = decode(numpy.ascontiguousarray(states).reshape(-1, 2))
+    return decoded.reshape(states.shape[:-1] + (3,))
+
+
+def read_states(hdf_file, selection=()):
+    """It reads states from a hdf file written by ``StoreHDF``, decoding them if they
+    are encoded.
+
+    :param hdf_file: The open hdf file.
+    :type hdf_file: h5py.File
+    :param selection: The selection of the first axes of the states, like ``(i, j)``.
+    :type selection: tuple
+
+    :return: The states, with three components in the last axis.
+    :rtype: numpy.ndarray
+    """
+    if not isinstance(selection, tuple):
+        selection = (selection,)
+    states = hdf_file["states"][selection + (Ellipsis,)]
+    return decode_states(states, hdf_file.attrs.get("state_encoding"))
+
+
+class Block:
+    """This is a class for keep consecutive iterations of a temperature and field
+    pair before they are written.
+
+    :param batch_size: The maximum number of iterations.
+    :type batch_size: int
+    :param num_sites: The number of sites.
+    :type num_sites: int
+    :param num_types: The number of types of the sites.
+    :type num_types: int
+    :param states: If the block keeps the states.
+    :type states: bool
+    :param observables: If the block keeps the magnetization vectors.
+    :type observables: bool
+    """
+
+    def __init__(self, batch_size, num_sites, num_types, states, observables):
+        """The constructor for Block class."""
+        self.i = 0
+        self.start = 0
+        self.count = 0
+        self.states = numpy.empty((batch_size, num_sites, 3)) if states else None
+        # exchange, anisotropy, magnetic, and total energies
+        self.energies = numpy.empty((4, batch_size))
+        if observables:
+            self.magnetization = numpy.empty((batch_size, 3))
+            self.magnetization_by_type = numpy.empty((batch_size, num_types, 3))
 
 
 class StoreHDF:
     """This is a class for store the information in a hdf file, as a result of the
     ``Simulate`` class.
 
+    The iterations given to ``store`` are gathered in blocks of ``batch_size``, and
+    each block is written with one call per dataset by a background thread. There is
+    an open block per temperature and field pair, so the pairs of a parallel
+    tempering run, which are given iteration by iteration, are also written in
+    blocks, and up to two more blocks are written while the others are filled.
+
     :param filename: This is the file with the information of the simulation.
     :type filename: file
     :param compress: This is an option to compress the file in which the logical size
     of a file is reduced. It allows faster transmission over a network. It serialize
     the entire file.
     :type compress: bool
+    :param batch_size: The number of iterations written at once.
+    :type batch_size: int
+    :param chunks: The layout of the chunks of the states, one of ``CHUNK_LAYOUTS``.
+    If it is None, the states are contiguous, or chunked by h5py when they are
+    compressed.
+    :type chunks: str
+    :param cache_size: The size in bytes of the chunk cache of the file. If it is
+    None, it is the default of h5py.
+    :type cache_size: int
+    :param encoding: The encoding of the states, one of ``STATE_ENCODINGS``. If it is
+    None, they are stored as float64.
+    :type encoding: str
+    :param state_every: The states are stored every ``state_every`` iterations, at
+    the iterations ``j`` where ``j + 1`` is a multiple of it. When it is greater than
+    one, the magnetization vectors are stored for every iteration.
+    :type state_every: int
+    :param observables_only: If it is True, the states are not stored, only the
+    energies and the total and by type magnetization vectors of every iteration.
+    :type observables_only: bool
     """
 
-    def __init__(self, filename, compress=False):
+    def __init__(
+        self,
+        filename,
+        compress=False,
+        batch_size=64,
+        chunks=None,
+        cache_size=None,
+        encoding=None,
+        state_every=1,
+        observables_only=False,
+    ):
         """The constructor for StoreHDF class."""
+        if chunks is not None and chunks not in CHUNK_LAYOUTS:
+            raise Exception(f"The chunk layout {chunks} is not supported.")
+        if encoding is not None and encoding not in STATE_ENCODINGS:
+            raise Exception(f"The state encoding {encoding} is not supported.")
+        if state_every < 1:
+            raise Exception("`state_every` should be a positive integer.")
+
         self.filename = filename
         self.compress = compress
+        self.batch_size = batch_size
+        self.chunks = chunks
+        self.cache_size = cache_size
+        self.encoding = encoding
+        self.state_every = state_every
+        self.observables_only = observables_only
+        self.observables = observables_only or state_every > 1
+        self.__dataset = None
+        self.__writer = None
 
-    def __enter__(self):
-        # make a database connection and return it
-        self.__dataset = h5py.File(self.filename, mode="w")
+    def open(self):
+        """It creates the hdf file.
+
+        :return: The store.
+        :rtype: StoreHDF
+        """
+        self.__dataset = h5py.File(self.filename, mode="w", rdcc_nbytes=self.cache_size)
         return self
 
-    def __exit__(self, a, b, c):
-        # make sure the dbconnection gets closed
-        self.__dataset.close()
+    def close(self, flush=True):
+        """It waits until the blocks are written, stops the background thread, and
+        closes the hdf file. The thread is stopped and the file is closed even if the
+        blocks could not be written.
+
+        :param flush: If the open blocks are written. Otherwise, only the blocks
+        already sent to the background thread are written.
+        :type flush: bool
+        """
+        try:
+            if self.__writer is not None and flush:
+                self.flush()
+        finally:
+            if self.__writer is not None:
+                self.__pending.put(None)
+                self.__writer.join()
+                self.__writer = None
+            if self.__dataset is not None:
+                self.__dataset.close()
+                self.__dataset = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # after an error, the blocks already sent are still written
+        self.close(flush=exc_type is None)
 
     def populate(self, simulation_information):
         """It is a function responsible of set the information of the simulation file
@@ -51,6 +231,12 @@ class StoreHDF:
         self.__dataset.attrs["deltat"] = simulation_information["parameters"]["deltat"]
         self.__dataset.attrs["kb"] = simulation_information["parameters"]["kb"]
         self.__dataset.attrs["num_TH"] = len(simulation_information["temperature"])
+        self.__dataset.attrs["sample_every"] = simulation_information.get(
+            "sample_every", 1
+        )
+        self.__dataset.attrs["equilibration_steps"] = simulation_information.get(
+            "equilibration_steps", 0
+        )
 
         # create types
         types_dataset = self.__dataset.create_dataset(
@@ -66,13 +252,55 @@ class StoreHDF:
         compression_options = (
             {"chunks": True, "compression": "gzip"} if self.compress else {}
         )
+        if self.encoding is None:
+            components, dtype = 3, numpy.dtype(float)
+        else:
+            components, dtype = 2, numpy.dtype(STATE_ENCODINGS[self.encoding][0])
+            self.__dataset.attrs["state_encoding"] = self.encoding
 
-        self.__states_dataset = self.__dataset.create_dataset(
-            "states",
-            (num_TH, num_iterations, num_sites, 3),
-            dtype=float,
-            **compression_options,
+        self.__dataset.attrs["state_every"] = self.state_every
+        self.__dataset.attrs["observables_only"] = self.observables_only
+
+        if not self.observables_only:
+            num_states = num_iterations // self.state_every
+            states_options = dict(compression_options)
+            if self.chunks is not None and num_states:
+                states_options["chunks"] = StoreHDF.chunk_shape(
+                    self.chunks,
+                    num_states,
+                    num_sites,
+                    components,
+                    dtype.itemsize,
+                )
+
+            self.__states_dataset = self.__dataset.create_dataset(
+                "states",
+                (num_TH, num_states, num_sites, components),
+                dtype=dtype,
+                **states_options,
+            )
+
+        type_names, type_codes = numpy.unique(
+            numpy.asarray(simulation_information["types"], dtype=str),
+            return_inverse=True,
         )
+        self.__type_codes = type_codes.astype(numpy.int64)
+        if self.observables:
+            self.__dataset.create_dataset(
+                "type_names", data=type_names.tolist(), dtype=h5py.string_dtype()
+            )
+            self.__magnetization_dataset = self.__dataset.create_dataset(
+                "magnetization",
+                (num_TH, num_iterations, 3),
+                dtype=float,
+                **compression_options,
+            )
+            self.__magnetization_by_type_dataset = self.__dataset.create_dataset(
+                "magnetization_by_type",
+                (num_TH, num_iterations, len(type_names), 3),
+                dtype=float,
+                **compression_options,
+            )
 
         self.__exchange_energy_dataset = self.__dataset.create_dataset(
             "exchange_energy",
@@ -99,8 +327,210 @@ class StoreHDF:
             "total_energy", (num_TH, num_iterations), dtype=float, **compression_options
         )
 
+        # the open block of each pair, and the blocks allocated so far
+        self.__blocks = {}
+        self.__num_blocks = 0
+        self.__num_iterations = num_iterations
+        self.__block_arguments = (
+            self.batch_size,
+            num_sites,
+            len(type_names),
+            not self.observables_only,
+            self.observables,
+        )
+        self.__error = None
+        self.__free = queue.Queue()
+        self.__pending = queue.Queue()
+        self.__writer = threading.Thread(target=self.__write_blocks, daemon=True)
+        self.__writer.start()
+
+    @staticmethod
+    def chunk_shape(
+        layout,
+        num_iterations,
+        num_sites,
+        components=3,
+        itemsize=8,
+        chunk_bytes=CHUNK_BYTES,
+    ):
+        """It gives the shape of the chunks of the states for a layout. The chunks
+        have about ``chunk_bytes`` bytes, and they never span several temperature and
+        field pairs.
+
+        :param layout: The layout, one of ``CHUNK_LAYOUTS``.
+        :type layout: str
+        :param num_iterations: The number of iterations.
+        :type num_iterations: int
+        :param num_sites: The number of sites.
+        :type num_sites: int
+        :param components: The number of stored components of a spin.
+        :type components: int
+        :param itemsize: The size in bytes of a stored component.
+        :type itemsize: int
+        :param chunk_bytes: The size of the chunks in bytes.
+        :type chunk_bytes: int
+
+        :return: The shape of the chunks.
+        :rtype: tuple
+        """
+        # number of (iteration, site) pairs per chunk
+        size = max(chunk_bytes // (components * itemsize), 1)
+
+        if layout == "frame":
+            sites = min(num_sites, size)
+            iterations = size // sites
+        elif layout == "site":
+            # blocks of at least 64 sites
+            iterations = min(num_iterations, max(size // 64, 1))
+            sites = size // iterations
+        elif layout == "balanced":
+            # a frame and a time series span a few chunks each
+            iterations = min(num_iterations, int(numpy.cbrt(size)))
+            sites = size // iterations
+        else:
+            raise Exception(f"The chunk layout {layout} is not supported.")
+
+        iterations = max(min(iterations, num_iterations), 1)
+        sites = max(min(sites, num_sites), 1)
+        return (1, iterations, sites, components)
+
+    def store(
+        self,
+        state,
+        exchange_energy,
+        anisotropy_energy,
+        magnetic_energy,
+        total_energy,
+        i,
+        j,
+    ):
+        """It stores an iteration. It is copied into the open block of its pair, which
+        is sent to the background thread when it is full, when the pair is finished,
+        or when the next iteration of the pair is not consecutive.
+
+        :param state: The state of the sites.
+        :type state: numpy.ndarray
+        :param exchange_energy: The exchange energy.
+        :type exchange_energy: float
+        :param anisotropy_energy: The anisotropy energy.
+        :type anisotropy_energy: float
+        :param magnetic_energy: The magnetic energy.
+        :type magnetic_energy: float
+        :param total_energy: The total energy.
+        :type total_energy: float
+        :param i: The index of the temperature and field pair.
+        :type i: int
+        :param j: The iteration.
+        :type j: int
+        """
+        block = self.__blocks.get(i)
+        if block is not None and block.start + block.count != j:
+            self.__pending.put(self.__blocks.pop(i))
+            block = None
+
+        if block is None:
+            block = self.__blocks[i] = self.__take_block()
+            self.__raise_error()
+            block.i, block.start, block.count = i, j, 0
+
+        k = block.count
+        if block.states is not None and (j + 1) % self.state_every == 0:
+            block.states[k] = state
+        if self.observables:
+            magnetization_vector(state, block.magnetization[k])
+            magnetization_vector_by_type(
+                state,
+                len(block.magnetization_by_type[k]),
+                self.__type_codes,
+                block.magnetization_by_type[k],
+            )
+        block.energies[:, k] = (
+            exchange_energy,
+            anisotropy_energy,
+            magnetic_energy,
+            total_energy,
+        )
+        block.count += 1
+
+        if block.count == self.batch_size or j == self.__num_iterations - 1:
+            # the block is full, or the pair is finished
+            self.__pending.put(self.__blocks.pop(i))
+
+    def flush(self, wait=True):
+        """It sends the open blocks to the background thread.
+
+        :param wait: If it waits until every block is written.
+        :type wait: bool
+        """
+        for i in sorted(self.__blocks):
+            self.__pending.put(self.__blocks.pop(i))
+        if wait:
+            self.__pending.join()
+            self.__raise_error()
+
+    def __take_block(self):
+        try:
+            return self.__free.get_nowait()
+        except queue.Empty:
+            pass
+        # there are at most two blocks besides the open ones, otherwise it waits
+        # until one is written
+        if self.__num_blocks < len(self.__blocks) + 2:
+            self.__num_blocks += 1
+            return Block(*self.__block_arguments)
+        return self.__free.get()
+
+    def __write_blocks(self):
+        while True:
+            block = self.__pending.get()
+            if block is None:
+                self.__pending.task_done()
+                return
+            try:
+                if self.__error is None:
+                    self.__write_block(block)
+            except Exception as error:
+                self.__error = error
+            finally:
+                self.__free.put(block)
+                self.__pending.task_done()
+
+    def __write_block(self, block):
+        i, start, count = block.i, block.start, block.count
+        stop = start + count
+        if block.states is not None:
+            iterations = numpy.arange(start, stop)
+            stored = (iterations + 1) % self.state_every == 0
+            if stored.any():
+                first, last = (iterations[stored][[0, -1]] + 1) // self.state_every
+                self.__states_dataset[i, slice(first - 1, last)] = self.__encode(
+                    block.states[:count][stored]
+                )
+        if self.observables:
+            self.__magnetization_dataset[i, start:stop] = block.magnetization[:count]
+            self.__magnetization_by_type_dataset[i, start:stop] = (
+                block.magnetization_by_type[:count]
+            )
+        self.__exchange_energy_dataset[i, start:stop] = block.energies[0, :count]
+        self.__anisotropy_energy_dataset[i, start:stop] = block.energies[1, :count]
+        self.__magnetic_energy_dataset[i, start:stop] = block.energies[2, :count]
+        self.__total_energy_dataset[i, start:stop] = block.energies[3, :count]
+
+    def __encode(self, states):
+        if self.encoding is None:
+            return states
+        _, encode, _ = STATE_ENCODINGS[self.encoding]
+        encoded = encode(numpy.ascontiguousarray(states).reshape(-1, 3))
+        return encoded.reshape(states.shape[:-1] + (2,))
+
+    def __raise_error(self):
+        if self.__error is not None:
+            raise Exception("The hdf file could not be written.") from self.__error
+
     def store_state(self, state, i, j):
-        self.__states_dataset[i, j, :] = state
+        if (j + 1) % self.state_every == 0:
+            k = (j + 1) // self.state_every - 1
+            self.__states_dataset[i, k, :] = self.__encode(state)
 
     def store_exchange_energy(self, exchange_energy, i, j):
         self.__exchange_energy_dataset[i, j] = exchange_energy
@@ -113,3 +543,187 @@ class StoreHDF:
 
     def store_total_energy(self, total_energy, i, j):
         self.__total_energy_dataset[i, j] = total_energy
+
+
+class ReadHDF:
+    """This is a class for read the output of ``Simulation`` from a hdf file written
+    by ``StoreHDF``. It gives the same information and frames as ``StreamReader``, so
+    it is a source for the sinks, but the states are read in slabs of several
+    iterations, aligned with the chunks. If the states were stored every K
+    iterations, only those iterations are given.
+
+    If the file has the magnetization vectors, which are stored for every iteration
+    when the states are stored every K > 1 iterations or not stored at all, they are
+    also given with the energies of every iteration by ``observables``.
+
+    :param filename: The hdf file.
+    :type filename: str
+    :param cache_size: The size in bytes of the chunk cache of the file.
+    :type cache_size: int
+    :param slab_bytes: The approximate size in bytes of the slabs.
+    :type slab_bytes: int
+    """
+
+    def __init__(self, filename, cache_size=None, slab_bytes=SLAB_BYTES):
+        """The constructor for ReadHDF class."""
+        self.file = h5py.File(filename, mode="r", rdcc_nbytes=cache_size)
+        self.has_states = "states" in self.file
+        self.has_observables = "magnetization" in self.file
+        if not self.has_states and not self.has_observables:
+            self.file.close()
+            raise Exception(
+                f"The file {filename} does not have states or magnetization."
+            )
+
+        attrs = self.file.attrs
+        self.encoding = attrs.get("state_encoding")
+        self.state_every = int(attrs.get("state_every", 1))
+        self.num_observables = self.file["total_energy"].shape[1]
+
+        if self.has_states:
+            self.__states = self.file["states"]
+            self.num_states = self.__states.shape[1]
+            # a slab is a whole number of chunks along the iterations
+            chunk_length = self.__states.chunks[1] if self.__states.chunks else 1
+            frame_bytes = (
+                numpy.prod(self.__states.shape[2:]) * self.__states.dtype.itemsize
+            )
+            num_chunks = max(1, slab_bytes // (frame_bytes * chunk_length))
+            self.slab_length = max(1, min(num_chunks * chunk_length, self.num_states))
+        else:
+            self.num_states = 0
+            self.slab_length = 1
+
+        if self.has_observables:
+            # the magnetization vectors of an iteration, in total and by type
+            iteration_bytes = 8 * 3 * (1 + self.file["type_names"].shape[0])
+            self.observables_slab_length = max(
+                1, min(slab_bytes // iteration_bytes, self.num_observables)
+            )
+
+        self.information = {
+            "num_sites": int(attrs["num_sites"]),
+            "parameters": {
+                "units": attrs["units"],
+                "damping": attrs["damping"],
+                "gyromagnetic": attrs["gyromagnetic"],
+                "deltat": attrs["deltat"],
+                "kb": attrs["kb"],
+            },
+            "temperature": self.file["temperature"][:],
+            "field": self.file["field"][:],
+            "seed": attrs["seed"],
+            "num_iterations": (
+                self.num_states if self.has_states else self.num_observables
+            ),
+            "positions": self.file["positions"][:],
+            "types": self.file["types"].asstr()[:],
+            "initial_state": self.file["initial_state"][:],
+            "num_TH": int(attrs["num_TH"]),
+            "sample_every": int(attrs.get("sample_every", 1)),
+            "equilibration_steps": int(attrs.get("equilibration_steps", 0)),
+        }
+        if self.has_states:
+            self.information["sample_every"] *= self.state_every
+
+    @property
+    def observables_information(self):
+        """It gives the information of the iterations given by ``observables``, which
+        are every stored iteration, instead of the iterations of the stored states.
+
+        :return: The information, as given by ``Simulation.information``.
+        :rtype: dict
+        """
+        information = dict(self.information)
+        information["num_iterations"] = self.num_observables
+        information["sample_every"] = int(self.file.attrs.get("sample_every", 1))
+        return information
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """It closes the file."""
+        self.file.close()
+
+    @property
+    def num_frames(self):
+        """It gives the number of frames of the file.
+
+        :return: The number of temperature and field pairs times the number of stored
+        states.
+        :rtype: int
+        """
+        return self.information["num_TH"] * self.num_states
+
+    def frames(self, i):
+        """It iterates over the frames of a temperature and field pair.
+
+        :param i: The index of the temperature and field pair.
+        :type i: int
+        """
+        if not self.has_states:
+            raise Exception(f"The file {self.file.filename} does not have states.")
+        every = self.state_every
+        for start in range(0, self.num_states, self.slab_length):
+            stop = min(start + self.slab_length, self.num_states)
+            states = decode_states(self.__states[i, start:stop], self.encoding)
+            # the energies of the iterations of the stored states
+            iterations = slice((start + 1) * every - 1, stop * every, every)
+            energies = [
+                self.file[name][i, iterations]
+                for name in (
+                    "exchange_energy",
+                    "anisotropy_energy",
+                    "magnetic_energy",
+                    "total_energy",
+                )
+            ]
+            for k, state in enumerate(states):
+                yield (state, *(float(energy[k]) for energy in energies))
+
+    def __iter__(self):
+        """It iterates over the frames of all the temperature and field pairs."""
+        for i in range(self.information["num_TH"]):
+            yield from self.frames(i)
+
+    def observables(self, i):
+        """It iterates over the iterations of a temperature and field pair. Each one
+        gives the magnetization vector, the magnetization vectors by type, and the
+        four energies.
+
+        :param i: The index of the temperature and field pair.
+        :type i: int
+        """
+        if not self.has_observables:
+            raise Exception(
+                f"The file {self.file.filename} does not have the magnetization."
+            )
+        for start in range(0, self.num_observables, self.observables_slab_length):
+            stop = min(start + self.observables_slab_length, self.num_observables)
+            magnetization = self.file["magnetization"][i, start:stop]
+            magnetization_by_type = self.file["magnetization_by_type"][i, start:stop]
+            energies = [
+                self.file[name][i, start:stop]
+                for name in (
+                    "exchange_energy",
+                    "anisotropy_energy",
+                    "magnetic_energy",
+                    "total_energy",
+                )
+            ]
+            for k in range(stop - start):
+                yield (
+                    magnetization[k],
+                    magnetization_by_type[k],
+                    *(float(energy[k]) for energy in energies),
+                )
+
+    def iter_observables(self):
+        """It iterates over the iterations of all the temperature and field pairs, as
+        given by ``observables``."""
+        for i in range(self.information["num_TH"]):
+            yield from self.observables(i)
@@ -0,0 +1,140 @@
+import pickle
+import struct
+
+import numpy
+
+# The stream starts with the magic bytes and the version of the format, followed by
+# a header frame, the length of the pickled ``Simulation.information`` and the pickle
+# itself. Then, there is a frame per step, with the state as raw float64 in the byte
+# order of the machine, and the exchange, anisotropy, magnetic, and total energies.
+MAGIC = b"LLGS"
+VERSION = 1
+NUM_ENERGIES = 4
+
+
+class StreamWriter:
+    """This is a class for write the output of ``Simulation`` as a binary stream. Each
+    step is a fixed size frame, so it is written and read without any conversion.
+
+    :param file: The binary file where the stream is written, like
+    ``sys.stdout.buffer``.
+    :type file: file
+    """
+
+    def __init__(self, file):
+        """The constructor for StreamWriter class."""
+        self.file = file
+        self.__energies = numpy.empty(NUM_ENERGIES)
+
+    def write_information(self, information):
+        """It writes the header frame.
+
+        :param information: The information of the simulation, as given by
+        ``Simulation.information``.
+        :type information: dict
+        """
+        header = pickle.dumps(information, protocol=pickle.HIGHEST_PROTOCOL)
+        self.file.write(MAGIC + struct.pack("<IQ", VERSION, len(header)))
+        self.file.write(header)
+
+    def write(
+        self, state, exchange_energy, anisotropy_energy, magnetic_energy, total_energy
+    ):
+        """It writes the frame of a step.
+
+        :param state: The state of the sites.
+        :type state: numpy.ndarray
+        :param exchange_energy: The exchange energy.
+        :type exchange_energy: float
+        :param anisotropy_energy: The anisotropy energy.
+        :type anisotropy_energy: float
+        :param magnetic_energy: The magnetic energy.
+        :type magnetic_energy: float
+        :param total_energy: The total energy.
+        :type total_energy: float
+        """
+        self.__energies[:] = (
+            exchange_energy,
+            anisotropy_energy,
+            magnetic_energy,
+            total_energy,
+        )
+        self.file.write(memoryview(numpy.ascontiguousarray(state, dtype=float)))
+        self.file.write(memoryview(self.__energies))
+
+    def flush(self):
+        """It flushes the file."""
+        self.file.flush()
+
+
+class StreamReader:
+    """This is a class for read the output of ``Simulation``, as written by
+    ``StreamWriter``. The header is read by the constructor. The old text stream,
+    with a pickled representation per line, is also read.
+
+    :param file: The binary file where the stream is read, like ``sys.stdin.buffer``.
+    :type file: file
+    """
+
+    def __init__(self, file):
+        """The constructor for StreamReader class."""
+        self.file = file
+
+        magic = self.file.read(len(MAGIC))
+        self.binary = magic == MAGIC
+        if self.binary:
+            version, length = struct.unpack("<IQ", self.__read_exactly(12))
+            if version != VERSION:
+                raise Exception(f"The stream version {version} is not supported.")
+            self.information = pickle.loads(self.__read_exactly(length))
+        else:
+            self.information = self.__read_line(magic)
+
+        num_sites = self.information["num_sites"]
+        self.__frame = numpy.empty(3 * num_sites + NUM_ENERGIES)
+        self.__state = self.__frame[: 3 * num_sites].reshape(num_sites, 3)
+
+    @property
+    def num_frames(self):
+        """It gives the number of frames of the stream.
+
+        :return: The number of temperature and field pairs times the number of
+        iterations.
+        :rtype: int
+        """
+        return self.information["num_TH"] * self.information["num_iterations"]
+
+    def read(self):
+        """It reads the frame of a step. The state is a view of an internal buffer,
+        which is overwritten by the next call, so it has to be copied to be kept.
+
+        :return: The state, and the exchange, anisotropy, magnetic, and total
+        energies.
+        :rtype: tuple
+        """
+        if not self.binary:
+            return tuple(self.__read_line() for _ in range(1 + NUM_ENERGIES))
+
+        view = memoryview(self.__frame).cast("B")
+        read = 0
+        while read < len(view):
+            size = self.file.readinto(view[read:])
+            if not size:
+                raise Exception("The stream ended in the middle of a frame.")
+            read += size
+        return (self.__state, *self.__frame[-NUM_ENERGIES:].tolist())
+
+    def __iter__(self):
+        """It iterates over the frames of all the temperature and field pairs."""
+        for _ in range(self.num_frames):
+            yield self.read()
+
+    def __read_exactly(self, size):
+        data = self.file.read(size)
+        if len(data) != size:
+            raise Exception("The stream ended in the middle of a frame.")
+        return data
+
+    def __read_line(self, start=b""):
+        # a line of the text stream is the representation of a pickled bytes
+        return pickle.loads(eval(start + self.file.readline()))
@@ -1,6 +1,5 @@
-import json
-
 from llg.geometry import Geometry
+from llg.sample_file import read_sample
 
 
 class System:
@@ -34,6 +33,7 @@ class System:
         that belong to the class method System.
 
         :param system_dict: Dictionary that contains the attributes of the System class.
+        Its ``geometry`` can be a dictionary or a ``Geometry``.
         :type system_dict: dict
 
         :return: Object that contains index, position, type_, mu, anisotropy_constant,
@@ -42,17 +42,22 @@ class System:
         deltat.
         :rtype: Object
         """
-        geometry = Geometry.from_dict(system_dict["geometry"])
+        geometry = system_dict["geometry"]
+        if not isinstance(geometry, Geometry):
+            geometry = Geometry.from_dict(geometry)
         parameters = system_dict["parameters"]
 
         return cls(geometry, parameters)
 
     @classmethod
-    def from_file(cls, system_file):
+    def from_file(cls, system_file, cache=None):
         """It is a function decorator, it creates the geometry file.
 
-        :param system_file: File that contains the attributes of the System class.
+        :param system_file: File that contains the attributes of the System class. It
+        can also be a binary sample directory.
         :type system_file: file
+        :param cache: The ``GeometryCache`` used to load the compiled geometry.
+        :type cache: GeometryCache
 
         :return: Object that contains index, position, type_, mu, anisotropy_constant,
         anisotopy_axis and field_axis (geometry). Also it contains a source, target,
@@ -60,10 +65,7 @@ class System:
         deltat.
         :rtype: Object
         """
-        with open(system_file) as file:
-            system = json.load(file)
-
-        return System.from_dict(system)
+        return System.from_dict(read_sample(system_file, cache))
 
     def __getattr__(self, attr):
         """It is a function that contains the parameters attributes of the System class.
@@ -0,0 +1,156 @@
+import json
+import os
+import shutil
+
+import numpy
+import pytest
+
+from llg.cache import GeometryCache
+from llg.predefined_structures import GenericSc
+from llg.sample_file import read_sample, write_binary_sample, write_json_sample
+
+
+class CountingRead:
+    # it reads the samples, and counts the misses of the cache
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        return read_sample(path)
+
+
+def build(length, temperature=1.0):
+    sample = GenericSc(length)
+    sample.temperature = temperature
+    sample.field = 0.0
+    return sample.build()
+
+
+def test_cache_hit_json(tmp_path):
+    cache = GeometryCache(tmp_path / "cache")
+    read = CountingRead()
+    path = tmp_path / "sample.json"
+    sample = build(3, temperature=[1.0, 2.0])
+    sample["initial_state"] = numpy.random.normal(size=(27, 3))
+    write_json_sample(sample, path)
+
+    first = cache.load(path, read)
+    second = cache.load(path, read)
+    assert read.calls == 1
+    assert len(cache.entries()) == 1
+
+    # the hit is memory-mapped from the entry, with every attribute of the sample
+    assert isinstance(second["geometry"].csr.indptr, numpy.memmap)
+    assert second["temperature"] == [1.0, 2.0]
+    assert numpy.allclose(second["initial_state"], sample["initial_state"])
+    for column, expected_column in zip(second["geometry"].csr, first["geometry"].csr):
+        assert numpy.array_equal(column, expected_column)
+
+
+def test_cache_key_of_json(tmp_path):
+    # a JSON sample is keyed by its path and its stat data
+    path = tmp_path / "sample.json"
+    write_json_sample(build(3), path)
+    key = GeometryCache.key(path)
+    assert GeometryCache.key(path) == key
+
+    shutil.copy(path, tmp_path / "copy.json")
+    assert GeometryCache.key(tmp_path / "copy.json") != key
+
+    cache = GeometryCache(tmp_path / "cache")
+    read = CountingRead()
+    assert cache.load(path, read)["temperature"] == 1.0
+    write_json_sample(build(3, temperature=2.0), path)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert GeometryCache.key(path) != key
+    assert cache.load(path, read)["temperature"] == 2.0
+    assert read.calls == 2
+
+
+def test_cache_hit_binary(tmp_path):
+    cache = GeometryCache(tmp_path / "cache")
+    read = CountingRead()
+    path = tmp_path / "sample"
+    write_binary_sample(build(3), path)
+    key = GeometryCache.key(path)
+    assert cache.load(path, read)["temperature"] == 1.0
+
+    # the sample file is written again, but not the columns
+    parameters = read_sample(path)["parameters"]
+    with open(path / "sample.json", "w") as file:
+        json.dump({"parameters": parameters, "temperature": [1.0, 2.0]}, file)
+    numpy.save(path / "initial_state.npy", numpy.zeros((27, 3)))
+    assert GeometryCache.key(path) == key
+
+    sample = cache.load(path, read)
+    assert read.calls == 1
+    assert sample["temperature"] == [1.0, 2.0]
+    assert numpy.array_equal(sample["initial_state"], numpy.zeros((27, 3)))
+
+
+@pytest.mark.parametrize("write", [write_json_sample, write_binary_sample])
+def test_cache_miss(tmp_path, write):
+    cache = GeometryCache(tmp_path / "cache")
+    read = CountingRead()
+    write(build(3), tmp_path / "first")
+    write(build(4), tmp_path / "second")
+    sample = build(3)
+    sample["parameters"]["damping"] = 0.5
+    write(sample, tmp_path / "third")
+
+    for name in ("first", "second", "third"):
+        assert cache.load(tmp_path / name, read)["geometry"].num_sites
+    assert read.calls == 3
+    assert len(cache.entries()) == 3
+
+
+def test_cache_key_of_binary_columns(tmp_path):
+    # a binary sample is keyed by the stat data of its columns
+    path = tmp_path / "sample"
+    write_binary_sample(build(3), path)
+    key = GeometryCache.key(path)
+
+    column = path / "sites" / "mu.npy"
+    numpy.save(column, numpy.full(27, 2.0))
+    stat = os.stat(column)
+    os.utime(column, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert GeometryCache.key(path) != key
+
+
+def test_cache_eviction(tmp_path):
+    # samples of the same size, with different parameters
+    read = CountingRead()
+    paths = []
+    for damping in (0.1, 0.2, 0.3):
+        sample = build(3)
+        sample["parameters"]["damping"] = damping
+        paths.append(tmp_path / f"sample-{damping}")
+        write_binary_sample(sample, paths[-1])
+
+    cache = GeometryCache(tmp_path / "cache")
+    for path in paths[:2]:
+        cache.load(path, read)
+    entries = cache.entries()
+    cache.max_size = sum(size for _, size in entries)
+
+    # the first entry is used again, so the second one is the least recently used
+    first, second = (entry for entry, _ in entries)
+    os.utime(first, (1, 1))
+    os.utime(second, (2, 2))
+    cache.load(paths[0], read)
+    assert read.calls == 2
+
+    # and it is evicted by the third sample
+    cache.load(paths[2], read)
+    assert read.calls == 3
+    remaining = [entry for entry, _ in cache.entries()]
+    assert len(remaining) == 2
+    assert first in remaining
+    assert second not in remaining
+
+    cache.load(paths[0], read)
+    assert read.calls == 3
+    cache.load(paths[1], read)
+    assert read.calls == 4
@@ -0,0 +1,137 @@
+import io
+
+import numpy
+import pytest
+from click.testing import CliRunner
+
+from llg import cli
+from llg.sinks import HDFSink, fan_out
+from llg.store import ReadHDF
+from llg.stream import StreamWriter
+
+
+class RecordingPlotStates:
+    # it keeps the iteration, the temperature and the field of every plotted state
+    plots = []
+
+    def __init__(self, *args):
+        pass
+
+    def plot(self, state, iteration, temperature, field):
+        if temperature is not None:
+            self.plots.append((iteration, temperature, field, numpy.array(state)))
+        return numpy.zeros((4, 4, 3), dtype=numpy.uint8)
+
+
+class ClosingReadHDF(ReadHDF):
+    # it keeps the number of files closed
+    closed = 0
+
+    def close(self):
+        ClosingReadHDF.closed += 1
+        super().close()
+
+
+@pytest.fixture
+def recorded_plots(monkeypatch):
+    RecordingPlotStates.plots = []
+    monkeypatch.setattr(cli, "PlotStates", RecordingPlotStates)
+    return RecordingPlotStates.plots
+
+
+@pytest.mark.parametrize("tempering", [False, True])
+def test_animate_states_of_stream(
+    tmp_path, recorded_plots, information, frames, tempering
+):
+    num_TH = information["num_TH"]
+    num_iterations = information["num_iterations"]
+    information["tempering"] = tempering
+    if tempering:
+        # the frames are given iteration by iteration
+        order = [
+            i * num_iterations + j for j in range(num_iterations) for i in range(num_TH)
+        ]
+        frames = [frames[k] for k in order]
+
+    stream = io.BytesIO()
+    writer = StreamWriter(stream)
+    writer.write_information(information)
+    for values in frames:
+        writer.write(*values)
+
+    result = CliRunner().invoke(
+        cli.main,
+        ["plot", "animate-states", str(tmp_path / "states.gif"), "--step", "2"],
+        input=stream.getvalue(),
+    )
+    assert result.exit_code == 0, result.output
+
+    # every plotted state has the iteration, the temperature and the field of its
+    # pair
+    expected = {}
+    for k, (state, *_) in enumerate(frames):
+        if tempering:
+            j, i = divmod(k, num_TH)
+        else:
+            i, j = divmod(k, num_iterations)
+        if (j + 1) % 2 == 0:
+            T, H = information["temperature"][i], information["field"][i]
+            expected[j + 1, T, H] = state
+    assert len(recorded_plots) == len(expected)
+    for iteration, T, H, state in recorded_plots:
+        assert numpy.array_equal(state, expected[iteration, T, H])
+
+
+def test_animate_states_of_hdf(
+    monkeypatch, tmp_path, recorded_plots, information, frames
+):
+    ClosingReadHDF.closed = 0
+    monkeypatch.setattr(cli, "ReadHDF", ClosingReadHDF)
+    filename = tmp_path / "output.h5"
+    fan_out(information, frames, [HDFSink(filename)])
+
+    result = CliRunner().invoke(
+        cli.main,
+        [
+            "plot",
+            "animate-states",
+            str(tmp_path / "states.gif"),
+            "--hdf",
+            str(filename),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    num_iterations = information["num_iterations"]
+    assert [plot[:3] for plot in recorded_plots] == [
+        (num_iterations, T, H)
+        for T, H in zip(information["temperature"], information["field"])
+    ]
+    for i, plot in enumerate(recorded_plots):
+        assert numpy.allclose(plot[3], frames[(i + 1) * num_iterations - 1][0])
+    assert ClosingReadHDF.closed == 1
+
+
+def test_animate_states_of_hdf_closed_on_error(
+    monkeypatch, tmp_path, recorded_plots, information, frames
+):
+    ClosingReadHDF.closed = 0
+    monkeypatch.setattr(cli, "ReadHDF", ClosingReadHDF)
+    filename = tmp_path / "output.h5"
+    fan_out(information, frames, [HDFSink(filename)])
+
+    # the step is not a divisor of the number of iterations
+    result = CliRunner().invoke(
+        cli.main,
+        [
+            "plot",
+            "animate-states",
+            str(tmp_path / "states.gif"),
+            "--step",
+            "4",
+            "--hdf",
+            str(filename),
+        ],
+    )
+    assert result.exit_code != 0
+    assert ClosingReadHDF.closed == 1
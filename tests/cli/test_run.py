@@ -0,0 +1,124 @@
+import io
+
+import numpy
+import pytest
+from click.testing import CliRunner
+
+from llg import cli
+from llg.predefined_structures import GenericSc
+from llg.sample_file import write_json_sample
+from llg.simulation import Simulation
+from llg.store import ReadHDF
+from llg.stream import StreamReader
+
+
+@pytest.fixture
+def configuration(tmp_path):
+    # a simulation of two pairs and six iterations over 2 x 2 x 2 sites
+    sample = GenericSc(2)
+    sample.units = "adim"
+    sample.deltat = 1e-3
+    sample.damping = 0.5
+    sample.temperature = [1.0, 2.0]
+    sample.field = 0.5
+    simulation = sample.build()
+    simulation["num_iterations"] = 6
+    simulation["seed"] = 7
+    simulation["initial_state"] = numpy.tile([0.0, 0.0, 1.0], (8, 1))
+    filename = tmp_path / "simulation.json"
+    write_json_sample(simulation, filename)
+    return str(filename)
+
+
+def expected_frames(configuration, exchange_every=None):
+    simulation = Simulation.from_file(configuration, exchange_every=exchange_every)
+    frames = [(numpy.array(state), *energies) for state, *energies in simulation.run()]
+    return simulation.information, frames
+
+
+def assert_same_frames(read, frames):
+    assert len(read) == len(frames)
+    for (state, *energies), (expected_state, *expected_energies) in zip(read, frames):
+        assert numpy.allclose(state, expected_state)
+        assert numpy.allclose(energies, expected_energies)
+
+
+def read_hdf_frames(filename):
+    with ReadHDF(filename) as reader:
+        information = reader.information
+        frames = [(numpy.array(state), *energies) for state, *energies in reader]
+    return information, frames
+
+
+def invoke(arguments, **kwargs):
+    result = CliRunner().invoke(cli.main, arguments, **kwargs)
+    assert result.exit_code == 0, result.output
+    return result
+
+
+@pytest.mark.parametrize("exchange_every", [None, 2])
+def test_run_hdf(tmp_path, configuration, exchange_every):
+    output = str(tmp_path / "output.h5")
+    arguments = ["run", configuration, "--hdf", output, "--batch-size", "4"]
+    if exchange_every is not None:
+        arguments += ["--exchange-every", str(exchange_every)]
+    invoke(arguments)
+
+    information, frames = expected_frames(configuration, exchange_every)
+    read_information, read = read_hdf_frames(output)
+    assert read_information["num_TH"] == information["num_TH"]
+    assert read_information["num_iterations"] == information["num_iterations"]
+    if exchange_every is not None:
+        # the frames of parallel tempering are given iteration by iteration
+        num_TH = information["num_TH"]
+        frames = [
+            frames[k] for i in range(num_TH) for k in range(i, len(frames), num_TH)
+        ]
+    assert_same_frames(read, frames)
+
+
+def test_simulate_store_hdf(tmp_path, configuration):
+    stream = invoke(["simulate", configuration]).stdout_bytes
+    information, frames = expected_frames(configuration)
+    reader = StreamReader(io.BytesIO(stream))
+    assert reader.information["num_sites"] == information["num_sites"]
+    assert_same_frames(
+        [(numpy.array(state), *energies) for state, *energies in reader], frames
+    )
+
+    output = str(tmp_path / "output.h5")
+    invoke(["store-hdf", output, "--batch-size", "4"], input=stream)
+    _, read = read_hdf_frames(output)
+    assert_same_frames(read, frames)
+
+    # and the stored file is sent back as a stream
+    stream = invoke(["read-hdf", output]).stdout_bytes
+    reader = StreamReader(io.BytesIO(stream))
+    assert_same_frames(
+        [(numpy.array(state), *energies) for state, *energies in reader], frames
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_averages(tmp_path, configuration, workers):
+    # the averages of the run are the averages of the stored file
+    output = str(tmp_path / "output.h5")
+    averages = invoke(
+        ["run", configuration, "--hdf", output, "--averages", "-", "--discard", "2"]
+    ).stdout
+    stored = invoke(
+        ["compute-averages", "--hdf", output, "--discard", "2"]
+        + ["--workers", str(workers)]
+    ).stdout
+    assert averages == stored
+    assert len(averages.splitlines()) == 4
+
+
+def test_read_hdf_errors(tmp_path):
+    # the files that can not be opened are usage errors
+    not_hdf = tmp_path / "output.h5"
+    not_hdf.write_text("not a hdf file")
+    for filename in (tmp_path / "missing.h5", not_hdf):
+        result = CliRunner().invoke(cli.main, ["read-hdf", str(filename)])
+        assert result.exit_code == 2
+        assert "could not be read" in result.output
@@ -11,6 +11,7 @@ from functions.magnetization.pytest_fixtures import (
     random_state,
 )
 from functions.spin_fields.pytest_fixtures import (
+    build_ragged_sample,
     build_sample,
     random_anisotropy_constant,
     random_anisotropy_vector,
@@ -18,3 +19,5 @@ from functions.spin_fields.pytest_fixtures import (
     random_spin_moments,
     random_state_spins,
 )
+from store.pytest_fixtures import frames, information
+from simulation.pytest_fixtures import system
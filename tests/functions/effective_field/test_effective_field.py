@@ -0,0 +1,126 @@
+import numpy
+import pytest
+
+from llg.functions import effective_field, external_fields, spin_fields
+
+
+def random_arguments(
+    build_ragged_sample,
+    random_spin_moments,
+    random_anisotropy_constant,
+    random_anisotropy_vector,
+    temperature=1.0,
+):
+    # returns the arguments of `effective_field` after the state, with the csr
+    # neighbors of a ragged sample
+    num_sites, indptr, indices = build_ragged_sample
+    jex = numpy.random.uniform(-1, 1, size=len(indices))
+    magnetic_fields = numpy.random.uniform(-1, 1, size=(num_sites, 3))
+    intensity = external_fields.thermal_intensity(
+        numpy.full(num_sites, temperature), random_spin_moments, 0.5, 1e-3, 1.0, 1.0
+    )
+    seed, step = numpy.random.randint(0, 2**31, size=2)
+    return (
+        random_spin_moments,
+        indptr,
+        indices,
+        jex,
+        random_anisotropy_constant,
+        random_anisotropy_vector,
+        magnetic_fields,
+        intensity,
+        seed,
+        step,
+    )
+
+
+def reference_field(state, arguments):
+    # the sum of the separate kernels
+    (
+        spin_moments,
+        indptr,
+        indices,
+        jex,
+        anisotropy_constants,
+        anisotropy_vectors,
+        magnetic_fields,
+        intensity,
+        seed,
+        step,
+    ) = arguments
+    return (
+        spin_fields.exchange_interaction_field_csr(
+            state, spin_moments, indptr, indices, jex
+        )
+        + spin_fields.anisotropy_interaction_field(
+            state, spin_moments, anisotropy_constants, anisotropy_vectors
+        )
+        + external_fields.magnetic_field(magnetic_fields)
+        + external_fields.thermal_noise_field(intensity, seed, step)
+    )
+
+
+@pytest.mark.repeat(10)
+def test_effective_field_matches_separate_kernels(
+    random_state_spins,
+    build_ragged_sample,
+    random_spin_moments,
+    random_anisotropy_constant,
+    random_anisotropy_vector,
+):
+    arguments = random_arguments(
+        build_ragged_sample,
+        random_spin_moments,
+        random_anisotropy_constant,
+        random_anisotropy_vector,
+    )
+    assert numpy.allclose(
+        effective_field.effective_field(random_state_spins, *arguments),
+        reference_field(random_state_spins, arguments),
+    )
+
+
+@pytest.mark.repeat(10)
+def test_effective_field_null_temperature(
+    random_state_spins,
+    build_ragged_sample,
+    random_spin_moments,
+    random_anisotropy_constant,
+    random_anisotropy_vector,
+):
+    arguments = random_arguments(
+        build_ragged_sample,
+        random_spin_moments,
+        random_anisotropy_constant,
+        random_anisotropy_vector,
+        temperature=0.0,
+    )
+    field = effective_field.effective_field(random_state_spins, *arguments)
+    assert numpy.allclose(field, reference_field(random_state_spins, arguments))
+
+    # without noise, the field does not depend on the seed and the step
+    other = arguments[:-2] + (arguments[-2] + 1, arguments[-1] + 1)
+    assert numpy.array_equal(
+        field, effective_field.effective_field(random_state_spins, *other)
+    )
+
+
+@pytest.mark.repeat(10)
+def test_effective_field_parallel_matches_serial(
+    random_state_spins,
+    build_ragged_sample,
+    random_spin_moments,
+    random_anisotropy_constant,
+    random_anisotropy_vector,
+):
+    arguments = random_arguments(
+        build_ragged_sample,
+        random_spin_moments,
+        random_anisotropy_constant,
+        random_anisotropy_vector,
+    )
+    out = numpy.empty(random_state_spins.shape)
+    effective_field.effective_field_parallel(random_state_spins, *arguments, out)
+    assert numpy.array_equal(
+        effective_field.effective_field(random_state_spins, *arguments), out
+    )
@@ -0,0 +1,114 @@
+import numpy
+import pytest
+
+from llg.functions.encoding import (
+    decode_octahedral,
+    decode_spherical,
+    encode_octahedral,
+    encode_spherical,
+)
+
+
+def random_unit_vectors(num_sites):
+    state = numpy.random.normal(size=(num_sites, 3))
+    return state / numpy.linalg.norm(state, axis=1)[:, numpy.newaxis]
+
+
+def axes_and_diagonals():
+    vectors = numpy.array(
+        [
+            [1, 0, 0],
+            [-1, 0, 0],
+            [0, 1, 0],
+            [0, -1, 0],
+            [0, 0, 1],
+            [0, 0, -1],
+            [1, 1, 1],
+            [-1, -1, -1],
+            [1, -1, -1],
+        ],
+        dtype=float,
+    )
+    return vectors / numpy.linalg.norm(vectors, axis=1)[:, numpy.newaxis]
+
+
+@pytest.mark.repeat(10)
+def test_spherical_round_trip(num_sites):
+    state = random_unit_vectors(num_sites)
+    encoded = encode_spherical(state)
+    assert encoded.dtype == numpy.float32
+    assert encoded.shape == (num_sites, 2)
+    assert numpy.allclose(decode_spherical(encoded), state, atol=1e-6)
+
+
+@pytest.mark.repeat(10)
+def test_octahedral_round_trip(num_sites):
+    state = random_unit_vectors(num_sites)
+    encoded = encode_octahedral(state)
+    assert encoded.dtype == numpy.int16
+    assert encoded.shape == (num_sites, 2)
+    assert numpy.allclose(decode_octahedral(encoded), state, atol=1e-4)
+
+
+def test_octahedral_axes_and_diagonals():
+    state = axes_and_diagonals()
+    assert numpy.allclose(decode_octahedral(encode_octahedral(state)), state, atol=1e-4)
+
+
+def test_spherical_axes_and_diagonals():
+    state = axes_and_diagonals()
+    assert numpy.allclose(decode_spherical(encode_spherical(state)), state, atol=1e-6)
+
+
+@pytest.mark.repeat(10)
+def test_decoded_states_are_unit_vectors(num_sites):
+    state = random_unit_vectors(num_sites)
+    for decoded in (
+        decode_spherical(encode_spherical(state)),
+        decode_octahedral(encode_octahedral(state)),
+    ):
+        assert numpy.allclose(numpy.linalg.norm(decoded, axis=1), 1.0)
+
+
+def test_decode_into_out(num_sites):
+    state = random_unit_vectors(num_sites)
+    out = numpy.empty((num_sites, 3))
+    decode_octahedral(encode_octahedral(state), out)
+    assert numpy.allclose(out, state, atol=1e-4)
+
+
+@pytest.mark.parametrize(
+    "encode, decode, atol",
+    [
+        (encode_spherical, decode_spherical, 1e-6),
+        (encode_octahedral, decode_octahedral, 1e-4),
+    ],
+)
+def test_encode_into_out(num_sites, encode, decode, atol):
+    state = random_unit_vectors(num_sites)
+    expected = encode(state)
+    out = numpy.empty_like(expected)
+    assert encode(state, out) is out
+    assert numpy.array_equal(out, expected)
+    assert numpy.allclose(decode(out), state, atol=atol)
+
+
+@pytest.mark.parametrize(
+    "encode, decode, atol",
+    [
+        (encode_spherical, decode_spherical, 1e-6),
+        (encode_octahedral, decode_octahedral, 1e-4),
+    ],
+)
+def test_encode_non_unit_vectors(num_sites, encode, decode, atol):
+    # the spins are decoded as unit vectors with their direction
+    state = random_unit_vectors(num_sites)
+    lengths = numpy.random.uniform(0.1, 10.0, size=(num_sites, 1))
+    assert numpy.allclose(decode(encode(lengths * state)), state, atol=atol)
+
+
+def test_octahedral_null_vector():
+    state = numpy.zeros((2, 3))
+    encoded = encode_octahedral(state)
+    assert not encoded.any()
+    assert numpy.all(numpy.isfinite(decode_octahedral(encoded)))
@@ -70,3 +70,18 @@ def test_anisotropy_energy_random_anisotropy_vector(
         random_state_spins, anisotropy_constants, random_anisotropy_vector
     )
     assert numpy.allclose(expected, total)
+
+
+@pytest.mark.repeat(10)
+def test_anisotropy_energy_parallel(
+    random_state_spins, random_anisotropy_constant, random_anisotropy_vector
+):
+    arguments = (
+        random_state_spins,
+        random_anisotropy_constant,
+        random_anisotropy_vector,
+    )
+    assert numpy.allclose(
+        energy.compute_anisotropy_energy_parallel(*arguments),
+        energy.compute_anisotropy_energy(*arguments),
+    )
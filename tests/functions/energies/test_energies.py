@@ -0,0 +1,42 @@
+import numpy
+import pytest
+
+from llg.functions import energy
+
+
+@pytest.mark.repeat(10)
+def test_compute_energies_matches_separate_terms(
+    random_state_spins,
+    build_ragged_sample,
+    random_spin_moments,
+    random_anisotropy_constant,
+    random_anisotropy_vector,
+):
+    num_sites, indptr, indices = build_ragged_sample
+    jex = numpy.random.uniform(-1, 1, size=len(indices))
+    magnetic_fields = numpy.random.uniform(-1, 1, size=(num_sites, 3))
+    arguments = (
+        random_state_spins,
+        random_spin_moments,
+        indptr,
+        indices,
+        jex,
+        random_anisotropy_constant,
+        random_anisotropy_vector,
+        magnetic_fields,
+    )
+    exchange = energy.compute_exchange_energy_csr(
+        random_state_spins, indptr, indices, jex
+    )
+    anisotropy = energy.compute_anisotropy_energy(
+        random_state_spins, random_anisotropy_constant, random_anisotropy_vector
+    )
+    magnetic = energy.compute_magnetic_energy(
+        random_state_spins, random_spin_moments, magnetic_fields
+    )
+    expected = [exchange, anisotropy, magnetic, exchange + anisotropy + magnetic]
+
+    assert numpy.allclose(energy.compute_energies(*arguments), expected)
+    out = numpy.empty(4)
+    energy.compute_energies_parallel(*arguments, out)
+    assert numpy.allclose(out, expected)
@@ -52,3 +52,35 @@ def test_exchange_energy_random_J_exchange(
     )
     total = energy.compute_exchange_energy(random_state_spins, exchanges, neighbors_)
     assert numpy.allclose(expected, total)
+
+
+@pytest.mark.repeat(10)
+def test_exchange_energy_parallel(random_state_spins, build_sample, random_j_exchange):
+    num_sites, _, neighbors, _ = build_sample
+    exchanges = random_j_exchange.reshape(num_sites, 6)
+    neighbors_ = numpy.array(neighbors).reshape(num_sites, 6)
+    assert numpy.allclose(
+        energy.compute_exchange_energy_parallel(
+            random_state_spins, exchanges, neighbors_
+        ),
+        energy.compute_exchange_energy(random_state_spins, exchanges, neighbors_),
+    )
+
+
+@pytest.mark.repeat(10)
+def test_exchange_energy_csr(random_state_spins, build_ragged_sample):
+    num_sites, indptr, indices = build_ragged_sample
+    jex = numpy.random.uniform(-1, 1, size=len(indices))
+    expected = compute_exchange_energy(
+        num_sites, random_state_spins, jex, numpy.diff(indptr), indices
+    )
+    assert numpy.allclose(
+        energy.compute_exchange_energy_csr(random_state_spins, indptr, indices, jex),
+        expected,
+    )
+    assert numpy.allclose(
+        energy.compute_exchange_energy_csr_parallel(
+            random_state_spins, indptr, indices, jex
+        ),
+        expected,
+    )
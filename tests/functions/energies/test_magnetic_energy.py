@@ -117,3 +117,17 @@ def test_magnetic_energy_all_random(random_spin_moments, random_state_spins):
         magnetic_fields,
     )
     assert numpy.allclose(expected, total)
+
+
+@pytest.mark.repeat(10)
+def test_magnetic_energy_parallel(random_spin_moments, random_state_spins):
+    num_sites = len(random_spin_moments)
+    magnetic_fields = numpy.random.uniform(-1, 1, size=(num_sites, 3))
+    assert numpy.allclose(
+        energy.compute_magnetic_energy_parallel(
+            random_state_spins, random_spin_moments, magnetic_fields
+        ),
+        energy.compute_magnetic_energy(
+            random_state_spins, random_spin_moments, magnetic_fields
+        ),
+    )
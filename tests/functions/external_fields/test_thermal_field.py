@@ -143,3 +143,85 @@ def test_thermal_field_invalid_argument_for_square_root(num_sites):
                 )
             )
         )
+
+
+@pytest.mark.repeat(10)
+def test_thermal_intensity(num_sites, random_temperature, random_magnitude_spin):
+    damping, deltat, gyromagnetic, kB = numpy.random.uniform(0.1, 1, size=4)
+    expected = numpy.sqrt(
+        (2 * damping * kB * random_temperature)
+        / (gyromagnetic * random_magnitude_spin * deltat)
+    )
+    assert numpy.allclose(
+        external_fields.thermal_intensity(
+            random_temperature,
+            random_magnitude_spin,
+            damping,
+            deltat,
+            gyromagnetic,
+            kB,
+        ),
+        expected,
+    )
+
+
+def test_thermal_noise_field_null_intensity(num_sites):
+    assert numpy.allclose(
+        external_fields.thermal_noise_field(numpy.zeros(num_sites), 1, 0),
+        numpy.zeros((num_sites, 3)),
+    )
+
+
+@pytest.mark.repeat(10)
+def test_thermal_noise_field_is_keyed_by_seed_and_step(num_sites, random_intensities):
+    seed, step = numpy.random.randint(0, 2**31, size=2)
+    noise = external_fields.thermal_noise_field(random_intensities, seed, step)
+    out = numpy.empty((num_sites, 3))
+    external_fields.thermal_noise_field_parallel(random_intensities, seed, step, out)
+    assert numpy.array_equal(noise, out)
+    assert not numpy.allclose(
+        noise, external_fields.thermal_noise_field(random_intensities, seed, step + 1)
+    )
+
+
+def test_thermal_noise_field_statistics():
+    intensity = numpy.full(1000, 2.0)
+    noise = numpy.array(
+        [external_fields.thermal_noise_field(intensity, 5, step) for step in range(20)]
+    )
+    assert numpy.isclose(noise.mean(), 0.0, atol=0.05)
+    assert numpy.isclose(noise.std(), 2.0, atol=0.05)
+
+
+@pytest.mark.repeat(10)
+def test_thermal_field_out(num_sites):
+    # the same seed gives the same field with or without `out`
+    temperature = numpy.random.uniform(0, 10, size=num_sites)
+    spin_moments = numpy.random.uniform(1, 10, size=num_sites)
+    arguments = (temperature, spin_moments, 0.5, 1e-3, 1.0, 1.0)
+    seed = numpy.random.randint(0, 2**31)
+
+    numpy.random.seed(seed)
+    expected = external_fields.thermal_field(*arguments)
+    numpy.random.seed(seed)
+    out = numpy.empty((num_sites, 3))
+    result = external_fields.thermal_field(*arguments, out)
+    assert result is out
+    assert numpy.array_equal(expected, out)
+
+
+def test_thermal_field_buffers(num_sites):
+    # the intensities and the field are written into the given buffers
+    temperature = numpy.random.uniform(0, 10, size=num_sites)
+    spin_moments = numpy.random.uniform(1, 10, size=num_sites)
+    arguments = (temperature, spin_moments, 0.5, 1e-3, 1.0, 1.0)
+
+    numpy.random.seed(3)
+    expected = external_fields.thermal_field(*arguments)
+    numpy.random.seed(3)
+    out = numpy.empty((num_sites, 3))
+    intensity = numpy.empty(num_sites)
+    result = external_fields.thermal_field(*arguments, out, intensity)
+    assert result is out
+    assert numpy.array_equal(expected, out)
+    assert numpy.allclose(intensity, external_fields.thermal_intensity(*arguments))
@@ -1,7 +1,9 @@
+import tracemalloc
+
 import numpy
 import pytest
 
-from llg.functions import heun
+from llg.functions import energy, heun
 
 
 def sech(x):
@@ -49,3 +51,422 @@ def test_single_spin():
         )
         analytical = single_spin_analytical(H, damping, gyromagnetic, t)
         assert numpy.allclose(analytical, state[0])
+
+
+def to_csr(exchanges, neighbors):
+    num_sites, num_neighbors = neighbors.shape
+    indptr = numpy.arange(0, num_sites * num_neighbors + 1, num_neighbors)
+    return indptr, neighbors.ravel(), exchanges.ravel()
+
+
+def random_arguments(
+    build_sample,
+    random_j_exchange,
+    random_spin_moments,
+    random_anisotropy_constant,
+    random_anisotropy_vector,
+):
+    # returns the arguments of `integrate` and `integrate_n` (after the state) for
+    # a null temperature, so that both are deterministic
+    num_sites, _, neighbors, _ = build_sample
+    exchanges = random_j_exchange.reshape(num_sites, 6)
+    neighbors = numpy.array(neighbors).reshape(num_sites, 6)
+    head = (
+        random_spin_moments,
+        numpy.zeros(shape=num_sites),
+        0.5,
+        1e-3,
+        1.0,
+        1.0,
+        numpy.random.uniform(-1, 1, size=(num_sites, 3)),
+    )
+    tail = (random_anisotropy_constant, random_anisotropy_vector)
+    return (
+        head + (exchanges, neighbors) + tail,
+        head + to_csr(exchanges, neighbors) + tail,
+    )
+
+
+@pytest.mark.repeat(10)
+def test_single_spin_integrate_n():
+    H = numpy.random.uniform(-1, 1)
+    damping = numpy.random.uniform(0, 1)
+    gyromagnetic = 1.76e11
+    deltat = 1e-15
+    num_steps = numpy.random.randint(1, 100)
+
+    state = heun.integrate_n(
+        numpy.array([[1.0, 0.0, 0.0]]),
+        numpy.array([1.0]),
+        numpy.array([0.0]),
+        damping,
+        deltat,
+        gyromagnetic,
+        1.0,
+        numpy.array([[0, 0, H]]),
+        numpy.array([0, 0]),
+        numpy.array([], dtype=int),
+        numpy.array([]),
+        numpy.array([0.0]),
+        numpy.array([[0.0] * 3]),
+        num_steps,
+    )
+    analytical = single_spin_analytical(H, damping, gyromagnetic, num_steps * deltat)
+    assert numpy.allclose(analytical, state[0])
+
+
+@pytest.mark.repeat(10)
+def test_integrate_n_matches_integrate_without_noise(
+    random_state_spins,
+    build_sample,
+    random_j_exchange,
+    random_spin_moments,
+    random_anisotropy_constant,
+    random_anisotropy_vector,
+):
+    arguments, csr_arguments = random_arguments(
+        build_sample,
+        random_j_exchange,
+        random_spin_moments,
+        random_anisotropy_constant,
+        random_anisotropy_vector,
+    )
+    num_steps = numpy.random.randint(1, 10)
+
+    expected = random_state_spins
+    for _ in range(num_steps):
+        expected = heun.integrate(expected, *arguments)
+
+    state = heun.integrate_n(random_state_spins, *csr_arguments, num_steps)
+    assert numpy.allclose(expected, state)
+
+
+@pytest.mark.repeat(10)
+def test_integrate_in_place_with_workspace(
+    random_state_spins,
+    build_sample,
+    random_j_exchange,
+    random_spin_moments,
+    random_anisotropy_constant,
+    random_anisotropy_vector,
+):
+    arguments, csr_arguments = random_arguments(
+        build_sample,
+        random_j_exchange,
+        random_spin_moments,
+        random_anisotropy_constant,
+        random_anisotropy_vector,
+    )
+    expected = heun.integrate(random_state_spins, *arguments)
+
+    workspace = heun.allocate_workspace(len(random_state_spins))
+    state = random_state_spins.copy()
+    result = heun.integrate(state, *arguments, workspace, state)
+    assert result is state
+    assert numpy.allclose(expected, state)
+
+    state = random_state_spins.copy()
+    result = heun.integrate_n(state, *csr_arguments, 1, workspace, state)
+    assert result is state
+    assert numpy.allclose(expected, state)
+
+
+def test_integrate_reuses_workspace():
+    # with a workspace and `out`, a step does not allocate any array of the size
+    # of the sample, which is large enough to tell them from the fixed overhead
+    num_sites = 4096
+    state = numpy.random.normal(size=(num_sites, 3))
+    state /= numpy.linalg.norm(state, axis=1)[:, numpy.newaxis]
+    sites = numpy.arange(num_sites)
+    neighbors = numpy.stack(
+        [numpy.roll(sites, shift) for shift in (1, -1, 8, -8, 64, -64)], axis=1
+    )
+    arguments = (
+        numpy.ones(num_sites),
+        numpy.random.uniform(1, 10, size=num_sites),
+        0.5,
+        1e-3,
+        1.0,
+        1.0,
+        numpy.random.uniform(-1, 1, size=(num_sites, 3)),
+        numpy.ones((num_sites, 6)),
+        neighbors,
+        numpy.ones(num_sites),
+        numpy.tile([0.0, 0.0, 1.0], (num_sites, 1)),
+    )
+    workspace = heun.allocate_workspace(num_sites)
+    heun.integrate(state, *arguments, workspace, state)
+
+    tracemalloc.start()
+    try:
+        for _ in range(5):
+            result = heun.integrate(state, *arguments, workspace, state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert result is state
+    assert peak < num_sites * 8
+    assert numpy.allclose(numpy.linalg.norm(state, axis=1), 1.0)
+
+
+@pytest.mark.repeat(10)
+def test_integrate_with_workspace_same_noise(
+    random_state_spins,
+    build_sample,
+    random_j_exchange,
+    random_spin_moments,
+    random_anisotropy_constant,
+    random_anisotropy_vector,
+):
+    # the noise is drawn from the numpy random state with or without a workspace
+    arguments, _ = random_arguments(
+        build_sample,
+        random_j_exchange,
+        random_spin_moments,
+        random_anisotropy_constant,
+        random_anisotropy_vector,
+    )
+    arguments = list(arguments)
+    arguments[1] = numpy.random.uniform(1, 10, size=len(random_state_spins))
+    seed = numpy.random.randint(0, 2**31)
+
+    numpy.random.seed(seed)
+    expected = heun.integrate(random_state_spins, *arguments)
+    numpy.random.seed(seed)
+    workspace = heun.allocate_workspace(len(random_state_spins))
+    state = heun.integrate(random_state_spins, *arguments, workspace)
+    assert numpy.array_equal(expected, state)
+
+
+@pytest.mark.repeat(10)
+def test_integrate_n_parallel_matches_serial(
+    random_state_spins,
+    build_sample,
+    random_j_exchange,
+    random_spin_moments,
+    random_anisotropy_constant,
+    random_anisotropy_vector,
+):
+    _, csr_arguments = random_arguments(
+        build_sample,
+        random_j_exchange,
+        random_spin_moments,
+        random_anisotropy_constant,
+        random_anisotropy_vector,
+    )
+    num_steps = numpy.random.randint(1, 10)
+    expected = heun.integrate_n(random_state_spins, *csr_arguments, num_steps)
+    state = heun.integrate_n(
+        random_state_spins, *csr_arguments, num_steps, None, None, True
+    )
+    assert numpy.allclose(expected, state)
+
+
+def thermal_arguments(csr_arguments, num_sites):
+    # the csr arguments with a finite temperature
+    temperature = numpy.random.uniform(0.5, 2, size=num_sites)
+    return csr_arguments[:1] + (temperature,) + csr_arguments[2:]
+
+
+@pytest.mark.repeat(10)
+def test_integrate_n_noise_is_independent_of_threads(
+    random_state_spins,
+    build_sample,
+    random_j_exchange,
+    random_spin_moments,
+    random_anisotropy_constant,
+    random_anisotropy_vector,
+):
+    _, csr_arguments = random_arguments(
+        build_sample,
+        random_j_exchange,
+        random_spin_moments,
+        random_anisotropy_constant,
+        random_anisotropy_vector,
+    )
+    csr_arguments = thermal_arguments(csr_arguments, len(random_state_spins))
+    num_steps = numpy.random.randint(1, 10)
+    seed = numpy.random.randint(0, 2**31)
+    expected = heun.integrate_n(
+        random_state_spins, *csr_arguments, num_steps, None, None, False, seed
+    )
+    state = heun.integrate_n(
+        random_state_spins, *csr_arguments, num_steps, None, None, True, seed
+    )
+    assert numpy.array_equal(expected, state)
+
+
+@pytest.mark.repeat(10)
+def test_integrate_n_split_in_several_calls(
+    random_state_spins,
+    build_sample,
+    random_j_exchange,
+    random_spin_moments,
+    random_anisotropy_constant,
+    random_anisotropy_vector,
+):
+    _, csr_arguments = random_arguments(
+        build_sample,
+        random_j_exchange,
+        random_spin_moments,
+        random_anisotropy_constant,
+        random_anisotropy_vector,
+    )
+    csr_arguments = thermal_arguments(csr_arguments, len(random_state_spins))
+    num_steps = numpy.random.randint(2, 10)
+    expected = heun.integrate_n(
+        random_state_spins, *csr_arguments, num_steps, None, None, False, 7
+    )
+
+    state = random_state_spins
+    for step in range(num_steps):
+        state = heun.integrate_n(state, *csr_arguments, 1, None, None, False, 7, step)
+    assert numpy.array_equal(expected, state)
+
+
+@pytest.mark.repeat(10)
+def test_integrate_n_energies(
+    random_state_spins,
+    build_sample,
+    random_j_exchange,
+    random_spin_moments,
+    random_anisotropy_constant,
+    random_anisotropy_vector,
+):
+    _, csr_arguments = random_arguments(
+        build_sample,
+        random_j_exchange,
+        random_spin_moments,
+        random_anisotropy_constant,
+        random_anisotropy_vector,
+    )
+    csr_arguments = thermal_arguments(csr_arguments, len(random_state_spins))
+    spin_moments, *_, magnetic_fields, indptr, indices, jex = csr_arguments[:10]
+    anisotropy_constants, anisotropy_vectors = csr_arguments[10:]
+    num_steps = numpy.random.randint(1, 10)
+
+    energies = numpy.empty(4)
+    state = heun.integrate_n(
+        random_state_spins,
+        *csr_arguments,
+        num_steps,
+        None,
+        None,
+        False,
+        3,
+        0,
+        None,
+        energies,
+    )
+    exchange = energy.compute_exchange_energy_csr(state, indptr, indices, jex)
+    anisotropy = energy.compute_anisotropy_energy(
+        state, anisotropy_constants, anisotropy_vectors
+    )
+    magnetic = energy.compute_magnetic_energy(state, spin_moments, magnetic_fields)
+    assert numpy.allclose(
+        energies, [exchange, anisotropy, magnetic, exchange + anisotropy + magnetic]
+    )
+
+
+def replica_arguments(csr_arguments, num_replicas):
+    # the csr arguments with a leading axis of replicas in the temperatures and the
+    # magnetic fields
+    spin_moments, temperature, *scalars, magnetic_fields = csr_arguments[:7]
+    return (
+        (spin_moments, numpy.repeat(temperature[numpy.newaxis], num_replicas, axis=0))
+        + tuple(scalars)
+        + (numpy.repeat(magnetic_fields[numpy.newaxis], num_replicas, axis=0),)
+        + csr_arguments[7:]
+    )
+
+
+@pytest.mark.repeat(10)
+def test_integrate_replicas_n(
+    random_state_spins,
+    build_sample,
+    random_j_exchange,
+    random_spin_moments,
+    random_anisotropy_constant,
+    random_anisotropy_vector,
+):
+    _, csr_arguments = random_arguments(
+        build_sample,
+        random_j_exchange,
+        random_spin_moments,
+        random_anisotropy_constant,
+        random_anisotropy_vector,
+    )
+    csr_arguments = thermal_arguments(csr_arguments, len(random_state_spins))
+    num_replicas = numpy.random.randint(2, 5)
+    num_steps = numpy.random.randint(1, 10)
+    states = numpy.repeat(random_state_spins[numpy.newaxis], num_replicas, axis=0)
+    arguments = replica_arguments(csr_arguments, num_replicas)
+
+    expected = heun.integrate_n(
+        random_state_spins, *csr_arguments, num_steps, None, None, False, 7
+    )
+    result = heun.integrate_replicas_n(
+        states, *arguments, num_steps, None, None, False, 7
+    )
+    # the first replica follows `integrate_n`, and the others have their own noise
+    assert result.shape == states.shape
+    assert numpy.array_equal(expected, result[0])
+    for r in range(1, num_replicas):
+        assert not numpy.allclose(result[0], result[r])
+
+    parallel = heun.integrate_replicas_n(
+        states, *arguments, num_steps, None, None, True, 7
+    )
+    assert numpy.array_equal(result, parallel)
+
+
+@pytest.mark.repeat(10)
+def test_integrate_replicas_n_energies(
+    random_state_spins,
+    build_sample,
+    random_j_exchange,
+    random_spin_moments,
+    random_anisotropy_constant,
+    random_anisotropy_vector,
+):
+    _, csr_arguments = random_arguments(
+        build_sample,
+        random_j_exchange,
+        random_spin_moments,
+        random_anisotropy_constant,
+        random_anisotropy_vector,
+    )
+    csr_arguments = thermal_arguments(csr_arguments, len(random_state_spins))
+    spin_moments, *_, magnetic_fields, indptr, indices, jex = csr_arguments[:10]
+    anisotropy_constants, anisotropy_vectors = csr_arguments[10:]
+    num_replicas = numpy.random.randint(2, 5)
+    num_steps = numpy.random.randint(1, 10)
+    states = numpy.repeat(random_state_spins[numpy.newaxis], num_replicas, axis=0)
+
+    energies = numpy.empty((num_replicas, 4))
+    workspace = heun.allocate_workspace(len(random_state_spins), num_replicas)
+    result = heun.integrate_replicas_n(
+        states,
+        *replica_arguments(csr_arguments, num_replicas),
+        num_steps,
+        workspace,
+        states,
+        False,
+        3,
+        0,
+        None,
+        energies,
+    )
+    assert result is states
+    for r, state in enumerate(states):
+        expected = energy.compute_energies(
+            state,
+            spin_moments,
+            indptr,
+            indices,
+            jex,
+            anisotropy_constants,
+            anisotropy_vectors,
+            magnetic_fields,
+        )
+        assert numpy.allclose(energies[r], expected)
@@ -0,0 +1,63 @@
+from collections import Counter
+from itertools import product
+
+import numpy
+import pytest
+
+from llg.functions.neighbors import find_neighbors
+
+
+def brute_force_neighbors(positions, cutoff, box=None):
+    if box is None:
+        images = [numpy.zeros(3)]
+    else:
+        images = [numpy.array(image) @ box for image in product(range(-3, 4), repeat=3)]
+    neighbors = Counter()
+    for i, j in product(range(len(positions)), repeat=2):
+        for image in images:
+            distance = numpy.linalg.norm(positions[j] + image - positions[i])
+            if 0 < distance <= cutoff:
+                neighbors[(i, j, round(distance, 8))] += 1
+    return neighbors
+
+
+def found_neighbors(links):
+    return Counter(
+        (source, target, round(distance, 8))
+        for source, target, distance in zip(
+            links.source.tolist(), links.target.tolist(), links.jex.tolist()
+        )
+    )
+
+
+@pytest.mark.repeat(5)
+def test_find_neighbors_open_boundaries():
+    positions = numpy.random.uniform(-2, 2, size=(40, 3))
+    cutoff = numpy.random.uniform(0.5, 1.5)
+    links = find_neighbors(positions, cutoff, jex=lambda distances: distances)
+    assert found_neighbors(links) == brute_force_neighbors(positions, cutoff)
+
+
+@pytest.mark.repeat(5)
+def test_find_neighbors_periodic_box():
+    box = numpy.diag(numpy.random.uniform(2, 4, size=3))
+    box[1, 0] = numpy.random.uniform(-0.5, 0.5)
+    positions = numpy.random.uniform(-1, 5, size=(40, 3))
+    cutoff = numpy.random.uniform(0.5, 1.5)
+    links = find_neighbors(positions, cutoff, box, jex=lambda distances: distances)
+    assert found_neighbors(links) == brute_force_neighbors(positions, cutoff, box)
+
+
+def test_find_neighbors_simple_cubic():
+    positions = numpy.array(list(product(range(4), repeat=3)), dtype=float)
+    links = find_neighbors(positions, 1.1, numpy.eye(3) * 4, jex=2.0)
+    assert numpy.all(numpy.bincount(links.source) == 6)
+    assert numpy.all(links.jex == 2.0)
+    assert sorted(zip(links.source, links.target)) == sorted(
+        zip(links.target, links.source)
+    )
+
+
+def test_find_neighbors_cutoff_larger_than_box():
+    with pytest.raises(Exception):
+        find_neighbors(numpy.zeros((2, 3)), 2.0, numpy.eye(3))
@@ -0,0 +1,52 @@
+import numpy
+import pytest
+
+from llg.functions.philox import gaussian_triplet, philox4x32
+
+MAX_WORD = 0xFFFFFFFF
+
+
+@pytest.mark.parametrize(
+    "counter, key, expected",
+    [
+        ((0, 0, 0, 0), (0, 0), (0x6627E8D5, 0xE169C58D, 0xBC57AC4C, 0x9B00DBD8)),
+        (
+            (MAX_WORD, MAX_WORD, MAX_WORD, MAX_WORD),
+            (MAX_WORD, MAX_WORD),
+            (0x408F276D, 0x41C83B0E, 0xA20BC7C6, 0x6D5451FD),
+        ),
+        (
+            (0x243F6A88, 0x85A308D3, 0x13198A2E, 0x03707344),
+            (0xA4093822, 0x299F31D0),
+            (0xD16CFE09, 0x94FDCCEB, 0x5001E420, 0x24126EA1),
+        ),
+    ],
+)
+def test_philox_known_answers(counter, key, expected):
+    # the known answers of the Random123 reference implementation
+    assert philox4x32(*counter, *key) == expected
+
+
+def test_gaussian_triplet_is_deterministic():
+    seed, step, site = numpy.random.randint(0, 2**31, size=3)
+    assert gaussian_triplet(seed, step, site) == gaussian_triplet(seed, step, site)
+    assert gaussian_triplet(seed, step, site) != gaussian_triplet(seed, step + 1, site)
+    assert gaussian_triplet(seed, step, site) != gaussian_triplet(seed, step, site + 1)
+    assert gaussian_triplet(seed, step, site) != gaussian_triplet(seed + 1, step, site)
+    assert gaussian_triplet(seed, step, site) != gaussian_triplet(seed, step, site, 1)
+
+
+def test_gaussian_triplet_large_steps():
+    # the step has 64 bits, split in two words of the counter
+    assert gaussian_triplet(0, 1, 0) != gaussian_triplet(0, 1 + 2**32, 0)
+
+
+def test_gaussian_triplet_statistics():
+    samples = numpy.array(
+        [gaussian_triplet(3, step, site) for step in range(100) for site in range(300)]
+    )
+    assert numpy.all(numpy.isfinite(samples))
+    assert numpy.allclose(samples.mean(axis=0), 0.0, atol=0.03)
+    assert numpy.allclose(samples.std(axis=0), 1.0, atol=0.03)
+    correlations = numpy.corrcoef(samples.T)[numpy.triu_indices(3, 1)]
+    assert numpy.allclose(correlations, 0.0, atol=0.03)
@@ -68,3 +68,16 @@ def random_anisotropy_constant(build_sample):
 def random_anisotropy_vector(build_sample):
     num_sites, _, _, _ = build_sample
     return numpy.random.uniform(-1, 1, size=(num_sites, 3))
+
+
+# Fixture to remove some links of the simple cubic bulk, so that the number of
+# neighbors changes from site to site. It returns the CSR layout of the links.
+@pytest.fixture
+def build_ragged_sample(build_sample):
+    num_sites, _, neighbors, num_neighbors = build_sample
+    keep = numpy.random.uniform(size=len(neighbors)) < 0.7
+    sources = numpy.repeat(numpy.arange(num_sites), num_neighbors)[keep]
+    indices = numpy.array(neighbors)[keep]
+    indptr = numpy.zeros(num_sites + 1, dtype=int)
+    numpy.cumsum(numpy.bincount(sources, minlength=num_sites), out=indptr[1:])
+    return num_sites, indptr, indices
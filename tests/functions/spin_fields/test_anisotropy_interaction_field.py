@@ -165,3 +165,22 @@ def test_anisotropy_interaction_field_random_anisotropy_vector(
         ),
         total,
     )
+
+
+@pytest.mark.repeat(10)
+def test_anisotropy_interaction_field_parallel(
+    random_state_spins,
+    random_spin_moments,
+    random_anisotropy_constant,
+    random_anisotropy_vector,
+):
+    arguments = (
+        random_state_spins,
+        random_spin_moments,
+        random_anisotropy_constant,
+        random_anisotropy_vector,
+    )
+    assert numpy.allclose(
+        spin_fields.anisotropy_interaction_field_parallel(*arguments),
+        spin_fields.anisotropy_interaction_field(*arguments),
+    )
@@ -126,3 +126,68 @@ def test_exchange_interaction_field_null_magnetic_moments(
         )
     )
     assert numpy.allclose(total, expected)
+
+
+@pytest.mark.repeat(10)
+def test_exchange_interaction_field_out(
+    random_state_spins, build_sample, random_spin_moments, random_j_exchange
+):
+    num_sites, _, neighbors, _ = build_sample
+    exchanges = random_j_exchange.reshape(num_sites, 6)
+    neighbors_ = numpy.array(neighbors).reshape(num_sites, 6)
+    out = numpy.empty(shape=(num_sites, 3))
+    total = spin_fields.exchange_interaction_field(
+        random_state_spins, random_spin_moments, exchanges, neighbors_, out
+    )
+    assert total is out
+    assert numpy.allclose(
+        out,
+        spin_fields.exchange_interaction_field(
+            random_state_spins, random_spin_moments, exchanges, neighbors_
+        ),
+    )
+
+
+@pytest.mark.repeat(10)
+def test_exchange_interaction_field_parallel(
+    random_state_spins, build_sample, random_spin_moments, random_j_exchange
+):
+    num_sites, _, neighbors, _ = build_sample
+    exchanges = random_j_exchange.reshape(num_sites, 6)
+    neighbors_ = numpy.array(neighbors).reshape(num_sites, 6)
+    assert numpy.allclose(
+        spin_fields.exchange_interaction_field_parallel(
+            random_state_spins, random_spin_moments, exchanges, neighbors_
+        ),
+        spin_fields.exchange_interaction_field(
+            random_state_spins, random_spin_moments, exchanges, neighbors_
+        ),
+    )
+
+
+@pytest.mark.repeat(10)
+def test_exchange_interaction_field_csr(
+    random_state_spins, build_ragged_sample, random_spin_moments
+):
+    num_sites, indptr, indices = build_ragged_sample
+    jex = numpy.random.uniform(-1, 1, size=len(indices))
+    expected = compute_exchange_field(
+        num_sites,
+        random_state_spins,
+        jex,
+        random_spin_moments,
+        numpy.diff(indptr),
+        indices,
+    )
+    assert numpy.allclose(
+        spin_fields.exchange_interaction_field_csr(
+            random_state_spins, random_spin_moments, indptr, indices, jex
+        ),
+        expected,
+    )
+    assert numpy.allclose(
+        spin_fields.exchange_interaction_field_csr_parallel(
+            random_state_spins, random_spin_moments, indptr, indices, jex
+        ),
+        expected,
+    )
@@ -0,0 +1,64 @@
+import numpy
+import pytest
+
+from llg.functions.tempering import exchange_replicas
+
+
+def random_replicas(num_replicas, num_sites):
+    states = numpy.random.normal(size=(num_replicas, num_sites, 3))
+    energies = numpy.random.uniform(-10, 10, size=(num_replicas, 4))
+    betas = numpy.sort(numpy.random.uniform(0.1, 10, size=num_replicas))
+    counters = numpy.zeros(num_replicas - 1, dtype=int)
+    return states, energies, betas, counters, counters.copy()
+
+
+@pytest.mark.repeat(10)
+@pytest.mark.parametrize("parity", [0, 1])
+def test_exchange_replicas_accepted(parity):
+    num_replicas = numpy.random.randint(2, 10)
+    states, energies, betas, attempts, acceptances = random_replicas(num_replicas, 8)
+    expected_states = states.copy()
+    expected_energies = energies.copy()
+
+    # a null uniform number accepts every swap
+    uniforms = numpy.zeros(num_replicas - 1)
+    exchange_replicas(states, energies, betas, parity, uniforms, attempts, acceptances)
+
+    pairs = numpy.arange(parity, num_replicas - 1, 2)
+    for r in pairs:
+        expected_states[[r, r + 1]] = expected_states[[r + 1, r]]
+        expected_energies[[r, r + 1]] = expected_energies[[r + 1, r]]
+    assert numpy.array_equal(expected_states, states)
+    assert numpy.array_equal(expected_energies, energies)
+    assert numpy.array_equal(attempts, acceptances)
+    assert numpy.array_equal(numpy.flatnonzero(attempts), pairs)
+
+
+@pytest.mark.repeat(10)
+def test_exchange_replicas_metropolis():
+    states, energies, betas, attempts, acceptances = random_replicas(2, 8)
+    expected_states = states.copy()
+    delta = (betas[0] - betas[1]) * (energies[0, 3] - energies[1, 3])
+    probability = min(1.0, numpy.exp(delta))
+    uniform = numpy.random.uniform()
+
+    exchange_replicas(
+        states, energies, betas, 0, numpy.array([uniform]), attempts, acceptances
+    )
+    assert attempts[0] == 1
+    if uniform < probability:
+        assert acceptances[0] == 1
+        assert numpy.array_equal(expected_states[::-1], states)
+    else:
+        assert acceptances[0] == 0
+        assert numpy.array_equal(expected_states, states)
+
+
+def test_exchange_replicas_same_temperature():
+    # the swaps between replicas at the same temperature are always accepted
+    states, energies, _, attempts, acceptances = random_replicas(3, 4)
+    betas = numpy.ones(3)
+    uniforms = numpy.full(2, 1 - 1e-12)
+    exchange_replicas(states, energies, betas, 0, uniforms, attempts, acceptances)
+    exchange_replicas(states, energies, betas, 1, uniforms, attempts, acceptances)
+    assert numpy.array_equal(acceptances, [1, 1])
@@ -0,0 +1,49 @@
+import numpy
+import pytest
+
+from llg.geometry import Geometry, Links
+from llg.site import Site
+
+
+def site(index):
+    return Site(index, [index, 0.0, 0.0], "Fe", 1.0, 0.0, [0, 0, 1], [0, 0, 1])
+
+
+def test_from_sites():
+    first, second = site(0), site(1)
+    first.append_neighbor(second, 1.0)
+    second.append_neighbor(first, 1.0)
+    geometry = Geometry.from_sites([first, second])
+    assert geometry.num_sites == 2
+    assert geometry.num_interactions == 2
+
+    with pytest.raises(Exception, match="already exists"):
+        Geometry.from_sites([first, second, site(1)])
+
+    third = site(2)
+    third.append_neighbor(first, 1.0)
+    with pytest.raises(Exception, match="no reverse link"):
+        Geometry.from_sites([first, second, third])
+
+
+def test_check_columns():
+    geometry = Geometry.from_sites([site(0), site(1)])
+    sites = geometry.sites._replace(position=numpy.zeros((3, 3)))
+    links = Links(numpy.array([0]), numpy.array([1, 0]), numpy.array([1.0]))
+    errors = Geometry.check(sites, links)
+    assert errors == [
+        "The column position of the sites has 3 rows, but there are 2 sites.",
+        "The column target of the links has 2 rows, but there are 1 links.",
+    ]
+
+
+def test_from_positions():
+    sites = Geometry.from_sites([site(0), site(1), site(3)]).sites
+    geometry = Geometry.from_positions(sites, 1.5, jex=2.0)
+    assert geometry.num_sites == 3
+    assert sorted(zip(geometry.links.source, geometry.links.target)) == [(0, 1), (1, 0)]
+    assert numpy.all(geometry.links.jex == 2.0)
+
+    # the geometry is validated as the one of ``from_sites``
+    with pytest.raises(Exception, match="already exists"):
+        Geometry.from_positions(sites._replace(index=numpy.array([0, 1, 1])), 1.5)
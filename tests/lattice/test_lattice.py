@@ -0,0 +1,120 @@
+import json
+from itertools import product
+
+import numpy
+import pytest
+
+from llg.geometry import Geometry
+from llg.predefined_structures import GenericBcc, GenericFcc, GenericSc
+
+# the offsets of the nearest neighbors, in units of the cubic cell
+SC_OFFSETS = [
+    (1, 0, 0),
+    (-1, 0, 0),
+    (0, 1, 0),
+    (0, -1, 0),
+    (0, 0, 1),
+    (0, 0, -1),
+]
+BCC_OFFSETS = list(product((0.5, -0.5), repeat=3))
+FCC_OFFSETS = [
+    offset
+    for a, b in product((0.5, -0.5), repeat=2)
+    for offset in ((a, b, 0), (0, a, b), (a, 0, b))
+]
+
+
+def old_pairs(length, basis, offsets):
+    # the pairs of the generic samples before they were built on ``Lattice``, with
+    # the sites indexed by cell and by basis site
+    index = {}
+    for x, y, z in product(range(length), repeat=3):
+        for bx, by, bz in basis:
+            index[(x + bx, y + by, z + bz)] = len(index)
+
+    pairs = []
+    for (x, y, z), i in index.items():
+        for dx, dy, dz in offsets:
+            target = ((x + dx) % length, (y + dy) % length, (z + dz) % length)
+            pairs.append((i, index[target]))
+    return index, pairs
+
+
+STRUCTURES = [
+    (GenericSc, [(0, 0, 0)], SC_OFFSETS),
+    (GenericBcc, [(0, 0, 0), (0.5, 0.5, 0.5)], BCC_OFFSETS),
+    (
+        GenericFcc,
+        [(0, 0, 0), (0.5, 0.5, 0), (0.5, 0, 0.5), (0, 0.5, 0.5)],
+        FCC_OFFSETS,
+    ),
+]
+
+
+@pytest.mark.parametrize("structure, basis, offsets", STRUCTURES)
+@pytest.mark.parametrize("length", [2, 3, 4])
+def test_lattice_old_pairs(structure, basis, offsets, length):
+    index, pairs = old_pairs(length, basis, offsets)
+    sample = structure(length)
+
+    # the sites keep their order
+    positions = numpy.array(list(index))
+    assert numpy.allclose(sample.lattice.positions, positions)
+
+    # and every site keeps the same neighbors
+    csr = sample.lattice.csr()
+    expected = [[] for _ in index]
+    for i, j in pairs:
+        expected[i].append(j)
+    for i, targets in enumerate(expected):
+        row = csr.indices[slice(csr.indptr[i], csr.indptr[i + 1])]
+        assert sorted(row.tolist()) == sorted(targets)
+
+    # also as the lists of the sample
+    assert [site["index"] for site in sample.sites] == list(range(len(index)))
+    assert numpy.allclose([site["position"] for site in sample.sites], positions)
+    assert sorted(
+        (neighbor["source"], neighbor["target"]) for neighbor in sample.neighbors
+    ) == sorted(pairs)
+
+
+@pytest.mark.parametrize("structure, basis, offsets", STRUCTURES)
+def test_build_is_serializable(structure, basis, offsets):
+    # the built sample has the lists of sites and neighbors, as without a lattice
+    sample = structure(2).build()
+    assert json.loads(json.dumps(sample))["geometry"] == sample["geometry"]
+    geometry = Geometry.from_dict(sample["geometry"])
+    expected = structure(2).build_geometry()
+    assert numpy.array_equal(geometry.csr.indptr, expected.csr.indptr)
+    assert numpy.array_equal(geometry.csr.indices, expected.csr.indices)
+    assert numpy.array_equal(geometry.csr.jex, expected.csr.jex)
+    assert numpy.allclose(geometry.positions, expected.positions)
+
+
+@pytest.mark.parametrize("structure, basis, offsets", STRUCTURES)
+def test_lattice_lists_are_kept(structure, basis, offsets):
+    # without reading the lists the geometry is generated from the lattice, and it is
+    # the same geometry as the one of the lists
+    geometry = structure(3).build_geometry()
+    assert isinstance(geometry, Geometry)
+
+    sample = structure(3)
+    sample.sites[0]["type"] = "Fe"
+    edited = sample.build_geometry()
+    assert edited.types[0] == "Fe"
+    assert set(edited.types[1:]) == {"generic"}
+    assert numpy.array_equal(edited.csr.indptr, geometry.csr.indptr)
+    assert numpy.array_equal(edited.csr.indices, geometry.csr.indices)
+    assert numpy.array_equal(edited.csr.jex, geometry.csr.jex)
+    assert numpy.allclose(edited.positions, geometry.positions)
+
+
+def test_lattice_lists_by_shell():
+    # the exchange interaction of each shell is kept in the neighbors
+    sample = GenericSc(3)
+    sample.num_shells = 2
+    sample.jex = [1.0, 0.5]
+    assert {neighbor["jex"] for neighbor in sample.neighbors} == {1.0, 0.5}
+    geometry = sample.build_geometry()
+    expected = sample.lattice.csr(2, [1.0, 0.5])
+    assert numpy.array_equal(geometry.csr.jex, expected.jex)
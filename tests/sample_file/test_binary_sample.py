@@ -0,0 +1,91 @@
+import json
+import os
+
+import numpy
+import pytest
+
+from llg.geometry import Geometry
+from llg.predefined_structures import GenericSc
+from llg.sample_file import (
+    read_binary_sample,
+    read_sample,
+    write_binary_sample,
+    write_json_sample,
+)
+
+
+def build(length):
+    sample = GenericSc(length)
+    sample.temperature = [1.0, 2.0]
+    sample.field = 0.0
+    return sample.build()
+
+
+def assert_same_geometry(geometry, expected):
+    for columns, expected_columns in (
+        (geometry.sites, expected.sites),
+        (geometry.links, expected.links),
+    ):
+        for column, expected_column in zip(columns, expected_columns):
+            assert numpy.array_equal(column, expected_column)
+
+
+@pytest.mark.parametrize("mmap_mode", ["r", None])
+def test_round_trip(tmp_path, mmap_mode):
+    sample = build(3)
+    sample["initial_state"] = numpy.random.normal(size=(27, 3))
+    write_json_sample(sample, tmp_path / "sample.json")
+    write_binary_sample(read_sample(tmp_path / "sample.json"), tmp_path / "binary")
+
+    read = read_binary_sample(tmp_path / "binary", mmap_mode)
+    assert_same_geometry(read["geometry"], Geometry.from_dict(sample["geometry"]))
+    assert numpy.allclose(read["initial_state"], sample["initial_state"])
+    assert read["temperature"] == [1.0, 2.0]
+    assert read["parameters"] == sample["parameters"]
+
+    # and back to JSON
+    write_json_sample(read, tmp_path / "back.json")
+    back = read_sample(tmp_path / "back.json")
+    assert_same_geometry(back["geometry"], Geometry.from_dict(sample["geometry"]))
+    assert numpy.allclose(back["initial_state"], sample["initial_state"])
+
+
+def test_write_invalid_geometry(tmp_path):
+    # a Geometry is validated as a dictionary is
+    geometry = Geometry.from_dict(build(2)["geometry"])
+    links = geometry.links
+    broken = Geometry(
+        geometry.sites, links._replace(jex=links.jex * numpy.arange(len(links.jex)))
+    )
+    with pytest.raises(Exception, match="different jex"):
+        write_binary_sample(dict(build(2), geometry=broken), tmp_path / "binary")
+
+
+@pytest.mark.parametrize(
+    "group, field, change, message",
+    [
+        ("sites", "index", lambda index: numpy.zeros_like(index), "already exists"),
+        ("neighbors", "target", lambda target: target + 100, "is not a site"),
+        ("neighbors", "jex", lambda jex: jex * numpy.arange(len(jex)), "different jex"),
+        ("sites", "mu", lambda mu: mu[:-1], "rows"),
+    ],
+)
+def test_read_invalid_geometry(tmp_path, group, field, change, message):
+    directory = tmp_path / "binary"
+    write_binary_sample(build(2), directory)
+    column_file = os.path.join(directory, group, f"{field}.npy")
+    numpy.save(column_file, change(numpy.load(column_file)))
+
+    with pytest.raises(Exception, match=message):
+        read_binary_sample(directory)
+    with pytest.raises(Exception, match=message):
+        read_sample(directory)
+
+    # the validation may be skipped for a trusted sample
+    read_binary_sample(directory, validate=False)
+
+
+def test_columns_out_of_sample_file(tmp_path):
+    write_binary_sample(build(2), tmp_path / "binary")
+    with open(tmp_path / "binary" / "sample.json") as file:
+        assert "geometry" not in json.load(file)
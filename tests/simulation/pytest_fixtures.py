@@ -0,0 +1,15 @@
+import pytest
+
+from llg.predefined_structures import GenericSc
+from llg.system import System
+
+
+@pytest.fixture
+def system():
+    # a simple cubic sample of 2 x 2 x 2 sites
+    sample = GenericSc(2)
+    sample.units = "adim"
+    sample.deltat = 1e-3
+    sample.damping = 0.5
+    parameters = sample.build()["parameters"]
+    return System(sample.build_geometry(), parameters)
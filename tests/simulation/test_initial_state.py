@@ -0,0 +1,95 @@
+import numpy
+import pytest
+
+from llg.bucket import Bucket
+from llg.simulation import Simulation
+from llg.sinks import Sink, fan_out, frame_index
+
+
+class RecordingSink(Sink):
+    # it keeps the pair and the iteration of every frame
+    def start(self, information):
+        self.indices = []
+
+    def write(self, i, j, state, *energies):
+        self.indices.append((i, j))
+
+
+def test_initial_state(system):
+    simulation = Simulation(system, Bucket([1.0, 2.0]), Bucket([0.0, 0.0]), 4, 7)
+    information = simulation.information
+    assert information["initial_state"].shape == (system.geometry.num_sites, 3)
+    assert information["initial_states"] is None
+
+
+@pytest.mark.parametrize("kwargs", [{"replicas": 3}, {"exchange_every": 2}])
+def test_initial_state_of_replicas(system, kwargs):
+    num_sites = system.geometry.num_sites
+    temperature = Bucket([1.0, 2.0, 3.0])
+    field = Bucket([0.0, 0.0, 0.0])
+    initial_state = numpy.random.normal(size=(num_sites, 3))
+
+    # the replicas start from the initial state
+    simulation = Simulation(system, temperature, field, 4, 7, initial_state, **kwargs)
+    information = simulation.information
+    assert numpy.array_equal(information["initial_state"], initial_state)
+    assert information["initial_states"].shape == (3, num_sites, 3)
+    for state in information["initial_states"]:
+        assert numpy.array_equal(state, initial_state)
+
+    # or each one from its own state
+    initial_states = numpy.random.normal(size=(3, num_sites, 3))
+    simulation.set_initial_state(initial_states)
+    information = simulation.information
+    assert numpy.array_equal(information["initial_state"], initial_states[0])
+    assert numpy.array_equal(information["initial_states"], initial_states)
+
+    with pytest.raises(Exception):
+        simulation.set_initial_state(initial_states[:2])
+
+    # by default, every replica has its own random state
+    simulation = Simulation(system, temperature, field, 4, 7, **kwargs)
+    information = simulation.information
+    assert information["initial_state"].shape == (num_sites, 3)
+    assert numpy.array_equal(
+        information["initial_state"], information["initial_states"][0]
+    )
+    assert not numpy.array_equal(*information["initial_states"][:2])
+
+
+def test_initial_state_of_tempering(system):
+    # the first outputs of the replicas without exchanges follow their initial
+    # states, with a negligible noise
+    temperature = Bucket([1e-12, 2e-12, 3e-12])
+    field = Bucket([0.0, 0.0, 0.0])
+    simulation = Simulation(system, temperature, field, 2, 7, exchange_every=4)
+    information = simulation.information
+    frames = list(simulation.run())
+    for r in range(len(temperature)):
+        replica = Simulation(
+            system,
+            Bucket([temperature.values[r]]),
+            Bucket([0.0]),
+            2,
+            7,
+            information["initial_states"][r],
+        )
+        assert numpy.allclose(next(replica.run())[0], frames[r][0])
+
+
+def test_frame_index_of_tempering(system):
+    temperature = Bucket([1.0, 2.0, 3.0])
+    field = Bucket([0.0, 0.0, 0.0])
+    simulation = Simulation(system, temperature, field, 4, 7, exchange_every=2)
+    information = simulation.information
+
+    # the frames are given iteration by iteration
+    sink = RecordingSink()
+    fan_out(information, simulation.run(), [sink])
+    assert sink.indices == [(i, j) for j in range(4) for i in range(3)]
+    assert [frame_index(k, information) for k in range(12)] == sink.indices
+
+    information["tempering"] = False
+    assert [frame_index(k, information) for k in range(12)] == [
+        (i, j) for i in range(3) for j in range(4)
+    ]
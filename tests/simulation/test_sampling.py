@@ -0,0 +1,68 @@
+import numba
+import numpy
+import pytest
+
+from llg.bucket import Bucket
+from llg.simulation import Simulation
+
+
+def run(system, initial_state, num_iterations, **kwargs):
+    temperature = Bucket([1.0, 2.0])
+    field = Bucket([0.0, 0.5])
+    simulation = Simulation(
+        system, temperature, field, num_iterations, 7, initial_state, **kwargs
+    )
+    frames = [(numpy.array(state), *energies) for state, *energies in simulation.run()]
+    return simulation.information, frames
+
+
+@pytest.mark.parametrize("sample_every", [1, 3, 4])
+@pytest.mark.parametrize("equilibration_steps", [0, 2])
+def test_sampled_frames(system, sample_every, equilibration_steps):
+    # the output k of a pair is the iteration
+    # equilibration_steps + (k + 1) * sample_every - 1 of the unsampled run
+    num_sites = system.geometry.num_sites
+    initial_state = numpy.random.normal(size=(num_sites, 3))
+    initial_state /= numpy.linalg.norm(initial_state, axis=1)[:, numpy.newaxis]
+    num_iterations = 12
+
+    _, expected = run(system, initial_state, equilibration_steps + num_iterations)
+    information, frames = run(
+        system,
+        initial_state,
+        num_iterations,
+        sample_every=sample_every,
+        equilibration_steps=equilibration_steps,
+    )
+
+    num_outputs = num_iterations // sample_every
+    assert information["num_iterations"] == num_outputs
+    assert information["sample_every"] == sample_every
+    assert len(frames) == 2 * num_outputs
+    for i in range(2):
+        for k in range(num_outputs):
+            state, *energies = frames[i * num_outputs + k]
+            j = equilibration_steps + (k + 1) * sample_every - 1
+            expected_state, *expected_energies = expected[
+                i * (equilibration_steps + num_iterations) + j
+            ]
+            assert numpy.allclose(state, expected_state)
+            assert numpy.allclose(energies, expected_energies)
+
+
+def test_set_num_iterations(system):
+    simulation = Simulation(system, Bucket([1.0]), Bucket([0.0]), 12, 7, sample_every=4)
+    simulation.set_num_iterations(8)
+    assert simulation.information["num_iterations"] == 2
+    with pytest.raises(Exception):
+        simulation.set_num_iterations(10)
+    assert simulation.num_iterations == 8
+
+
+def test_threads(monkeypatch, system):
+    # the threads are bounded by the environment variable NUMBA_NUM_THREADS
+    monkeypatch.setattr(numba.config, "NUMBA_NUM_THREADS", 2)
+    simulation = Simulation(system, Bucket([1.0]), Bucket([0.0]), 4, 7, threads=2)
+    assert simulation.threads == 2
+    with pytest.raises(Exception, match="NUMBA_NUM_THREADS"):
+        Simulation(system, Bucket([1.0]), Bucket([0.0]), 4, 7, threads=3)
@@ -0,0 +1,83 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+import pytest
+
+from llg import simulation as simulation_module
+from llg.bucket import Bucket
+from llg.simulation import Simulation, Worker, receive_batches, run_worker_point
+
+
+def simulations(system, **kwargs):
+    temperature = Bucket([1.0, 2.0, 3.0])
+    field = Bucket([0.0, 0.5, 1.0])
+    initial_state = numpy.random.normal(size=(system.geometry.num_sites, 3))
+    return (
+        Simulation(system, temperature, field, 6, 7, initial_state, **kwargs)
+        for _ in range(2)
+    )
+
+
+def test_workers(system):
+    # every pair starts from the initial state, as a pair of ``run_point``
+    pooled, serial = simulations(system, sample_every=2, workers=2)
+    frames = list(pooled.run())
+    expected = [
+        frame for i in range(len(serial.temperature)) for frame in serial.run_point(i)
+    ]
+    assert len(frames) == len(expected) == 9
+    for (state, *energies), (expected_state, *expected_energies) in zip(
+        frames, expected
+    ):
+        assert numpy.array_equal(state, expected_state)
+        assert energies == expected_energies
+
+
+def test_workers_closed(system):
+    # the processes do not wait for the batches of an unfinished run
+    pooled, _ = simulations(system, workers=2)
+    frames = pooled.run()
+    next(frames)
+    frames.close()
+
+
+def test_worker_batches(system, monkeypatch):
+    simulation, serial = simulations(system)
+    state_bytes = system.geometry.num_sites * 3 * 8
+    monkeypatch.setattr(simulation_module, "WORKER_BATCH_BYTES", 4 * state_bytes)
+    slot = queue.Queue(simulation_module.WORKER_QUEUE_SIZE)
+    worker = Worker(simulation, [slot], threading.Event())
+    monkeypatch.setattr(simulation_module, "worker", worker)
+
+    # the outputs of the pair are sent in batches of at most four outputs
+    with ThreadPoolExecutor(1) as pool:
+        future = pool.submit(run_worker_point, 1, 0)
+        batches = list(receive_batches(slot, future))
+    assert [len(states) for states, _ in batches] == [4, 2]
+    expected = list(serial.run_point(1))
+    states = numpy.concatenate([states for states, _ in batches])
+    energies = [values for _, batch_energies in batches for values in batch_energies]
+    for k, (state, *values) in enumerate(expected):
+        assert numpy.array_equal(states[k], state)
+        assert energies[k] == values
+
+
+def test_worker_failure(system, monkeypatch):
+    simulation, _ = simulations(system)
+    slot = queue.Queue(simulation_module.WORKER_QUEUE_SIZE)
+    worker = Worker(simulation, [slot], threading.Event())
+    monkeypatch.setattr(simulation_module, "worker", worker)
+
+    # the exception of the pair is raised by the reader
+    with ThreadPoolExecutor(1) as pool:
+        future = pool.submit(run_worker_point, 5, 0)
+        with pytest.raises(IndexError):
+            list(receive_batches(slot, future))
+
+
+def test_worker_not_initialized(monkeypatch):
+    monkeypatch.setattr(simulation_module, "worker", None)
+    with pytest.raises(Exception, match="not initialized"):
+        run_worker_point(0, 0)
@@ -0,0 +1,108 @@
+import io
+
+import numpy
+import pytest
+
+from llg.sinks import AveragesSink, RunningStatistics, fan_out
+
+
+def old_averages(information, frames, by_types, components, discard):
+    # the averages of each pair, computed as ``AveragesSink`` did before the running
+    # statistics, from every state kept after ``discard``
+    num_iterations = information["num_iterations"]
+    types = numpy.array(information["types"])
+    lines = []
+    for i in range(information["num_TH"]):
+        kept = frames[slice(i * num_iterations + discard, (i + 1) * num_iterations)]
+        state_arr = numpy.array([state for state, *_ in kept])
+        energies = numpy.mean([energies for _, *energies in kept], axis=0)
+        magnetization = numpy.mean(state_arr, axis=1)
+
+        values = [information["temperature"][i], information["field"][i]]
+        values += list(energies)
+        values.append(numpy.mean(numpy.linalg.norm(magnetization, axis=1)))
+        if components:
+            values += list(numpy.mean(magnetization, axis=0))
+        if by_types:
+            for t in sorted(set(types)):
+                mag = numpy.mean(state_arr[:, types == t, :], axis=1)
+                values.append(numpy.mean(numpy.linalg.norm(mag, axis=1)))
+                if components:
+                    values += list(numpy.mean(mag, axis=0))
+        lines.append(values)
+    return lines
+
+
+def averages_lines(output):
+    return [
+        [float(value) for value in line.split()]
+        for line in output.getvalue().splitlines()
+        if not line.startswith("#")
+    ]
+
+
+@pytest.mark.parametrize("num_samples", [2, 10, 1000])
+def test_running_statistics(num_samples):
+    values = numpy.random.normal(3.0, 2.0, size=(num_samples, 5))
+    statistics = RunningStatistics(5)
+    for sample in values:
+        statistics.update(sample)
+    assert statistics.count == num_samples
+    assert numpy.allclose(statistics.mean, numpy.mean(values, axis=0))
+
+
+def test_running_statistics_reset():
+    statistics = RunningStatistics(2)
+    statistics.update(numpy.array([10.0, -10.0]))
+    statistics.reset()
+    assert statistics.count == 0
+    assert not statistics.mean.any()
+
+    values = numpy.random.uniform(size=(4, 2))
+    for sample in values:
+        statistics.update(sample)
+    assert numpy.allclose(statistics.mean, numpy.mean(values, axis=0))
+
+
+@pytest.mark.parametrize("by_types", [False, True])
+@pytest.mark.parametrize("components", [False, True])
+@pytest.mark.parametrize("discard", [0, 1, 5])
+@pytest.mark.parametrize("tempering", [False, True])
+def test_averages(information, frames, by_types, components, discard, tempering):
+    # the pairs of a parallel tempering run are given iteration by iteration
+    num_TH = information["num_TH"]
+    num_iterations = information["num_iterations"]
+    sent = frames
+    if tempering:
+        information = dict(information, tempering=True)
+        sent = [
+            frames[i * num_iterations + j]
+            for j in range(num_iterations)
+            for i in range(num_TH)
+        ]
+
+    output = io.StringIO()
+    fan_out(information, sent, [AveragesSink(output, by_types, components, discard)])
+
+    header = output.getvalue().splitlines()[:2]
+    assert header[0] == f"#num_TH = {num_TH}"
+    num_columns = 7 + 3 * components + by_types * 2 * (1 + 3 * components)
+    assert len(header[1].split()) == num_columns
+
+    lines = averages_lines(output)
+    expected = old_averages(information, frames, by_types, components, discard)
+    assert numpy.allclose(lines, expected)
+
+
+def test_averages_discard(information, frames):
+    # the last output of each pair is the only one averaged
+    num_iterations = information["num_iterations"]
+    output = io.StringIO()
+    fan_out(information, frames, [AveragesSink(output, discard=num_iterations - 1)])
+    expected = old_averages(information, frames, False, False, num_iterations - 1)
+    assert numpy.allclose(averages_lines(output), expected)
+
+    # and at least one output is averaged
+    for discard in (num_iterations, num_iterations + 1):
+        with pytest.raises(Exception, match="discard"):
+            fan_out(information, frames, [AveragesSink(io.StringIO(), discard=discard)])
@@ -0,0 +1,55 @@
+import h5py
+import pytest
+
+from llg.sinks import HDFSink, Sink, fan_out
+from llg.store import ReadHDF
+
+
+class FailingSink(Sink):
+    # it fails at the frame ``fail_at``, and keeps the error given to ``close``
+    def __init__(self, fail_at):
+        self.fail_at = fail_at
+        self.closed = []
+
+    def start(self, information):
+        if self.fail_at is None:
+            raise ValueError("The sink could not be started.")
+        self.count = 0
+
+    def write(self, i, j, *values):
+        if self.count == self.fail_at:
+            raise ValueError("The frame could not be written.")
+        self.count += 1
+
+    def close(self, error=None):
+        self.closed.append(error)
+
+
+def test_fan_out(tmp_path, information, frames):
+    sink = FailingSink(len(frames))
+    fan_out(information, frames, [HDFSink(tmp_path / "output.h5"), sink])
+    assert sink.closed == [None]
+    with ReadHDF(tmp_path / "output.h5") as reader:
+        assert len(list(reader)) == len(frames)
+
+
+@pytest.mark.parametrize("fail_at", [None, 0, 7])
+def test_fan_out_error(tmp_path, information, frames, fail_at):
+    # every sink is closed with the error, and the hdf file can be opened again
+    filename = tmp_path / "output.h5"
+    sink = FailingSink(fail_at)
+    with pytest.raises(ValueError) as error:
+        fan_out(information, frames, [HDFSink(filename, batch_size=4), sink])
+    assert sink.closed == [error.value]
+    with h5py.File(filename, "r") as file:
+        assert "states" in file
+
+
+def test_fan_out_error_on_start(tmp_path, information, frames):
+    # the hdf file is closed if the sink can not be started
+    filename = tmp_path / "output.h5"
+    information = dict(information, num_sites=None)
+    with pytest.raises(Exception):
+        fan_out(information, frames, [HDFSink(filename)])
+    with h5py.File(filename, "w"):
+        pass
@@ -0,0 +1,43 @@
+import numpy
+import pytest
+
+
+@pytest.fixture
+def information():
+    # the information of a simulation of two pairs and six iterations over eight
+    # sites of two types, as given by ``Simulation.information``
+    num_sites = 8
+    initial_state = numpy.random.normal(size=(num_sites, 3))
+    initial_state /= numpy.linalg.norm(initial_state, axis=1)[:, numpy.newaxis]
+    return {
+        "num_sites": num_sites,
+        "parameters": {
+            "units": "adim",
+            "damping": 0.5,
+            "gyromagnetic": 1.0,
+            "deltat": 1e-3,
+            "kb": 1.0,
+        },
+        "temperature": [1.0, 2.0],
+        "field": [0.0, 0.5],
+        "seed": 7,
+        "num_iterations": 6,
+        "sample_every": 1,
+        "equilibration_steps": 0,
+        "positions": numpy.random.uniform(size=(num_sites, 3)),
+        "types": ["Fe", "Ni"] * (num_sites // 2),
+        "initial_state": initial_state,
+        "num_TH": 2,
+    }
+
+
+@pytest.fixture
+def frames(information):
+    # random frames of the simulation of ``information``, pair by pair
+    num_frames = information["num_TH"] * information["num_iterations"]
+    frames = []
+    for _ in range(num_frames):
+        state = numpy.random.normal(size=(information["num_sites"], 3))
+        state /= numpy.linalg.norm(state, axis=1)[:, numpy.newaxis]
+        frames.append((state, *numpy.random.uniform(-1, 1, size=4).tolist()))
+    return frames
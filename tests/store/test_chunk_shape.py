@@ -0,0 +1,69 @@
+import h5py
+import numpy
+import pytest
+
+from llg.store import CHUNK_BYTES, CHUNK_LAYOUTS, StoreHDF
+
+
+@pytest.mark.parametrize(
+    "layout, num_iterations, num_sites, expected",
+    [
+        # whole frames
+        ("frame", 100, 1000, (1, 43, 1000, 3)),
+        ("frame", 100, 10**5, (1, 1, 43690, 3)),
+        # time series of blocks of 64 sites
+        ("site", 1000, 10**5, (1, 682, 64, 3)),
+        ("site", 100, 10**5, (1, 100, 436, 3)),
+        # about the cubic root of the chunk size in iterations
+        ("balanced", 1000, 10**5, (1, 35, 1248, 3)),
+    ],
+)
+def test_chunk_shape_presets(layout, num_iterations, num_sites, expected):
+    assert StoreHDF.chunk_shape(layout, num_iterations, num_sites) == expected
+
+
+@pytest.mark.repeat(10)
+@pytest.mark.parametrize("layout", CHUNK_LAYOUTS)
+def test_chunk_shape_bounds(layout):
+    num_iterations = numpy.random.randint(1, 10**4)
+    num_sites = numpy.random.randint(1, 10**6)
+    components = numpy.random.choice([2, 3])
+    itemsize = numpy.random.choice([2, 4, 8])
+    shape = StoreHDF.chunk_shape(
+        layout, num_iterations, num_sites, components, itemsize
+    )
+    assert shape[0] == 1
+    assert 1 <= shape[1] <= num_iterations
+    assert 1 <= shape[2] <= num_sites
+    assert shape[3] == components
+    assert numpy.prod(shape) * itemsize <= CHUNK_BYTES
+
+
+@pytest.mark.parametrize("layout", CHUNK_LAYOUTS)
+def test_chunk_shape_fallback(layout):
+    # the chunks have at least a spin, even if it is larger than the chunk size
+    assert StoreHDF.chunk_shape(layout, 1, 1) == (1, 1, 1, 3)
+    assert StoreHDF.chunk_shape(layout, 10, 10, chunk_bytes=1) == (1, 1, 1, 3)
+
+
+def test_chunk_shape_unsupported():
+    with pytest.raises(Exception):
+        StoreHDF.chunk_shape("unknown", 10, 10)
+    with pytest.raises(Exception):
+        StoreHDF("unused.h5", chunks="unknown")
+
+
+@pytest.mark.parametrize("layout", CHUNK_LAYOUTS + (None,))
+def test_chunks_of_the_file(tmp_path, information, layout):
+    filename = tmp_path / "output.h5"
+    with StoreHDF(filename, chunks=layout) as store:
+        store.populate(information)
+
+    with h5py.File(filename) as file:
+        if layout is None:
+            # the states are contiguous without compression
+            assert file["states"].chunks is None
+        else:
+            assert file["states"].chunks == StoreHDF.chunk_shape(
+                layout, information["num_iterations"], information["num_sites"]
+            )
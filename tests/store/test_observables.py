@@ -0,0 +1,132 @@
+import io
+
+import numpy
+import pytest
+
+from llg.functions.magnetization import (
+    magnetization_vector,
+    magnetization_vector_by_type,
+)
+from llg.sinks import AveragesSink, fan_out, hdf_point_averages
+from llg.store import ReadHDF, StoreHDF
+
+
+def write(filename, information, frames, **kwargs):
+    num_iterations = information["num_iterations"]
+    with StoreHDF(filename, **kwargs) as store:
+        store.populate(information)
+        for k, values in enumerate(frames):
+            i, j = divmod(k, num_iterations)
+            store.store(*values, i, j)
+
+
+def expected_observables(information, frames):
+    _, type_codes = numpy.unique(information["types"], return_inverse=True)
+    num_types = type_codes.max() + 1
+    for state, *energies in frames:
+        magnetization = numpy.empty(3)
+        magnetization_by_type = numpy.empty((num_types, 3))
+        magnetization_vector(state, magnetization)
+        magnetization_vector_by_type(
+            state, num_types, type_codes.astype(numpy.int64), magnetization_by_type
+        )
+        yield magnetization, magnetization_by_type, energies
+
+
+@pytest.mark.parametrize("state_every", [2, 4, 5])
+@pytest.mark.parametrize("batch_size", [1, 3, 64])
+def test_decimated_states(tmp_path, information, frames, state_every, batch_size):
+    filename = tmp_path / "output.h5"
+    write(filename, information, frames, batch_size=batch_size, state_every=state_every)
+
+    num_iterations = information["num_iterations"]
+    with ReadHDF(filename, slab_bytes=1) as reader:
+        # only the iterations j with j + 1 multiple of state_every are stored
+        num_states = num_iterations // state_every
+        assert reader.num_states == num_states
+        assert reader.information["num_iterations"] == num_states
+        assert reader.information["sample_every"] == state_every
+        for i in range(information["num_TH"]):
+            read = list(reader.frames(i))
+            assert len(read) == num_states
+            for k, (state, *energies) in enumerate(read):
+                expected_state, *expected_energies = frames[
+                    i * num_iterations + (k + 1) * state_every - 1
+                ]
+                assert numpy.allclose(state, expected_state)
+                assert numpy.allclose(energies, expected_energies)
+
+
+@pytest.mark.parametrize("kwargs", [{"state_every": 4}, {"observables_only": True}])
+def test_observables(tmp_path, information, frames, kwargs):
+    filename = tmp_path / "output.h5"
+    write(filename, information, frames, batch_size=4, **kwargs)
+
+    with ReadHDF(filename, slab_bytes=1) as reader:
+        assert reader.has_observables
+        assert reader.has_states != kwargs.get("observables_only", False)
+        assert reader.observables_information["num_iterations"] == (
+            information["num_iterations"]
+        )
+        read = list(reader.iter_observables())
+        assert len(read) == len(frames)
+        expected = expected_observables(information, frames)
+        for values, (magnetization, magnetization_by_type, energies) in zip(
+            read, expected
+        ):
+            assert numpy.allclose(values[0], magnetization)
+            assert numpy.allclose(values[1], magnetization_by_type)
+            assert numpy.allclose(values[2:], energies)
+
+
+def test_observables_only_without_states(tmp_path, information, frames):
+    filename = tmp_path / "output.h5"
+    write(filename, information, frames, observables_only=True)
+
+    with ReadHDF(filename) as reader:
+        assert not reader.has_states
+        assert reader.information["num_iterations"] == information["num_iterations"]
+        with pytest.raises(Exception):
+            next(reader.frames(0))
+
+
+def test_without_observables(tmp_path, information, frames):
+    filename = tmp_path / "output.h5"
+    write(filename, information, frames)
+
+    with ReadHDF(filename) as reader:
+        assert not reader.has_observables
+        with pytest.raises(Exception):
+            next(reader.observables(0))
+
+
+@pytest.mark.parametrize("by_types, components", [(False, False), (True, True)])
+@pytest.mark.parametrize("discard", [0, 2])
+def test_averages_of_observables(
+    tmp_path, information, frames, by_types, components, discard
+):
+    # the averages from the stored magnetization are the averages from the frames
+    filename = tmp_path / "output.h5"
+    write(filename, information, frames, observables_only=True)
+
+    expected = io.StringIO()
+    fan_out(
+        information, frames, [AveragesSink(expected, by_types, components, discard)]
+    )
+
+    output = io.StringIO()
+    with ReadHDF(filename) as reader:
+        sink = AveragesSink(output, by_types, components, discard)
+        fan_out(
+            reader.observables_information,
+            reader.iter_observables(),
+            [sink],
+            observables=True,
+        )
+    assert output.getvalue() == expected.getvalue()
+
+    lines = [
+        hdf_point_averages(filename, i, by_types, components, discard, observables=True)
+        for i in range(information["num_TH"])
+    ]
+    assert "".join(lines) == "".join(expected.getvalue().splitlines(True)[-2:])
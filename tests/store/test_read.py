@@ -0,0 +1,59 @@
+import numpy
+import pytest
+
+from llg.sinks import HDFSink, fan_out
+from llg.store import CHUNK_LAYOUTS, ReadHDF
+
+
+def assert_same_frames(read, frames, atol):
+    assert len(read) == len(frames)
+    for (state, *energies), (expected_state, *expected_energies) in zip(read, frames):
+        assert numpy.allclose(state, expected_state, atol=atol)
+        assert numpy.allclose(energies, expected_energies)
+
+
+@pytest.mark.parametrize("chunks", (None,) + CHUNK_LAYOUTS)
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("slab_bytes", [1, 2**20])
+def test_read_frames(tmp_path, information, frames, chunks, compress, slab_bytes):
+    filename = tmp_path / "output.h5"
+    fan_out(information, frames, [HDFSink(filename, compress, chunks=chunks)])
+
+    with ReadHDF(filename, slab_bytes=slab_bytes) as reader:
+        assert reader.num_frames == len(frames)
+        read_information = reader.information
+        for i in range(information["num_TH"]):
+            num_iterations = information["num_iterations"]
+            read = [
+                (numpy.array(state), *energies) for state, *energies in reader.frames(i)
+            ]
+            assert_same_frames(
+                read, frames[slice(i * num_iterations, (i + 1) * num_iterations)], 0
+            )
+        assert_same_frames(list(reader), frames, 0)
+
+    for key in ("num_sites", "num_iterations", "num_TH", "seed", "sample_every"):
+        assert read_information[key] == information[key]
+    assert read_information["parameters"] == information["parameters"]
+    assert list(read_information["types"]) == information["types"]
+    for key in ("temperature", "field", "positions", "initial_state"):
+        assert numpy.array_equal(read_information[key], information[key])
+
+
+@pytest.mark.parametrize("encoding, atol", [("spherical", 1e-6), ("octahedral", 1e-3)])
+def test_read_encoded_frames(tmp_path, information, frames, encoding, atol):
+    filename = tmp_path / "output.h5"
+    fan_out(information, frames, [HDFSink(filename, encoding=encoding)])
+
+    with ReadHDF(filename) as reader:
+        assert reader.encoding == encoding
+        assert_same_frames(list(reader), frames, atol)
+
+
+def test_closed(tmp_path, information, frames):
+    filename = tmp_path / "output.h5"
+    fan_out(information, frames, [HDFSink(filename)])
+
+    with ReadHDF(filename) as reader:
+        pass
+    assert not reader.file
@@ -0,0 +1,126 @@
+import numpy
+import pytest
+
+from llg.store import ReadHDF, StoreHDF
+
+
+def record_blocks(monkeypatch, fail_at=None):
+    # it records the (i, start, count) of the blocks written by the background
+    # thread, and makes the block ``fail_at`` fail
+    blocks = []
+    write_block = StoreHDF._StoreHDF__write_block
+
+    def recorder(self, block):
+        blocks.append((block.i, block.start, block.count))
+        if len(blocks) - 1 == fail_at:
+            raise ValueError("The block could not be written.")
+        write_block(self, block)
+
+    monkeypatch.setattr(StoreHDF, "_StoreHDF__write_block", recorder)
+    return blocks
+
+
+def store_frames(store, information, frames):
+    num_iterations = information["num_iterations"]
+    for k, values in enumerate(frames):
+        i, j = divmod(k, num_iterations)
+        store.store(*values, i, j)
+
+
+@pytest.mark.parametrize(
+    "batch_size, expected",
+    [
+        (1, [(i, j, 1) for i in range(2) for j in range(6)]),
+        (4, [(0, 0, 4), (0, 4, 2), (1, 0, 4), (1, 4, 2)]),
+        (64, [(0, 0, 6), (1, 0, 6)]),
+    ],
+)
+def test_batching(monkeypatch, tmp_path, information, frames, batch_size, expected):
+    # the blocks are full, or cut where the pair changes
+    blocks = record_blocks(monkeypatch)
+    filename = tmp_path / "output.h5"
+    with StoreHDF(filename, batch_size=batch_size) as store:
+        store.populate(information)
+        store_frames(store, information, frames)
+    assert blocks == expected
+
+    with ReadHDF(filename) as reader:
+        read = list(reader)
+    assert len(read) == len(frames)
+    for (state, *energies), (expected_state, *expected_energies) in zip(read, frames):
+        assert numpy.allclose(state, expected_state)
+        assert numpy.allclose(energies, expected_energies)
+
+
+@pytest.mark.parametrize("batch_size", [3, 4, 64])
+def test_batching_of_tempering(monkeypatch, tmp_path, information, frames, batch_size):
+    # the pairs are given iteration by iteration, and each one keeps its block
+    blocks = record_blocks(monkeypatch)
+    filename = tmp_path / "output.h5"
+    num_TH = information["num_TH"]
+    num_iterations = information["num_iterations"]
+    with StoreHDF(filename, batch_size=batch_size) as store:
+        store.populate(information)
+        for j in range(num_iterations):
+            for i in range(num_TH):
+                store.store(*frames[i * num_iterations + j], i, j)
+
+    num_blocks = -(-num_iterations // batch_size)
+    assert len(blocks) == num_TH * num_blocks
+    assert sorted(blocks) == [
+        (i, start, min(batch_size, num_iterations - start))
+        for i in range(num_TH)
+        for start in range(0, num_iterations, batch_size)
+    ]
+
+    with ReadHDF(filename) as reader:
+        read = list(reader)
+    for (state, *energies), (expected_state, *expected_energies) in zip(read, frames):
+        assert numpy.allclose(state, expected_state)
+        assert numpy.allclose(energies, expected_energies)
+
+
+def test_flush_on_exit(monkeypatch, tmp_path, information, frames):
+    # the last block, which is not full, is written when the store is closed
+    blocks = record_blocks(monkeypatch)
+    filename = tmp_path / "output.h5"
+    with StoreHDF(filename, batch_size=4) as store:
+        store.populate(information)
+        store_frames(store, information, frames[:3])
+        store.flush()
+        assert blocks == [(0, 0, 3)]
+        store_frames(store, information, frames[:5])
+    assert blocks == [(0, 0, 3), (0, 0, 4), (0, 4, 1)]
+
+    with ReadHDF(filename) as reader:
+        read = list(reader.frames(0))
+    for (state, *energies), (expected_state, *expected_energies) in zip(
+        read[:5], frames
+    ):
+        assert numpy.allclose(state, expected_state)
+        assert numpy.allclose(energies, expected_energies)
+
+
+@pytest.mark.parametrize("fail_at", [0, 1, 3])
+def test_writer_error(monkeypatch, tmp_path, information, frames, fail_at):
+    # the error of the background thread is raised in the caller, and the
+    # following blocks are not written
+    blocks = record_blocks(monkeypatch, fail_at)
+    filename = tmp_path / "output.h5"
+    with pytest.raises(Exception, match="could not be written") as error:
+        with StoreHDF(filename, batch_size=2) as store:
+            store.populate(information)
+            store_frames(store, information, frames)
+    assert isinstance(error.value.__cause__, ValueError)
+    assert len(blocks) == fail_at + 1
+
+
+def test_writer_error_on_flush(monkeypatch, tmp_path, information, frames):
+    record_blocks(monkeypatch, fail_at=0)
+    # the error is kept, so closing the store raises it again
+    with pytest.raises(Exception, match="could not be written"):
+        with StoreHDF(tmp_path / "output.h5", batch_size=64) as store:
+            store.populate(information)
+            store_frames(store, information, frames[:2])
+            with pytest.raises(Exception, match="could not be written"):
+                store.flush()
@@ -0,0 +1,75 @@
+import io
+import pickle
+import struct
+
+import numpy
+import pytest
+
+from llg.stream import MAGIC, StreamReader, StreamWriter
+
+
+def write_stream(information, frames):
+    stream = io.BytesIO()
+    writer = StreamWriter(stream)
+    writer.write_information(information)
+    for values in frames:
+        writer.write(*values)
+    writer.flush()
+    stream.seek(0)
+    return stream
+
+
+def assert_same_frames(reader, information, frames):
+    assert reader.num_frames == len(frames)
+    for key in ("num_sites", "num_iterations", "num_TH", "seed", "types"):
+        assert reader.information[key] == information[key]
+    assert numpy.array_equal(reader.information["positions"], information["positions"])
+
+    # the state is overwritten by the next frame, so it is copied
+    read = [(numpy.array(state), *energies) for state, *energies in reader]
+    assert len(read) == len(frames)
+    for (state, *energies), (expected_state, *expected_energies) in zip(read, frames):
+        assert numpy.array_equal(state, expected_state)
+        assert energies == expected_energies
+
+
+def test_round_trip(information, frames):
+    stream = write_stream(information, frames)
+    assert stream.getvalue().startswith(MAGIC)
+    assert_same_frames(StreamReader(stream), information, frames)
+
+
+def test_round_trip_of_short_reads(information, frames):
+    # a pipe may give a frame in several reads
+    class ShortReads(io.BytesIO):
+        def readinto(self, buffer):
+            return super().readinto(memoryview(buffer)[:7])
+
+    stream = ShortReads(write_stream(information, frames).getvalue())
+    assert_same_frames(StreamReader(stream), information, frames)
+
+
+def test_text_stream(information, frames):
+    # the stream of the previous versions, a pickled representation per line
+    lines = [pickle.dumps(information)]
+    for state, *energies in frames:
+        lines += [pickle.dumps(state)] + [pickle.dumps(energy) for energy in energies]
+    stream = io.BytesIO("".join(f"{line}\n" for line in lines).encode())
+    assert_same_frames(StreamReader(stream), information, frames)
+
+
+def test_truncated_stream(information, frames):
+    data = write_stream(information, frames).getvalue()
+    reader = StreamReader(io.BytesIO(data[:-1]))
+    with pytest.raises(Exception, match="middle of a frame"):
+        list(reader)
+
+    with pytest.raises(Exception, match="middle of a frame"):
+        StreamReader(io.BytesIO(data[: len(MAGIC) + 20]))
+
+
+def test_unsupported_version(information, frames):
+    data = bytearray(write_stream(information, frames).getvalue())
+    data[slice(len(MAGIC), len(MAGIC) + 4)] = struct.pack("<I", 2)
+    with pytest.raises(Exception, match="version 2"):
+        StreamReader(io.BytesIO(bytes(data)))